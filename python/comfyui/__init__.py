@@ -18,6 +18,7 @@ from .nodes.node_gemini_garment_processor import GeminiGarmentProcessor
 from .nodes.node_gemini_advanced_recolor import GeminiAdvancedRecolor
 from .nodes.node_gemini_styling_assistant import GeminiStylingAssistant
 from .nodes.node_gemini_occasion_stylist import GeminiOccasionStylist
+from .utils.metrics import register_metrics_route
 
 
 NODE_CLASS_MAPPINGS = {
@@ -42,3 +43,5 @@ NODE_DISPLAY_NAME_MAPPINGS = {
 }
 
 
+# Prometheus-style latency metrics at GET /gemini/metrics (no-op outside ComfyUI)
+register_metrics_route()
@@ -0,0 +1,277 @@
+"""Headless batch runner: process a manifest of images through a Gemini node without ComfyUI.
+
+Each manifest row (CSV with a header line, or JSONL) is one node call. Image columns hold file paths,
+relative to the manifest; other columns set node inputs by name. The node classes are driven directly,
+so prompts, cache keys and the result cache are the same as in ComfyUI, and results are written to the
+output directory as PNG files. Completed rows are recorded in a checkpoint file so an interrupted run
+resumes where it stopped.
+
+Run through ``run_batch.py`` in the plugin folder, e.g.:
+
+    python run_batch.py pairs.csv --out results/ --node GeminiVirtualTryOn --workers 16 --seed 1
+
+with ``pairs.csv``::
+
+    id,model,garment
+    look-001,models/anna.jpg,garments/red-dress.png
+"""
+
+import argparse
+import csv
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from PIL import Image, ImageOps
+
+from . import NODE_CLASS_MAPPINGS
+from .utils.image_io import pil_list_to_tensor, tensor_to_pil_list
+
+
+DEFAULT_NODE = "GeminiVirtualTryOn"
+DEFAULT_WORKERS = 8
+CHECKPOINT_FILE = "batch_checkpoint.jsonl"
+LOG_INTERVAL = 10.0
+
+# English manifest columns accepted for the node inputs
+INPUT_ALIASES = {
+    "model": "模特图",
+    "garment": "服装图",
+    "seed": "种子",
+    "timeout": "超时秒数",
+    "upload_format": "上传格式",
+    "upload_quality": "上传质量",
+    "max_edge": "最长边",
+    "restore_size": "还原尺寸",
+}
+# Inputs the runner controls itself
+RUNNER_INPUTS = {"刷新间隔秒数": 0, "并发数": 1}
+
+
+@dataclass
+class BatchItem:
+    id: str
+    node: str
+    row: Dict[str, Any]
+    # Result path relative to the output directory (or absolute), as stored in the checkpoint
+    output: str
+
+
+def read_manifest(path: str) -> List[Dict[str, Any]]:
+    """Rows of a ``.jsonl`` (one JSON object per line) or CSV manifest; blank lines are skipped."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            return [json.loads(line) for line in f if line.strip()]
+        return [row for row in csv.DictReader(f) if any((v or "").strip() for v in row.values())]
+
+
+def _input_specs(node_class) -> Dict[str, tuple]:
+    types = node_class.INPUT_TYPES()
+    return {**types.get("required", {}), **types.get("optional", {})}
+
+
+def _coerce(value: Any, kind: str) -> Any:
+    if kind == "INT":
+        return int(value)
+    if kind == "BOOLEAN":
+        if isinstance(value, str):
+            return value.strip().lower() in ("1", "true", "yes", "y", "on")
+        return bool(value)
+    return "" if value is None else str(value)
+
+
+def load_image_tensor(path: str):
+    """Load an image the way ComfyUI's LoadImage does, so pixel hashes (cache keys) match."""
+    with Image.open(path) as img:
+        img = ImageOps.exif_transpose(img).convert("RGB")
+    return pil_list_to_tensor([img])
+
+
+class Checkpoint:
+    """Append-only JSONL record of finished rows; the last record per id wins.
+
+    Output paths are recorded relative to the checkpoint's directory (the output directory),
+    so a run can be resumed from any working directory.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.root = os.path.dirname(os.path.abspath(path))
+        self._lock = threading.Lock()
+        self.records: Dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    self.records[str(record.get("id"))] = record
+        self._file = open(path, "a", encoding="utf-8")
+
+    def completed(self) -> Set[str]:
+        return {
+            item_id for item_id, record in self.records.items()
+            if record.get("status") == "done" and record.get("output") and os.path.exists(os.path.join(self.root, record["output"]))
+        }
+
+    def append(self, record: dict) -> None:
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self.records[str(record["id"])] = record
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class BatchRunner:
+    def __init__(self, out_dir: str, base_dir: str, defaults: Dict[str, Any], overwrite: bool = False):
+        self.out_dir = out_dir
+        self.base_dir = base_dir
+        self.defaults = defaults
+        self.overwrite = overwrite
+        self._nodes: Dict[str, Any] = {}
+        self._stop = threading.Event()
+        self.stats = {"done": 0, "failed": 0, "skipped": 0}
+
+    def items(self, rows: List[Dict[str, Any]], default_node: str) -> Iterator[BatchItem]:
+        for index, row in enumerate(rows, start=1):
+            node = row.get("node") or default_node
+            if node not in NODE_CLASS_MAPPINGS:
+                raise ValueError(f"Row {index}: unknown node '{node}', expected one of {sorted(NODE_CLASS_MAPPINGS)}")
+            item_id = str(row.get("id") or f"{index:06d}")
+            yield BatchItem(item_id, node, row, row.get("output") or f"{item_id}.png")
+
+    def _node_kwargs(self, item: BatchItem) -> Dict[str, Any]:
+        node_class = NODE_CLASS_MAPPINGS[item.node]
+        specs = _input_specs(node_class)
+        values = {INPUT_ALIASES.get(k, k): v for k, v in {**self.defaults, **item.row}.items() if v not in (None, "")}
+        image_inputs = [name for name, spec in specs.items() if spec[0] == "IMAGE"]
+        if len(image_inputs) == 1 and image_inputs[0] not in values and "image" in values:
+            values[image_inputs[0]] = values["image"]
+
+        kwargs = {}
+        for name, spec in specs.items():
+            kind = spec[0] if isinstance(spec[0], str) else "STRING"
+            if kind == "IMAGE":
+                if name not in values:
+                    raise ValueError(f"missing image column '{name}'")
+                kwargs[name] = load_image_tensor(os.path.join(self.base_dir, str(values[name])))
+            elif name in RUNNER_INPUTS:
+                kwargs[name] = RUNNER_INPUTS[name]
+            elif name in values:
+                kwargs[name] = _coerce(values[name], kind)
+            elif len(spec) > 1 and "default" in spec[1]:
+                kwargs[name] = spec[1]["default"]
+        return kwargs
+
+    def run_item(self, item: BatchItem) -> dict:
+        started = time.perf_counter()
+        record = {"id": item.id, "node": item.node, "output": item.output}
+        try:
+            node = self._nodes.get(item.node)
+            if node is None:
+                node = self._nodes.setdefault(item.node, NODE_CLASS_MAPPINGS[item.node]())
+            out = getattr(node, node.FUNCTION)(**self._node_kwargs(item))[0]
+            path = os.path.join(self.out_dir, item.output)
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            tmp = path + ".tmp"
+            tensor_to_pil_list(out)[0].save(tmp, format="PNG")
+            os.replace(tmp, path)
+            record["status"] = "done"
+        except Exception as ex:
+            record["status"] = "failed"
+            record["error"] = str(ex)
+        record["seconds"] = round(time.perf_counter() - started, 3)
+        return record
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run(self, items: List[BatchItem], checkpoint: Checkpoint, workers: int) -> None:
+        done_ids = set() if self.overwrite else checkpoint.completed()
+        pending = [item for item in items if item.id not in done_ids]
+        self.stats["skipped"] = len(items) - len(pending)
+        print(f"[BatchRunner] {len(items)} items, {self.stats['skipped']} already done, {len(pending)} to run with {workers} workers")
+
+        started = last_log = time.monotonic()
+        in_flight: Set[Future] = set()
+        queue = iter(pending)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gemini-batch-runner") as pool:
+            while True:
+                # Keep at most ``workers`` items in flight so huge manifests are not loaded up front
+                while not self._stop.is_set() and len(in_flight) < workers:
+                    item = next(queue, None)
+                    if item is None:
+                        break
+                    in_flight.add(pool.submit(self.run_item, item))
+                if not in_flight:
+                    break
+                finished, in_flight = wait(in_flight, timeout=LOG_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = future.result()
+                    checkpoint.append(record)
+                    self.stats[record["status"]] += 1
+                    if record["status"] == "failed":
+                        print(f"[BatchRunner] {record['id']} failed: {record['error']}")
+                now = time.monotonic()
+                if now - last_log >= LOG_INTERVAL:
+                    last_log = now
+                    self._log_progress(len(pending), now - started)
+        self._log_progress(len(pending), time.monotonic() - started)
+
+    def _log_progress(self, total: int, elapsed: float) -> None:
+        finished = self.stats["done"] + self.stats["failed"]
+        rate = self.stats["done"] / elapsed if elapsed > 0 else 0.0
+        print(f"[BatchRunner] {finished}/{total} finished ({self.stats['failed']} failed), {rate:.2f} images/s, elapsed {int(elapsed)}s")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("manifest", help="CSV (with header) or JSONL manifest")
+    parser.add_argument("--out", required=True, help="output directory for result PNGs and the checkpoint")
+    parser.add_argument("--node", default=DEFAULT_NODE, help=f"node class for rows without a 'node' column (default {DEFAULT_NODE})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="rows processed concurrently")
+    parser.add_argument("--seed", type=int, help="种子 for rows without one; > 0 enables the shared result cache")
+    parser.add_argument("--timeout", type=int, help="超时秒数 for rows without one")
+    parser.add_argument("--set", action="append", default=[], metavar="INPUT=VALUE", help="default value of another node input")
+    parser.add_argument("--overwrite", action="store_true", help="ignore the checkpoint and regenerate every row")
+    args = parser.parse_args(argv)
+
+    defaults: Dict[str, Any] = {}
+    for item in args.set:
+        key, _, value = item.partition("=")
+        defaults[key] = value
+    if args.seed is not None:
+        defaults["种子"] = args.seed
+    if args.timeout is not None:
+        defaults["超时秒数"] = args.timeout
+
+    os.makedirs(args.out, exist_ok=True)
+    runner = BatchRunner(args.out, os.path.dirname(os.path.abspath(args.manifest)), defaults, overwrite=args.overwrite)
+    try:
+        items = list(runner.items(read_manifest(args.manifest), args.node))
+    except (OSError, ValueError) as ex:
+        print(f"[BatchRunner] cannot read manifest: {ex}", file=sys.stderr)
+        return 2
+
+    def _on_sigint(signum, frame):
+        print("[BatchRunner] stopping: waiting for in-flight items (Ctrl+C again to abort)")
+        runner.stop()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    signal.signal(signal.SIGINT, _on_sigint)
+    checkpoint = Checkpoint(os.path.join(args.out, CHECKPOINT_FILE))
+    try:
+        runner.run(items, checkpoint, max(1, args.workers))
+    finally:
+        checkpoint.close()
+    return 1 if runner.stats["failed"] else 0
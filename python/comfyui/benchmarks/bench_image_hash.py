@@ -0,0 +1,41 @@
+"""Compare cache-key hashing paths across image sizes.
+
+Usage: python benchmarks/bench_image_hash.py [--repeat N]
+"""
+
+import argparse
+
+import numpy as np
+from PIL import Image
+
+from common import load_plugin_module, print_table, time_call
+
+
+SIZES = [(512, 512), (1024, 1024), (2048, 2048), (4096, 4096)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    image_io = load_plugin_module("utils.image_io")
+    algorithms = ["sha256", "blake2b"] + (["xxh3"] if image_io.xxhash is not None else [])
+
+    rows = []
+    rng = np.random.default_rng(0)
+    for width, height in SIZES:
+        img = Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), mode="RGB")
+        row = [f"{width}x{height}"]
+        row.append(time_call(lambda: image_io.hash_pil_images([img]), repeat=args.repeat)["median_ms"])
+        for algorithm in algorithms:
+            # The cache-key path: PreparedImage.pixel_hash digests the RGB array of each input
+            row.append(time_call(lambda: image_io.hash_arrays([np.asarray(img)], algorithm=algorithm), repeat=args.repeat)["median_ms"])
+        rows.append(row)
+
+    print_table(["size", "png+sha256 (old)"] + [f"raw+{a}" for a in algorithms], rows)
+    print("\nmedian milliseconds per image")
+
+
+if __name__ == "__main__":
+    main()
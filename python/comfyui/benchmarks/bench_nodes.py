@@ -0,0 +1,204 @@
+"""End-to-end node benchmark against a local mock Gemini server (no network access, no API spend).
+
+Drives every node class with synthetic IMAGE tensors at several batch sizes and resolutions and
+reports throughput, call latency percentiles, the client's per-request latency, peak RSS and
+peak thread count. The plugin runs with a temporary config pointing at the mock server; the
+result cache is disabled and seed 0 is used, so every image goes through the full request path.
+
+Usage: python benchmarks/bench_nodes.py [--nodes GeminiVirtualTryOn,...] [--batch-sizes 1,4]
+       [--resolutions 512,1024] [--latency lognormal:0.3:0.3] [--error-rate 0.02]
+       [--set response_mode=buffered] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import torch
+
+from common import load_plugin_module, print_table, use_isolated_config
+from mock_server import MockGeminiServer, parse_size
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+
+# Node-specific inputs; the shared ones (seed, timeout, concurrency, ...) are added in run_node
+NODE_INPUTS = {
+    "GeminiModelGenerator": lambda x: {"输入图片": x},
+    "GeminiVirtualTryOn": lambda x: {"模特图": x, "服装图": x[:1]},
+    "GeminiPoseVariation": lambda x: {"输入图片": x, "姿势预设": "侧面轮廓视角", "自定义姿势": ""},
+    "GeminiGarmentProcessor": lambda x: {"输入图片": x, "选择上装": True, "选择下装": False, "选择鞋子": False},
+    "GeminiAdvancedRecolor": lambda x: {
+        "图片": x, "颜色描述": "deep red", "自定义目标": "", "选择外套": False, "选择上衣": True, "选择下装": False,
+        "选择连衣裙": False, "选择鞋子": False, "选择配饰": False, "选择头发": False,
+    },
+    "GeminiStylingAssistant": lambda x: {
+        "图片": x, "自定义添加": "a red scarf", "选择外套": False, "选择上衣": False, "选择下装": False,
+        "选择连衣裙": False, "选择鞋子": False, "选择配饰": False, "智能推荐": False, "生成后控制": "fixed",
+    },
+    "GeminiOccasionStylist": lambda x: {
+        "模特图": x, "自定义场合": "gala dinner", "选择商务休闲": False, "选择晚宴": False, "选择周末早午餐": False,
+        "选择海滩度假": False, "选择健身房": False, "选择鸡尾酒会": False, "生成后控制": "fixed",
+    },
+}
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+class ThreadSampler:
+    """Samples ``threading.active_count()`` in the background and keeps the peak (excluding itself)."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bench-thread-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, threading.active_count() - 1)
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "ThreadSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def parse_overrides(items: List[str]) -> Dict[str, object]:
+    """``key=value`` pairs; values are parsed as JSON when possible (numbers, booleans, lists)."""
+    overrides = {}
+    for item in items:
+        key, _, value = item.partition("=")
+        try:
+            overrides[key] = json.loads(value)
+        except ValueError:
+            overrides[key] = value
+    return overrides
+
+
+def write_config(server: MockGeminiServer, overrides: Dict[str, object]) -> str:
+    config = {
+        "api_key": "benchmark",
+        "endpoint_template": server.endpoint_template,
+        "retry_backoff_base": 0.1,
+        "result_cache_dir": "",
+    }
+    config.update(overrides)
+    fd, path = tempfile.mkstemp(prefix="gemini_bench_", suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    return path
+
+
+def run_node(plugin, metrics, name: str, batch: int, resolution: int, repeat: int, concurrency: int, timeout: int) -> dict:
+    node = plugin.NODE_CLASS_MAPPINGS[name]()
+    method = getattr(node, node.FUNCTION)
+    tensor = torch.rand(batch, resolution, resolution, 3)
+    kwargs = dict(NODE_INPUTS[name](tensor), 种子=0, 超时秒数=timeout, 刷新间隔秒数=0, 并发数=concurrency)
+
+    metrics.reset()
+    latencies: List[float] = []
+    images = failures = 0
+    with ThreadSampler() as sampler:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            call_start = time.perf_counter()
+            try:
+                out = method(**kwargs)[0]
+                images += int(out.shape[0])
+            except RuntimeError as ex:
+                failures += 1
+                print(f"  {name}: {ex}")
+            latencies.append(time.perf_counter() - call_start)
+        elapsed = time.perf_counter() - started
+
+    request = next((row for row in metrics.snapshot() if row["stage"] == "request"), {})
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000.0
+    return {
+        "node": name,
+        "batch": batch,
+        "resolution": resolution,
+        "images_per_s": images / elapsed if elapsed > 0 else 0.0,
+        "call_p50_ms": float(p50),
+        "call_p95_ms": float(p95),
+        "call_p99_ms": float(p99),
+        "request_p50_ms": request.get("p50_ms"),
+        "request_p95_ms": request.get("p95_ms"),
+        "failures": failures,
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_threads": sampler.peak,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", default=",".join(NODE_INPUTS), help="comma-separated node class names")
+    parser.add_argument("--batch-sizes", default="1,4")
+    parser.add_argument("--resolutions", default="512,1024", help="square input sizes in pixels")
+    parser.add_argument("--repeat", type=int, default=3, help="node calls per configuration")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发数 passed to the nodes")
+    parser.add_argument("--timeout", type=int, default=60, help="超时秒数 passed to the nodes")
+    parser.add_argument("--latency", default="lognormal:0.3:0.3", help="mock latency spec (see mock_server.py)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of mock requests failing with 503")
+    parser.add_argument("--image-size", default="1024x1024", help="size of the mock result image")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="extra gemini_config.json option")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    nodes = [n.strip() for n in args.nodes.split(",") if n.strip()]
+    unknown = [n for n in nodes if n not in NODE_INPUTS]
+    if unknown:
+        parser.error(f"unknown nodes: {', '.join(unknown)}")
+
+    server = MockGeminiServer(args.latency, args.error_rate, parse_size(args.image_size)).start()
+    config_path = write_config(server, parse_overrides(args.set))
+    use_isolated_config(config_path)
+
+    try:
+        plugin = load_plugin_module()
+        metrics = load_plugin_module("utils.metrics").GLOBAL_METRICS
+        results = []
+        for name in nodes:
+            for resolution in [int(v) for v in args.resolutions.split(",")]:
+                for batch in [int(v) for v in args.batch_sizes.split(",")]:
+                    results.append(run_node(plugin, metrics, name, batch, resolution, args.repeat, args.concurrency, args.timeout))
+    finally:
+        server.stop()
+        os.remove(config_path)
+
+    print_table(
+        ["node", "batch", "res", "img/s", "call p50", "call p95", "call p99", "req p50", "req p95", "fail", "peak RSS MB", "threads"],
+        [
+            [r["node"], r["batch"], r["resolution"], r["images_per_s"], r["call_p50_ms"], r["call_p95_ms"], r["call_p99_ms"],
+             r["request_p50_ms"], r["request_p95_ms"], r["failures"], r["peak_rss_mb"], r["peak_threads"]]
+            for r in results
+        ],
+    )
+    print(f"\nlatencies in milliseconds; mock server: {server.stats['requests']} requests, {server.stats['errors']} injected errors")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
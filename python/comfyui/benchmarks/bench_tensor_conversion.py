@@ -0,0 +1,54 @@
+"""Compare tensor <-> PIL conversion paths across batch sizes and resolutions.
+
+Usage: python benchmarks/bench_tensor_conversion.py [--repeat N]
+"""
+
+import argparse
+
+import numpy as np
+import torch
+from PIL import Image
+
+from common import load_plugin_module, print_table, time_call
+
+
+BATCH_SIZES = [1, 8, 32]
+SIZES = [(1024, 1024), (2048, 2048)]
+
+
+def legacy_tensor_to_pil_list(image_tensor):
+    arr = (image_tensor.detach().cpu().clamp(0.0, 1.0).numpy() * 255.0).astype(np.uint8)
+    return [Image.fromarray(arr[i], mode="RGB") for i in range(arr.shape[0])]
+
+
+def legacy_pil_list_to_tensor(images):
+    return torch.stack([torch.from_numpy(np.array(img).astype(np.float32) / 255.0) for img in images], dim=0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    image_io = load_plugin_module("utils.image_io")
+
+    rows = []
+    for width, height in SIZES:
+        for batch in BATCH_SIZES:
+            tensor = torch.rand(batch, height, width, 3)
+            images = image_io.tensor_to_pil_list(tensor)
+            rows.append([
+                f"{batch}x{width}x{height}",
+                time_call(lambda: legacy_tensor_to_pil_list(tensor), repeat=args.repeat)["median_ms"],
+                time_call(lambda: image_io.tensor_to_pil_list(tensor), repeat=args.repeat)["median_ms"],
+                time_call(lambda: legacy_pil_list_to_tensor(images), repeat=args.repeat)["median_ms"],
+                time_call(lambda: image_io.pil_list_to_tensor(images), repeat=args.repeat)["median_ms"],
+            ])
+            del tensor, images
+
+    print_table(["batch", "to_pil (old)", "to_pil", "to_tensor (old)", "to_tensor"], rows)
+    print("\nmedian milliseconds per batch")
+
+
+if __name__ == "__main__":
+    main()
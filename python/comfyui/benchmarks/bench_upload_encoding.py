@@ -0,0 +1,64 @@
+"""Report encode time and base64 payload size per upload format.
+
+Usage: python benchmarks/bench_upload_encoding.py [--image photo.jpg] [--repeat N]
+
+Without --image a synthetic photo-like image (gradients plus sensor noise) is used; results
+on real catalog photos are more representative.
+"""
+
+import argparse
+import base64
+
+import numpy as np
+from PIL import Image
+
+from common import load_plugin_module, print_table, time_call
+
+
+SIZES = [(1024, 1024), (2048, 2048)]
+
+
+def synthetic_photo(width: int, height: int) -> Image.Image:
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([x / width, y / height, (x + y) / (width + height)], axis=-1) * 200.0 + 20.0
+    noise = rng.normal(0.0, 6.0, base.shape)
+    return Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8), mode="RGB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--image", help="optional real image to encode")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    image_io = load_plugin_module("utils.image_io")
+    encodings = [
+        ("png level 6 (default)", image_io.ImageEncoding("png", compress_level=6)),
+        ("png level 1", image_io.ImageEncoding("png", compress_level=1)),
+        ("webp lossless", image_io.ImageEncoding("webp_lossless", quality=50)),
+        ("jpeg q95", image_io.ImageEncoding("jpeg", quality=95)),
+        ("jpeg q85", image_io.ImageEncoding("jpeg", quality=85)),
+        ("webp q90", image_io.ImageEncoding("webp", quality=90)),
+        ("webp q80", image_io.ImageEncoding("webp", quality=80)),
+    ]
+
+    sources = []
+    if args.image:
+        img = Image.open(args.image).convert("RGB")
+        sources.append((f"{args.image} {img.width}x{img.height}", img))
+    else:
+        sources.extend((f"synthetic {w}x{h}", synthetic_photo(w, h)) for w, h in SIZES)
+
+    for label, img in sources:
+        rows = []
+        for name, encoding in encodings:
+            timing = time_call(lambda: encoding.encode(img), repeat=args.repeat)
+            payload = base64.b64encode(encoding.encode(img))
+            rows.append([name, encoding.mime_type, timing["median_ms"], len(payload) / 1024.0])
+        print(f"\n{label}")
+        print_table(["encoding", "mime", "encode ms", "base64 KiB"], rows)
+
+
+if __name__ == "__main__":
+    main()
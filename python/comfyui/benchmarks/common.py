@@ -0,0 +1,49 @@
+"""Shared helpers for the benchmark scripts in this folder."""
+
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.plugin_loader import load_plugin_module  # noqa: E402
+
+
+# Environment variables that would override a temporary plugin config (and could reach the real API
+# or write to the user's job journal)
+OVERRIDING_ENV = [
+    "GOOGLE_API_KEY", "GEMINI_API_KEY", "GOOGLE_API_URL", "GEMINI_API_URL", "GOOGLE_API_BASE_URL",
+    "GEMINI_API_BASE_URL", "GEMINI_AUTH_HEADER_NAME", "GEMINI_AUTH_HEADER_VALUE", "GEMINI_QUERY_PARAM_NAME",
+    "GEMINI_JOB_JOURNAL_DIR",
+]
+
+
+def use_isolated_config(config_path: str) -> None:
+    """Make the plugin (imported afterwards) read only ``config_path``, with the disk result cache off."""
+    for name in OVERRIDING_ENV:
+        os.environ.pop(name, None)
+    os.environ["GEMINI_CONFIG_PATH"] = config_path
+    os.environ["GEMINI_RESULT_CACHE_DIR"] = ""
+
+
+def time_call(fn: Callable[[], object], repeat: int = 5, warmup: int = 1) -> Dict[str, float]:
+    """Run ``fn`` several times and return min/median timings in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return {"min_ms": min(samples), "median_ms": statistics.median(samples)}
+
+
+def print_table(headers: List[str], rows: List[List[object]]) -> None:
+    cells = [[str(h) for h in headers]] + [[f"{c:.2f}" if isinstance(c, float) else str(c) for c in row] for row in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+    for n, row in enumerate(cells):
+        print("  ".join(cell.rjust(widths[i]) for i, cell in enumerate(row)))
+        if n == 0:
+            print("  ".join("-" * w for w in widths))
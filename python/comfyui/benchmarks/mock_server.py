@@ -0,0 +1,222 @@
+"""Local mock of the Gemini ``generateContent`` endpoint for offline benchmarks.
+
+Every request gets a PNG of ``--image-size`` after a latency drawn from ``--latency``; a fraction
+``--error-rate`` of requests fails with 503 instead. ``streamGenerateContent?alt=sse`` is answered
+as a single server-sent event.
+
+Tests script exact sequences instead: ``script()`` queues responses (``ok()``/``error()``, each with
+an optional delay) that are served in order before the random ones, ``delay`` overrides the latency,
+and ``peers`` records the client address of every request so retries and TCP connections can be
+counted.
+
+Latency specs: ``fixed:S``, ``uniform:MIN:MAX`` or ``lognormal:MEDIAN:SIGMA`` (seconds).
+
+Usage: python benchmarks/mock_server.py [--port 8765] [--latency lognormal:1.5:0.4] [--error-rate 0.02]
+"""
+
+import argparse
+import base64
+import collections
+import io
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Build a sampler (seconds) from ``fixed:S``, ``uniform:MIN:MAX`` or ``lognormal:MEDIAN:SIGMA``."""
+    kind, _, rest = spec.partition(":")
+    args = [float(v) for v in rest.split(":") if v]
+    if kind == "fixed" and len(args) == 1:
+        return lambda rng: args[0]
+    if kind == "uniform" and len(args) == 2:
+        return lambda rng: rng.uniform(args[0], args[1])
+    if kind == "lognormal" and len(args) == 2:
+        return lambda rng: rng.lognormvariate(math.log(args[0]), args[1])
+    raise ValueError(f"Invalid latency spec '{spec}', expected fixed:S, uniform:MIN:MAX or lognormal:MEDIAN:SIGMA")
+
+
+def parse_size(spec: str) -> Tuple[int, int]:
+    width, _, height = spec.lower().partition("x")
+    return int(width), int(height or width)
+
+
+def make_png(size: Tuple[int, int], seed: int = 0) -> bytes:
+    """Noise PNG; noise does not compress, so the payload is about as large as a real photo's."""
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels, mode="RGB").save(buf, format="PNG", compress_level=1)
+    return buf.getvalue()
+
+
+# (status, headers, body, seconds to hold it back or None for the server's latency)
+Response = Tuple[int, Dict[str, str], bytes, Optional[float]]
+
+
+class MockGeminiServer:
+    """Threaded HTTP server answering Gemini image requests; use as a context manager."""
+
+    def __init__(
+        self,
+        latency: str = "fixed:0.5",
+        error_rate: float = 0.0,
+        image_size: Tuple[int, int] = (1024, 1024),
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int = 0,
+    ):
+        self._sample_latency = parse_latency(latency)
+        self._error_rate = float(error_rate)
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.png = make_png(image_size, seed)
+        image = base64.b64encode(self.png).decode("ascii")
+        self._ok_body = json.dumps(
+            {"candidates": [{"content": {"parts": [{"inline_data": {"mime_type": "image/png", "data": image}}]}, "finishReason": "STOP"}]}
+        ).encode("utf-8")
+        self._error_body = json.dumps({"error": {"code": 503, "message": "mock overload", "status": "UNAVAILABLE"}}).encode("utf-8")
+        self.stats = {"requests": 0, "errors": 0}
+        # Client (host, port) of every request, in arrival order
+        self.peers: List[Tuple[str, int]] = []
+        # Seconds every response is held back; None samples ``latency``
+        self.delay: Optional[float] = None
+        self._script = collections.deque()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def endpoint_template(self) -> str:
+        return self.url + "/v1beta/models/{model}:generateContent"
+
+    @property
+    def requests(self) -> int:
+        return len(self.peers)
+
+    @property
+    def connections(self) -> int:
+        """Distinct TCP connections the requests arrived on."""
+        return len(set(self.peers))
+
+    def script(self, *responses: Response) -> None:
+        """Queue responses for the next requests, in arrival order."""
+        with self._rng_lock:
+            self._script.extend(responses)
+
+    def ok(self, delay: Optional[float] = None) -> Response:
+        return 200, {}, self._ok_body, delay
+
+    @staticmethod
+    def error(status: int, retry_after: Optional[str] = None, delay: Optional[float] = None) -> Response:
+        headers = {"Retry-After": retry_after} if retry_after is not None else {}
+        return status, headers, json.dumps({"error": {"code": status, "message": f"mock {status}"}}).encode("utf-8"), delay
+
+    def reset(self) -> None:
+        """Drop the script, recorded peers, delay override and counters."""
+        with self._rng_lock:
+            self._script.clear()
+            self.peers.clear()
+            self.delay = None
+            self.stats = {"requests": 0, "errors": 0}
+
+    def _next(self, peer: Tuple[str, int]) -> Response:
+        # Taken on arrival, so a cancelled slow request cannot consume a later scripted response
+        with self._rng_lock:
+            self.stats["requests"] += 1
+            self.peers.append(peer)
+            delay = self.delay if self.delay is not None else max(0.0, self._sample_latency(self._rng))
+            if self._script:
+                response = self._script.popleft()
+            elif self._rng.random() < self._error_rate:
+                response = 503, {}, self._error_body, None
+            else:
+                response = self.ok()
+            if response[0] != 200:
+                self.stats["errors"] += 1
+            return response[:3] + (delay if response[3] is None else response[3],)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                status, headers, body, delay = server._next(self.client_address[:2])
+                time.sleep(delay)
+                content_type = "application/json"
+                if status == 200 and "alt=sse" in self.path:
+                    body, content_type = b"data: " + body + b"\r\n\r\n", "text/event-stream"
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", content_type)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client cancelled (timeout, interrupt or a hedged duplicate that lost)
+                    pass
+
+        return Handler
+
+    def start(self) -> "MockGeminiServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-gemini", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve in the calling thread until interrupted."""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockGeminiServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="lognormal:1.5:0.4")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--image-size", default="1024x1024")
+    args = parser.parse_args()
+
+    server = MockGeminiServer(args.latency, args.error_rate, parse_size(args.image_size), args.host, args.port)
+    print(f"Mock Gemini endpoint: {server.endpoint_template}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,132 @@
+import asyncio
 import base64
+import concurrent.futures
 import json
+import math
 import os
-from typing import List, Optional
+import random
+import threading
+import time
+import uuid
+from email.utils import parsedate_to_datetime
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Union
+from urllib.parse import urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
 from PIL import Image
 
+from .utils.event_loop import GLOBAL_EVENT_LOOP
+from .utils.hedging import HedgeTracker
+from .utils.image_io import UPLOAD_FORMATS, ImageEncoding, PreparedImage, as_prepared
+from .utils.load_balancer import LoadBalancer
+from .utils.metrics import GLOBAL_METRICS, current_node
+from .utils.rate_limit import RateLimitExceeded, RequestGovernor
+from .utils.response_stream import StreamingImageExtractor
+
+try:
+    import aiohttp
+except Exception:  # pragma: no cover - falls back to the pooled requests session
+    aiohttp = None
 
 DEFAULT_API_BASE_URL = "https://generativelanguage.googleapis.com"
 
+# Connection pool defaults; override via gemini_config.json or configure_http_pool()
+DEFAULT_POOL_CONNECTIONS = 4
+DEFAULT_POOL_MAXSIZE = 16
+DEFAULT_POOL_BLOCK = True
+DEFAULT_KEEP_ALIVE = True
+
+# How response bodies are read (config ``response_mode``):
+# - stream: read the generateContent body in chunks and decode the image as it arrives
+# - buffered: read the whole body, then parse it as JSON
+# - sse: call streamGenerateContent (?alt=sse) and decode the image from the event stream
+RESPONSE_MODES = ["stream", "buffered", "sse"]
+DEFAULT_RESPONSE_MODE = "stream"
+RESPONSE_CHUNK_SIZE = 64 * 1024
+
+# Retry defaults; override via gemini_config.json (retry_max_attempts, retry_backoff_base, ...)
+DEFAULT_RETRY_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_BACKOFF_BASE = 1.0
+DEFAULT_RETRY_BACKOFF_MAX = 20.0
+DEFAULT_RETRY_JITTER = 0.5
+DEFAULT_RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+# Do not start another attempt with less time than this left before the deadline
+MIN_ATTEMPT_SECONDS = 1.0
+
+# Token estimates for the tokens/minute limiter: each input image costs 258 tokens per
+# 768x768 tile (one tile up to 384px), a generated image about 1290 tokens, text ~4 chars/token
+IMAGE_TILE_SIZE = 768
+IMAGE_TILE_TOKENS = 258
+OUTPUT_IMAGE_TOKENS = 1290
+
+# Multi-key / multi-endpoint balancing defaults (config ``load_balancing``, ``backend_eject_seconds``,
+# ``backend_max_eject_seconds``); auth failures eject a backend for the maximum time
+DEFAULT_LOAD_BALANCING = "round_robin"
+DEFAULT_BACKEND_EJECT_SECONDS = 30.0
+DEFAULT_BACKEND_MAX_EJECT_SECONDS = 300.0
+AUTH_ERROR_STATUSES = (401, 403)
+
+# Hedged requests (opt-in with config ``hedging: true``): after the ``hedge_percentile`` latency
+# a duplicate request is sent and the first response wins; ``hedge_max_rate`` caps the share of
+# requests that may be duplicated
+DEFAULT_HEDGE_PERCENTILE = 95.0
+DEFAULT_HEDGE_MIN_DELAY = 2.0
+DEFAULT_HEDGE_MIN_SAMPLES = 20
+DEFAULT_HEDGE_MAX_RATE = 0.1
+
+# How often a blocked caller checks its cancel_check (e.g. the ComfyUI interrupt flag)
+CANCEL_POLL_INTERVAL = 0.2
+
+
+# Request images may be plain PIL images or PreparedImage objects with memoized encodings
+ImageInput = Union[Image.Image, PreparedImage]
+
 
 class GeminiAPIError(RuntimeError):
-    pass
+    """Error from the Gemini API or the transport.
+
+    ``status_code`` is the HTTP status (None when no response was received), ``retry_after``
+    the server's Retry-After hint in seconds and ``transient`` marks network errors and
+    timeouts that may succeed when retried. ``ejected`` is set when the failing backend (key or
+    endpoint) was taken out of load-balancing rotation.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+        transient: bool = False,
+    ):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.transient = transient
+        self.ejected = False
+
+
+class GeminiRequestCancelled(GeminiAPIError):
+    """The request was cancelled (e.g. the ComfyUI prompt was interrupted) before it finished."""
 
 
 def _plugin_dir() -> str:
     return os.path.dirname(__file__)
 
 
+def _config_path() -> str:
+    """``GEMINI_CONFIG_PATH`` selects another config file (e.g. for benchmarks or batch jobs)."""
+    return os.environ.get("GEMINI_CONFIG_PATH") or os.path.join(_plugin_dir(), "gemini_config.json")
+
+
+def _key_file_path() -> str:
+    return os.path.join(_plugin_dir(), "gemini_api_key.txt")
+
+
 def _load_config() -> Optional[dict]:
-    cfg_path = os.path.join(_plugin_dir(), "gemini_config.json")
+    cfg_path = _config_path()
     if os.path.exists(cfg_path):
         try:
             with open(cfg_path, "r", encoding="utf-8") as f:
@@ -30,67 +137,164 @@ def _load_config() -> Optional[dict]:
     return None
 
 
-def _get_api_key() -> str:
-    # 1) Environment variables override
-    key = os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")
-    if key:
-        return key
-
-    # 2) Config file
-    cfg = _load_config() or {}
-    key = cfg.get("api_key")
-    if key:
-        return key
-
-    # 3) Legacy local text file
-    local_key_file = os.path.join(_plugin_dir(), "gemini_api_key.txt")
+def _read_key_file() -> Optional[str]:
+    local_key_file = _key_file_path()
     if os.path.exists(local_key_file):
         with open(local_key_file, "r", encoding="utf-8") as f:
             content = f.read().strip()
             if content:
                 return content
+    return None
 
-    raise GeminiAPIError(
-        "Google Gemini API key not found. Provide it via environment variable 'GOOGLE_API_KEY' (or 'GEMINI_API_KEY'),"
-        " config file 'gemini_config.json' (field 'api_key'), or a 'gemini_api_key.txt' file in the plugin directory."
-    )
 
+@dataclass(frozen=True)
+class GeminiClientConfig:
+    """Endpoint/auth settings resolved once from env vars, gemini_config.json and gemini_api_key.txt.
 
-def _get_base_url() -> str:
-    # 2) Base URL via env
-    base = os.environ.get("GOOGLE_API_BASE_URL") or os.environ.get("GEMINI_API_BASE_URL")
-    if base:
-        return base
+    Precedence for every field is: environment variable > config file > legacy key file / default.
+    """
 
-    # 3) Config file base URL
-    cfg = _load_config() or {}
-    base = cfg.get("base_url")
-    if base:
-        return base
+    api_key: Optional[str]
+    base_url: str
+    endpoint_template: Optional[str]
+    auth_header_name: Optional[str]
+    auth_header_value_template: Optional[str]
+    query_param_name: str
+    extra_headers: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))
+    raw: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
 
-    # 4) Default
-    return DEFAULT_API_BASE_URL
+    def get(self, name: str, default: Any = None) -> Any:
+        """Read an arbitrary option from the config file."""
+        value = self.raw.get(name)
+        return default if value is None else value
 
+    def require_api_key(self) -> str:
+        if self.api_key:
+            return self.api_key
+        raise GeminiAPIError(
+            "Google Gemini API key not found. Provide it via environment variable 'GOOGLE_API_KEY' (or 'GEMINI_API_KEY'),"
+            " config file 'gemini_config.json' (field 'api_key'), or a 'gemini_api_key.txt' file in the plugin directory."
+        )
 
-def _build_full_endpoint(model: str) -> str:
-    # 1) Full URL override via env (highest precedence)
-    env_url = os.environ.get("GOOGLE_API_URL") or os.environ.get("GEMINI_API_URL")
-    if env_url:
-        return env_url.format(model=model)
+    def endpoint(self, model: str) -> str:
+        if self.endpoint_template:
+            return self.endpoint_template.format(model=model)
+        return f"{self.base_url.rstrip('/')}/v1beta/models/{model}:generateContent"
 
-    # 2) Config explicit endpoint template
+    def apply_auth(self, headers: dict, params: dict, api_key: str) -> None:
+        headers.update(self.extra_headers)
+        if self.auth_header_name and self.auth_header_value_template:
+            headers[self.auth_header_name] = self.auth_header_value_template.format(api_key=api_key)
+            return
+        params[self.query_param_name] = api_key
+
+
+def _resolve_config() -> GeminiClientConfig:
     cfg = _load_config() or {}
+
+    api_key = (
+        os.environ.get("GOOGLE_API_KEY")
+        or os.environ.get("GEMINI_API_KEY")
+        or cfg.get("api_key")
+        or _read_key_file()
+    )
+    base_url = (
+        os.environ.get("GOOGLE_API_BASE_URL")
+        or os.environ.get("GEMINI_API_BASE_URL")
+        or cfg.get("base_url")
+        or DEFAULT_API_BASE_URL
+    )
     endpoint_template = (
-        cfg.get("endpoint_template")
+        os.environ.get("GOOGLE_API_URL")
+        or os.environ.get("GEMINI_API_URL")
+        or cfg.get("endpoint_template")
         or cfg.get("endpoint")
         or cfg.get("full_url")
     )
-    if endpoint_template:
-        return str(endpoint_template).format(model=model)
 
-    # 3) Build from base URL
-    base = _get_base_url().rstrip("/")
-    return f"{base}/v1beta/models/{model}:generateContent"
+    extra_headers = cfg.get("extra_headers") or {}
+    if not isinstance(extra_headers, dict):
+        extra_headers = {}
+
+    # Header auth: env pair wins over config pair; otherwise fall back to a query param
+    hdr_name = os.environ.get("GEMINI_AUTH_HEADER_NAME")
+    hdr_value_tmpl = os.environ.get("GEMINI_AUTH_HEADER_VALUE")
+    if not (hdr_name and hdr_value_tmpl):
+        hdr_name = cfg.get("auth_header_name")
+        hdr_value_tmpl = cfg.get("auth_header_value_template")
+    if not (hdr_name and hdr_value_tmpl):
+        hdr_name = hdr_value_tmpl = None
+
+    return GeminiClientConfig(
+        api_key=api_key or None,
+        base_url=str(base_url),
+        endpoint_template=str(endpoint_template) if endpoint_template else None,
+        auth_header_name=str(hdr_name) if hdr_name else None,
+        auth_header_value_template=str(hdr_value_tmpl) if hdr_value_tmpl else None,
+        query_param_name=str(os.environ.get("GEMINI_QUERY_PARAM_NAME") or cfg.get("query_param_name") or "key"),
+        extra_headers=MappingProxyType({str(k): str(v) for k, v in extra_headers.items()}),
+        raw=MappingProxyType(dict(cfg)),
+    )
+
+
+def _config_files_signature() -> Tuple[Optional[int], Optional[int]]:
+    signature = []
+    for path in (_config_path(), _key_file_path()):
+        try:
+            signature.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+# Seconds between mtime checks of the config files; calls in between touch no files at all
+CONFIG_RECHECK_INTERVAL = 2.0
+
+_config_lock = threading.Lock()
+_config: Optional[GeminiClientConfig] = None
+_config_signature: Optional[Tuple[Optional[int], Optional[int]]] = None
+_config_checked_at = 0.0
+
+
+def get_client_config() -> GeminiClientConfig:
+    """Return the cached client config, rebuilding it when the config files changed on disk.
+
+    File modification times are checked at most every ``CONFIG_RECHECK_INTERVAL`` seconds.
+    """
+    global _config, _config_signature, _config_checked_at
+    now = time.monotonic()
+    config = _config
+    if config is not None and now - _config_checked_at < CONFIG_RECHECK_INTERVAL:
+        return config
+    with _config_lock:
+        if _config is not None and now - _config_checked_at < CONFIG_RECHECK_INTERVAL:
+            return _config
+        signature = _config_files_signature()
+        if _config is None or signature != _config_signature:
+            _config = _resolve_config()
+            _config_signature = signature
+        _config_checked_at = now
+        return _config
+
+
+def reload_client_config() -> GeminiClientConfig:
+    """Force the config to be re-read from env vars and disk (e.g. after changing env vars)."""
+    global _config
+    with _config_lock:
+        _config = None
+    return get_client_config()
+
+
+def _get_api_key() -> str:
+    return get_client_config().require_api_key()
+
+
+def _get_base_url() -> str:
+    return get_client_config().base_url
+
+
+def _build_full_endpoint(model: str) -> str:
+    return get_client_config().endpoint(model)
 
 
 def _apply_auth(headers: dict, params: dict, api_key: str) -> None:
@@ -102,46 +306,198 @@ def _apply_auth(headers: dict, params: dict, api_key: str) -> None:
     - Query param (env GEMINI_QUERY_PARAM_NAME) or config (query_param_name)
     - Default query param 'key'
     """
-    cfg = _load_config() or {}
+    get_client_config().apply_auth(headers, params, api_key)
 
-    # Extra headers from config
-    extra_headers = cfg.get("extra_headers") or {}
-    if isinstance(extra_headers, dict):
-        headers.update({str(k): str(v) for k, v in extra_headers.items()})
-
-    # Auth via header (env)
-    env_hdr_name = os.environ.get("GEMINI_AUTH_HEADER_NAME")
-    env_hdr_value = os.environ.get("GEMINI_AUTH_HEADER_VALUE")
-    if env_hdr_name and env_hdr_value:
-        headers[str(env_hdr_name)] = env_hdr_value.format(api_key=api_key)
-        return
-
-    # Auth via header (config)
-    hdr_name = cfg.get("auth_header_name")
-    hdr_value_tmpl = cfg.get("auth_header_value_template")
-    if hdr_name and hdr_value_tmpl:
-        headers[str(hdr_name)] = str(hdr_value_tmpl).format(api_key=api_key)
-        return
-
-    # Auth via query param (env or config)
-    query_param = os.environ.get("GEMINI_QUERY_PARAM_NAME") or cfg.get("query_param_name") or "key"
-    params[str(query_param)] = api_key
-
-
-def _encode_image_to_base64(img: Image.Image) -> dict:
-    from .utils.image_io import pil_to_png_bytes
-
-    png_bytes = pil_to_png_bytes(img)
-    return {
-        "mime_type": "image/png",
-        "data": base64.b64encode(png_bytes).decode("utf-8"),
+
+_session_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_pool_overrides: dict = {}
+# Threads of the requests transport, sized like the connection pool; rebuilt with the session
+_http_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+# Payload serialization and response parsing, kept off both the event loop and the HTTP threads
+_cpu_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=min(32, (os.cpu_count() or 1) + 4), thread_name_prefix="gemini-parse"
+)
+
+
+def _pool_options() -> dict:
+    """Resolve pool options: configure_http_pool() overrides > config file > defaults."""
+    cfg = get_client_config()
+    opts = {
+        "pool_connections": cfg.get("pool_connections", DEFAULT_POOL_CONNECTIONS),
+        "pool_maxsize": cfg.get("pool_maxsize", DEFAULT_POOL_MAXSIZE),
+        "pool_block": cfg.get("pool_block", DEFAULT_POOL_BLOCK),
+        "keep_alive": cfg.get("keep_alive", DEFAULT_KEEP_ALIVE),
     }
+    opts.update(_pool_overrides)
+    opts["pool_connections"] = max(1, int(opts["pool_connections"]))
+    opts["pool_maxsize"] = max(1, int(opts["pool_maxsize"]))
+    opts["pool_block"] = bool(opts["pool_block"])
+    opts["keep_alive"] = bool(opts["keep_alive"])
+    return opts
+
 
+def get_http_session() -> requests.Session:
+    """Return the process-wide pooled session shared by all nodes.
 
-def _build_payload(prompt: str, images: List[Image.Image], seed: Optional[int] = None) -> dict:
+    The session keeps connections alive between calls so consecutive generations reuse
+    the TCP/TLS connection to the endpoint instead of paying a new handshake each time.
+    ``pool_connections`` is the number of hosts kept in the pool, ``pool_maxsize`` the
+    maximum connections per host; with ``pool_block`` callers wait for a free connection
+    instead of opening extra ones beyond that limit.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            opts = _pool_options()
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=opts["pool_connections"],
+                pool_maxsize=opts["pool_maxsize"],
+                pool_block=opts["pool_block"],
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            if not opts["keep_alive"]:
+                session.headers["Connection"] = "close"
+            _session = session
+        return _session
+
+
+def _get_http_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """Threads that run blocking ``requests`` calls: one per connection the pool can hold
+    (``pool_connections`` hosts x ``pool_maxsize``), so the pool, not the thread count, limits
+    concurrency."""
+    global _http_executor
+    with _session_lock:
+        if _http_executor is None:
+            opts = _pool_options()
+            _http_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=opts["pool_connections"] * opts["pool_maxsize"], thread_name_prefix="gemini-http"
+            )
+        return _http_executor
+
+
+def configure_http_pool(
+    pool_connections: Optional[int] = None,
+    pool_maxsize: Optional[int] = None,
+    pool_block: Optional[bool] = None,
+    keep_alive: Optional[bool] = None,
+) -> None:
+    """Override pool options at runtime. The shared session and its threads are rebuilt on next use."""
+    updates = {
+        "pool_connections": pool_connections,
+        "pool_maxsize": pool_maxsize,
+        "pool_block": pool_block,
+        "keep_alive": keep_alive,
+    }
+    with _session_lock:
+        _pool_overrides.update({k: v for k, v in updates.items() if v is not None})
+    close_http_session()
+
+
+def close_http_session() -> None:
+    """Close the shared sessions (sync and async) and all pooled connections."""
+    global _session, _http_executor
+    with _session_lock:
+        session, _session = _session, None
+        executor, _http_executor = _http_executor, None
+    if executor is not None:
+        # Calls already running finish on the old threads
+        executor.shutdown(wait=False)
+    if session is not None:
+        session.close()
+    if _async_session is not None and not GLOBAL_EVENT_LOOP.in_loop_thread():
+        GLOBAL_EVENT_LOOP.run(_close_async_session(), timeout=10)
+
+
+def get_http_pool_stats() -> dict:
+    """Snapshot of the shared connection pool.
+
+    ``connections_opened`` counts connections ever created per host and ``requests`` the
+    requests sent through them, so ``requests - connections_opened`` is the number of
+    requests that reused a kept-alive connection.
+    """
+    with _session_lock:
+        session = _session
+        opts = _pool_options()
+    stats = {
+        "options": opts,
+        "transport": "aiohttp" if _use_aiohttp() else "requests",
+        "async": dict(_async_stats),
+        "hosts": {},
+    }
+    if session is None:
+        return stats
+    adapter = session.get_adapter("https://")
+    manager = adapter.poolmanager
+    for key in list(manager.pools.keys()):
+        pool = manager.pools.get(key)
+        if pool is None:
+            continue
+        host = f"{pool.scheme}://{pool.host}:{pool.port}"
+        # The queue is pre-filled with None placeholders; only real entries are idle connections
+        idle = sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool is not None else 0
+        stats["hosts"][host] = {
+            "connections_opened": pool.num_connections,
+            "requests": pool.num_requests,
+            "idle_connections": idle,
+            "max_connections": opts["pool_maxsize"],
+        }
+    return stats
+
+
+def get_upload_encoding(
+    format_name: Optional[str] = None,
+    quality: Optional[int] = None,
+    max_edge: Optional[int] = None,
+) -> ImageEncoding:
+    """Resolve the upload encoding: explicit arguments (per node) > config file > PNG default.
+
+    Config fields: ``upload_format`` (png / jpeg / webp / webp_lossless), ``upload_quality``
+    (1-100, jpeg/webp), ``upload_png_compress_level`` (0-9) and the downscale limits
+    ``upload_max_edge`` (pixels) / ``upload_max_megapixels`` (0 = off).
+    """
+    cfg = get_client_config()
+    if not format_name or format_name not in UPLOAD_FORMATS:
+        format_name = str(cfg.get("upload_format", "png")).lower()
+    if not quality:
+        quality = cfg.get("upload_quality", 90)
+    if not max_edge:
+        max_edge = cfg.get("upload_max_edge", 0)
+    try:
+        return ImageEncoding(
+            format=format_name,
+            quality=max(1, min(100, int(quality))),
+            compress_level=max(0, min(9, int(cfg.get("upload_png_compress_level", 6)))),
+            max_edge=max(0, int(max_edge)),
+            max_megapixels=max(0.0, float(cfg.get("upload_max_megapixels", 0))),
+        )
+    except ValueError as ex:
+        raise GeminiAPIError(f"Invalid upload encoding: {ex}")
+
+
+RESTORE_SIZE_MODES = ["global", "on", "off"]
+
+
+def restore_input_size_enabled(override: Union[None, bool, str] = None) -> bool:
+    """Whether nodes scale results back to the input size (node input > config ``restore_input_size``).
+
+    ``override`` is ``"on"`` / ``"off"`` (or a bool, as saved by older workflows); None or
+    ``"global"`` inherits the config.
+    """
+    if isinstance(override, str):
+        override = {"on": True, "true": True, "off": False, "false": False}.get(override.strip().lower())
+    if override is not None:
+        return bool(override)
+    return bool(get_client_config().get("restore_input_size", False))
+
+
+def _build_payload(prompt: str, inline_data: List[dict], seed: Optional[int] = None) -> dict:
+    """Request body with one ``inline_data`` part ({mime_type, data}) per input image."""
     parts: List[dict] = [{"text": prompt}]
-    for img in images:
-        parts.append({"inline_data": _encode_image_to_base64(img)})
+    for data in inline_data:
+        parts.append({"inline_data": data})
     generation_config = {
         "response_mime_type": "image/png",
     }
@@ -167,6 +523,38 @@ def _build_payload(prompt: str, images: List[Image.Image], seed: Optional[int] =
     return payload
 
 
+def _serialize_payload(prompt: str, images: List[ImageInput], seed: Optional[int] = None) -> bytes:
+    """Serialize the request body to JSON bytes.
+
+    The memoized base64 of each image is spliced into the output instead of passing
+    multi-megabyte strings through json.dumps (base64 never needs JSON escaping).
+    """
+    encoding = get_upload_encoding()
+    prepared = [as_prepared(img, encoding=encoding) for img in images]
+    # Encoded bytes and base64 are memoized per image; repeats of a shared input cost ~0 here
+    with GLOBAL_METRICS.span("encode"):
+        for p in prepared:
+            p.encoded()
+    with GLOBAL_METRICS.span("base64"):
+        for p in prepared:
+            p.base64()
+    token = uuid.uuid4().hex
+    placeholders = [f"{token}-{i}" for i in range(len(prepared))]
+    inline_data = [{"mime_type": p.mime_type, "data": ph} for p, ph in zip(prepared, placeholders)]
+    with GLOBAL_METRICS.span("serialize"):
+        body = json.dumps(_build_payload(prompt, inline_data, seed=seed)).encode("utf-8")
+
+        chunks: List[bytes] = []
+        pos = 0
+        for p, ph in zip(prepared, placeholders):
+            idx = body.index(ph.encode("ascii"), pos)
+            chunks.append(body[pos:idx])
+            chunks.append(p.base64())
+            pos = idx + len(ph)
+        chunks.append(body[pos:])
+        return b"".join(chunks)
+
+
 def _extract_image_bytes_from_response(resp_json: dict) -> bytes:
     import re
 
@@ -223,50 +611,744 @@ def _extract_image_bytes_from_response(resp_json: dict) -> bytes:
     )
 
 
-def call_gemini_generate_image(
-    prompt: str,
-    images: List[Image.Image],
-    model: str = "gemini-2.5-flash-image-preview",
-    api_key: Optional[str] = None,
-    timeout: float = 60.0,
-    seed: Optional[int] = None,
-) -> bytes:
-    """Call Gemini API to generate an image response from prompt + images.
+@dataclass(frozen=True)
+class _GeminiRequest:
+    """A serialized request; ``url``/``headers``/``params`` are filled in by ``_route`` per attempt."""
+
+    model: str
+    body: bytes
+    mode: str = "buffered"
+    estimated_tokens: int = 0
+    # Key passed explicitly by the caller; replaces the configured keys
+    api_key: Optional[str] = None
+    url: str = ""
+    headers: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))
+    params: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))
+    # Node type that issued the request, for the latency metrics
+    node: str = ""
+    # Balancer picked when the request was prepared; every attempt goes through it
+    balancer: Optional[LoadBalancer] = field(default=None, compare=False, repr=False)
+
+    @property
+    def endpoint(self) -> str:
+        """Host of the routed URL; used as the metrics label (never includes the key)."""
+        return urlparse(self.url).netloc
+
+
+@dataclass(frozen=True)
+class _Backend:
+    """One endpoint + API key combination that requests can be routed to."""
+
+    name: str
+    config: GeminiClientConfig
+    api_key: str
+
+
+def _unique(*groups) -> List[str]:
+    """Non-empty values of the given items/lists, de-duplicated in order."""
+    values = []
+    for group in groups:
+        values.extend(group if isinstance(group, (list, tuple)) else [group])
+    return list(dict.fromkeys(str(v) for v in values if v))
+
+
+def _config_list(value: Any, name: str, item_types: Tuple[type, ...]) -> list:
+    """A config option that takes a single value or a list of them, as a list."""
+    if value is None or value == "":
+        return []
+    if isinstance(value, item_types):
+        return [value]
+    expected = " or ".join(t.__name__ for t in item_types)
+    if not isinstance(value, (list, tuple)):
+        raise GeminiAPIError(f"Invalid '{name}' in gemini_config.json: expected a list of {expected}, got {type(value).__name__}")
+    for item in value:
+        if not isinstance(item, item_types):
+            raise GeminiAPIError(f"Invalid '{name}' entry in gemini_config.json: expected {expected}, got {type(item).__name__}")
+    return list(value)
 
-    Returns PNG bytes on success, raises GeminiAPIError on failure.
+
+def _endpoint_config(config: GeminiClientConfig, endpoint: Any) -> GeminiClientConfig:
+    """Config for one entry of ``endpoints``: a base URL, an endpoint template containing
+    ``{model}``, or an object overriding base_url/endpoint_template/auth/extra_headers."""
+    if isinstance(endpoint, str):
+        endpoint = {"endpoint_template": endpoint} if "{model}" in endpoint else {"base_url": endpoint}
+    template = endpoint.get("endpoint_template") or endpoint.get("endpoint")
+    if not template and not endpoint.get("base_url"):
+        template = config.endpoint_template
+    extra_headers = endpoint.get("extra_headers")
+    if isinstance(extra_headers, dict):
+        extra_headers = MappingProxyType({**config.extra_headers, **{str(k): str(v) for k, v in extra_headers.items()}})
+    else:
+        extra_headers = config.extra_headers
+    return replace(
+        config,
+        base_url=str(endpoint.get("base_url") or config.base_url),
+        endpoint_template=str(template) if template else None,
+        auth_header_name=endpoint.get("auth_header_name", config.auth_header_name),
+        auth_header_value_template=endpoint.get("auth_header_value_template", config.auth_header_value_template),
+        query_param_name=str(endpoint.get("query_param_name") or config.query_param_name),
+        extra_headers=extra_headers,
+    )
+
+
+def _resolve_backends(config: GeminiClientConfig, api_key: Optional[str] = None) -> List[Tuple[str, _Backend]]:
+    """Every (endpoint, key) pair from config ``endpoints`` x ``api_keys``; endpoints may list their own keys."""
+    default_keys = [api_key] if api_key else _unique(config.api_key, _config_list(config.get("api_keys"), "api_keys", (str,)))
+    backends = []
+    for endpoint in _config_list(config.get("endpoints"), "endpoints", (str, dict)) or [None]:
+        endpoint_config = _endpoint_config(config, endpoint) if endpoint else config
+        keys = default_keys
+        if isinstance(endpoint, dict) and not api_key:
+            endpoint_keys = _config_list(endpoint.get("api_keys"), "endpoints[].api_keys", (str,))
+            keys = _unique(endpoint.get("api_key"), endpoint_keys) or default_keys
+        host = urlparse(endpoint_config.endpoint("{model}")).netloc
+        for key in keys:
+            name = f"{host}/...{key[-4:]}"
+            backends.append((name, _Backend(name=name, config=endpoint_config, api_key=key)))
+    if not backends:
+        config.require_api_key()
+    return backends
+
+
+_balancer_lock = threading.Lock()
+# Balancers of the current config, keyed by the caller's explicit key (None = configured keys)
+_balancers: Dict[Optional[str], LoadBalancer] = {}
+_balancer_config: Optional[GeminiClientConfig] = None
+
+
+def _new_balancer(config: GeminiClientConfig, api_key: Optional[str] = None) -> LoadBalancer:
+    return LoadBalancer(
+        _resolve_backends(config, api_key),
+        strategy=str(config.get("load_balancing", DEFAULT_LOAD_BALANCING)),
+        eject_seconds=float(config.get("backend_eject_seconds", DEFAULT_BACKEND_EJECT_SECONDS)),
+        max_eject_seconds=float(config.get("backend_max_eject_seconds", DEFAULT_BACKEND_MAX_EJECT_SECONDS)),
+    )
+
+
+def get_load_balancer(api_key: Optional[str] = None) -> LoadBalancer:
+    """Balancer over the configured keys/endpoints, rebuilt when the config changes.
+
+    An explicit ``api_key`` gets its own balancer over the configured endpoints with just that
+    key; it is kept like the default one, so ejections and health persist across requests.
     """
-    key = api_key or _get_api_key()
-    url = _build_full_endpoint(model)
+    global _balancer_config
+    config = get_client_config()
+    with _balancer_lock:
+        if _balancer_config is not config:
+            _balancers.clear()
+            _balancer_config = config
+        balancer = _balancers.get(api_key or None)
+        if balancer is None:
+            balancer = _balancers[api_key or None] = _new_balancer(config, api_key)
+        return balancer
+
+
+# Endpoints already warned about having no streamGenerateContent counterpart
+_sse_unsupported: set = set()
+
+
+def _route(request: _GeminiRequest, backend: _Backend) -> _GeminiRequest:
+    url = backend.config.endpoint(request.model)
     headers = {
         "Content-Type": "application/json",
     }
     params = {}
-    _apply_auth(headers, params, key)
-    payload = _build_payload(prompt, images, seed=seed)
+    if request.mode == "sse":
+        if ":generateContent" in url:
+            url = url.replace(":generateContent", ":streamGenerateContent")
+            params["alt"] = "sse"
+        else:
+            # A custom template we cannot map to streamGenerateContent: read its plain response instead
+            if backend.name not in _sse_unsupported:
+                _sse_unsupported.add(backend.name)
+                print(f"[GeminiClient] response_mode 'sse' needs ':generateContent' in the endpoint URL; using 'stream' for {urlparse(url).netloc}")
+            request = replace(request, mode="stream")
+    backend.config.apply_auth(headers, params, backend.api_key)
+    return replace(request, url=url, headers=headers, params=params)
+
+
+def _estimate_tokens(prompt: str, images: List[ImageInput]) -> int:
+    tokens = len(prompt) // 4 + OUTPUT_IMAGE_TOKENS
+    for img in images:
+        width, height = img.upload_size if isinstance(img, PreparedImage) else img.size
+        if max(width, height) <= IMAGE_TILE_SIZE // 2:
+            tokens += IMAGE_TILE_TOKENS
+        else:
+            tokens += IMAGE_TILE_TOKENS * math.ceil(width / IMAGE_TILE_SIZE) * math.ceil(height / IMAGE_TILE_SIZE)
+    return tokens
+
 
+def _response_mode(config: GeminiClientConfig) -> str:
+    mode = str(config.get("response_mode", DEFAULT_RESPONSE_MODE)).lower()
+    return mode if mode in RESPONSE_MODES else DEFAULT_RESPONSE_MODE
+
+
+def _prepare_request(
+    prompt: str,
+    images: List[ImageInput],
+    model: str,
+    api_key: Optional[str],
+    seed: Optional[int],
+) -> _GeminiRequest:
+    """Serialize the JSON body. CPU-bound; keep off the event loop. The target endpoint and
+    key are chosen per attempt by the load balancer."""
+    config = get_client_config()
+    # Fails early (with the usual message) when no key is configured
+    balancer = get_load_balancer(api_key)
+    return _GeminiRequest(
+        model=model,
+        body=_serialize_payload(prompt, images, seed=seed),
+        mode=_response_mode(config),
+        estimated_tokens=_estimate_tokens(prompt, images),
+        api_key=api_key,
+        node=current_node(),
+        balancer=balancer,
+    )
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After as seconds; accepts delta-seconds or an HTTP date."""
+    if not value:
+        return None
     try:
-        resp = requests.post(url, headers=headers, params=params, json=payload, timeout=timeout)
-    except requests.RequestException as ex:
-        raise GeminiAPIError(f"Network error calling Gemini API: {ex}")
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
 
-    if resp.status_code != 200:
+
+def _handle_response(status_code: int, body: bytes, retry_after: Optional[float] = None) -> bytes:
+    if status_code != 200:
         # Try to parse error payload
         try:
-            err_json = resp.json()
+            err_json = json.loads(body)
         except Exception:
             err_json = None
-        if err_json:
+        if isinstance(err_json, dict) and err_json:
             # Common format: {"error": {"code":..., "message":..., "status":...}}
             err = err_json.get("error") or {}
             message = err.get("message") or json.dumps(err_json)
-            raise GeminiAPIError(f"Gemini API error {resp.status_code}: {message}")
-        raise GeminiAPIError(f"Gemini API error {resp.status_code}: {resp.text}")
+            raise GeminiAPIError(f"Gemini API error {status_code}: {message}", status_code, retry_after)
+        raise GeminiAPIError(
+            f"Gemini API error {status_code}: {body.decode('utf-8', errors='replace')}", status_code, retry_after
+        )
 
     try:
-        resp_json = resp.json()
+        resp_json = json.loads(body)
     except ValueError as ex:
         raise GeminiAPIError(f"Failed to parse Gemini response JSON: {ex}")
 
     return _extract_image_bytes_from_response(resp_json)
 
 
+def _handle_sse_response(body: bytes) -> bytes:
+    """Parse a complete streamGenerateContent SSE body (fallback when no image was streamed)."""
+    events = []
+    for line in body.splitlines():
+        if not line.startswith(b"data:"):
+            continue
+        payload = line[5:].strip()
+        if not payload or payload == b"[DONE]":
+            continue
+        try:
+            events.append(json.loads(payload))
+        except ValueError as ex:
+            raise GeminiAPIError(f"Failed to parse Gemini stream event JSON: {ex}")
+    if not events:
+        # Not an event stream (e.g. a plain JSON error object)
+        return _handle_response(200, body)
+
+    # Each event carries a slice of the candidates' parts; merge them into one response
+    merged = {"candidates": [], "promptFeedback": None}
+    for event in events:
+        if not isinstance(event, dict):
+            continue
+        if event.get("error"):
+            return _handle_response(500, json.dumps(event).encode("utf-8"))
+        merged["candidates"].extend(event.get("candidates") or [])
+        merged["promptFeedback"] = event.get("promptFeedback") or merged["promptFeedback"]
+    if not merged["promptFeedback"]:
+        del merged["promptFeedback"]
+    return _extract_image_bytes_from_response(merged)
+
+
+def _finish_streamed_response(request: _GeminiRequest, extractor: StreamingImageExtractor) -> bytes:
+    image = extractor.image_bytes()
+    if image is not None:
+        return image
+    if extractor.truncated:
+        raise GeminiAPIError("Gemini response ended in the middle of the image data", transient=True)
+    # No image part: the (small) body was kept, so report it the usual way
+    if request.mode == "sse":
+        return _handle_sse_response(extractor.head)
+    return _handle_response(200, extractor.head)
+
+
+# Async transport state; only touched from the GLOBAL_EVENT_LOOP thread
+_async_session = None
+_async_stats = {"requests": 0, "connections_opened": 0, "connections_reused": 0}
+
+
+def _use_aiohttp() -> bool:
+    if aiohttp is None:
+        return False
+    return str(get_client_config().get("http_transport", "auto")).lower() != "requests"
+
+
+async def _on_connection_create_start(session, ctx, params) -> None:
+    ctx.connect_started = time.perf_counter()
+
+
+async def _on_connection_create(session, ctx, params) -> None:
+    _async_stats["connections_opened"] += 1
+    timings = ctx.trace_request_ctx
+    if isinstance(timings, dict) and hasattr(ctx, "connect_started"):
+        timings["connect"] = time.perf_counter() - ctx.connect_started
+
+
+async def _on_connection_reuse(session, ctx, params) -> None:
+    _async_stats["connections_reused"] += 1
+
+
+def _get_async_session():
+    global _async_session
+    if _async_session is None or _async_session.closed:
+        opts = _pool_options()
+        connector = aiohttp.TCPConnector(
+            limit=opts["pool_connections"] * opts["pool_maxsize"],
+            limit_per_host=opts["pool_maxsize"],
+            force_close=not opts["keep_alive"],
+        )
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_start.append(_on_connection_create_start)
+        trace.on_connection_create_end.append(_on_connection_create)
+        trace.on_connection_reuseconn.append(_on_connection_reuse)
+        _async_session = aiohttp.ClientSession(connector=connector, trace_configs=[trace])
+    return _async_session
+
+
+async def _close_async_session() -> None:
+    global _async_session
+    session, _async_session = _async_session, None
+    if session is not None and not session.closed:
+        await session.close()
+
+
+def _post_with_requests(request: _GeminiRequest, timeout: float) -> bytes:
+    streaming = request.mode != "buffered"
+    endpoint = request.endpoint
+    try:
+        # Buffered responses are read inside post(), so their download is part of http_ttfb
+        with GLOBAL_METRICS.span("http_ttfb", node=request.node, endpoint=endpoint):
+            resp = get_http_session().post(
+                request.url,
+                headers=dict(request.headers),
+                params=dict(request.params),
+                data=request.body,
+                timeout=timeout,
+                stream=streaming,
+            )
+        if not streaming or resp.status_code != 200:
+            with GLOBAL_METRICS.span("parse", node=request.node, endpoint=endpoint):
+                return _handle_response(resp.status_code, resp.content, _parse_retry_after(resp.headers.get("Retry-After")))
+        with resp, GLOBAL_METRICS.span("http_download", node=request.node, endpoint=endpoint):
+            extractor = StreamingImageExtractor(size_hint=_content_length(resp.headers))
+            for chunk in resp.iter_content(RESPONSE_CHUNK_SIZE):
+                extractor.feed(chunk)
+    except requests.Timeout:
+        raise GeminiAPIError(f"Gemini API request timed out after {round(timeout, 1)}s", transient=True)
+    except requests.RequestException as ex:
+        raise GeminiAPIError(f"Network error calling Gemini API: {ex}", transient=True)
+    with GLOBAL_METRICS.span("parse", node=request.node, endpoint=endpoint):
+        return _finish_streamed_response(request, extractor)
+
+
+def _content_length(headers: Mapping[str, str]) -> int:
+    try:
+        return int(headers.get("Content-Length") or 0)
+    except ValueError:
+        return 0
+
+
+async def _send_async(request: _GeminiRequest, timeout: float) -> bytes:
+    """Send a prepared request. Must run on GLOBAL_EVENT_LOOP."""
+    loop = asyncio.get_running_loop()
+    if not _use_aiohttp():
+        return await loop.run_in_executor(_get_http_executor(), _post_with_requests, request, timeout)
+
+    _async_stats["requests"] += 1
+    extractor = None
+    endpoint = request.endpoint
+    timings = {}
+    started = time.perf_counter()
+    try:
+        async with _get_async_session().post(
+            request.url,
+            headers=dict(request.headers),
+            params=dict(request.params),
+            data=request.body,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+            trace_request_ctx=timings,
+        ) as resp:
+            headers_at = time.perf_counter()
+            connect = timings.get("connect")
+            if connect is not None:
+                GLOBAL_METRICS.observe("http_connect", connect, node=request.node, endpoint=endpoint)
+            GLOBAL_METRICS.observe("http_ttfb", headers_at - started - (connect or 0.0), node=request.node, endpoint=endpoint)
+            status_code = resp.status
+            if request.mode != "buffered" and status_code == 200:
+                # Decode the image while it downloads instead of holding body, JSON tree and image at once
+                extractor = StreamingImageExtractor(size_hint=resp.content_length or 0)
+                async for chunk in resp.content.iter_chunked(RESPONSE_CHUNK_SIZE):
+                    extractor.feed(chunk)
+            else:
+                body = await resp.read()
+                retry_after = _parse_retry_after(resp.headers.get("Retry-After"))
+            GLOBAL_METRICS.observe("http_download", time.perf_counter() - headers_at, node=request.node, endpoint=endpoint)
+    except asyncio.TimeoutError:
+        raise GeminiAPIError(f"Gemini API request timed out after {round(timeout, 1)}s", transient=True)
+    except aiohttp.ClientError as ex:
+        raise GeminiAPIError(f"Network error calling Gemini API: {ex}", transient=True)
+
+    # JSON parsing and base64 decoding of multi-megabyte bodies would stall other requests on the loop
+    if extractor is not None:
+        return await loop.run_in_executor(_cpu_executor, _timed_parse, request, _finish_streamed_response, request, extractor)
+    return await loop.run_in_executor(_cpu_executor, _timed_parse, request, _handle_response, status_code, body, retry_after)
+
+
+def _timed_parse(request: _GeminiRequest, fn: Callable[..., bytes], *args) -> bytes:
+    with GLOBAL_METRICS.span("parse", node=request.node, endpoint=request.endpoint):
+        return fn(*args)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """When and how long to wait before retrying a failed request.
+
+    ``max_attempts`` counts the first attempt. The n-th retry waits
+    ``min(backoff_max, backoff_base * 2**(n-1))`` reduced by up to ``jitter`` (a fraction) at
+    random, and at least the server's Retry-After.
+    """
+
+    max_attempts: int = DEFAULT_RETRY_MAX_ATTEMPTS
+    backoff_base: float = DEFAULT_RETRY_BACKOFF_BASE
+    backoff_max: float = DEFAULT_RETRY_BACKOFF_MAX
+    jitter: float = DEFAULT_RETRY_JITTER
+    retry_statuses: frozenset = frozenset(DEFAULT_RETRY_STATUSES)
+    retry_network_errors: bool = True
+
+    def is_retryable(self, error: GeminiAPIError) -> bool:
+        if error.status_code is not None:
+            return error.status_code in self.retry_statuses
+        return error.transient and self.retry_network_errors
+
+    def delay(self, retry_number: int, retry_after: Optional[float] = None) -> float:
+        backoff = min(self.backoff_max, self.backoff_base * (2 ** (retry_number - 1)))
+        backoff *= 1.0 - self.jitter * random.random()
+        if retry_after is not None:
+            backoff = max(backoff, retry_after)
+        return backoff
+
+
+def get_retry_policy() -> RetryPolicy:
+    """Retry policy from gemini_config.json (``retry_max_attempts``, ``retry_backoff_base``,
+    ``retry_backoff_max``, ``retry_jitter``, ``retry_statuses``, ``retry_network_errors``)."""
+    cfg = get_client_config()
+    return RetryPolicy(
+        max_attempts=max(1, int(cfg.get("retry_max_attempts", DEFAULT_RETRY_MAX_ATTEMPTS))),
+        backoff_base=float(cfg.get("retry_backoff_base", DEFAULT_RETRY_BACKOFF_BASE)),
+        backoff_max=float(cfg.get("retry_backoff_max", DEFAULT_RETRY_BACKOFF_MAX)),
+        jitter=min(1.0, max(0.0, float(cfg.get("retry_jitter", DEFAULT_RETRY_JITTER)))),
+        retry_statuses=frozenset(int(code) for code in cfg.get("retry_statuses", DEFAULT_RETRY_STATUSES)),
+        retry_network_errors=bool(cfg.get("retry_network_errors", True)),
+    )
+
+
+# Retry counters; only touched from the GLOBAL_EVENT_LOOP thread
+_retry_stats = {"attempts": 0, "retries": 0, "recovered": 0, "gave_up": 0, "by_reason": {}}
+
+
+def get_retry_stats() -> dict:
+    """Attempts sent, retries scheduled, requests that succeeded after a retry, requests that
+    failed after retrying, and retries per reason (HTTP status or ``network``)."""
+    return {**_retry_stats, "by_reason": dict(_retry_stats["by_reason"])}
+
+
+# Client-side limiter; rebuilt when the config changes, only used on the GLOBAL_EVENT_LOOP thread
+_governor: Optional[RequestGovernor] = None
+_governor_config: Optional[GeminiClientConfig] = None
+
+
+def get_request_governor() -> RequestGovernor:
+    """Limiter configured by gemini_config.json: ``rate_limit_rpm``, ``rate_limit_tpm``,
+    ``rate_limit_burst``, ``max_concurrent_requests`` and ``rate_limit_shared_file`` (share the
+    rpm/tpm budget with other processes on this host)."""
+    global _governor, _governor_config
+    config = get_client_config()
+    if _governor is None or _governor_config is not config:
+        shared_path = config.get("rate_limit_shared_file")
+        _governor = RequestGovernor(
+            requests_per_minute=float(config.get("rate_limit_rpm", 0)),
+            tokens_per_minute=float(config.get("rate_limit_tpm", 0)),
+            max_concurrent=int(config.get("max_concurrent_requests", 0)),
+            burst=config.get("rate_limit_burst"),
+            shared_path=os.path.expanduser(str(shared_path)) if shared_path else None,
+        )
+        _governor_config = config
+    return _governor
+
+
+def _ejection_for(error: GeminiAPIError) -> Optional[float]:
+    """How long a backend is taken out of rotation after ``error`` (0 = escalating default, None = keep)."""
+    if error.status_code in AUTH_ERROR_STATUSES:
+        return float(get_client_config().get("backend_max_eject_seconds", DEFAULT_BACKEND_MAX_EJECT_SECONDS))
+    if error.status_code == 429:
+        return error.retry_after or 0.0
+    if error.status_code is None and error.transient:
+        return 0.0
+    return None
+
+
+async def _send_balanced(request: _GeminiRequest, balancer: LoadBalancer, timeout: float) -> bytes:
+    """Send one attempt to the backend picked by ``balancer`` and report the outcome back to it."""
+    index, backend = balancer.acquire()
+    started = time.monotonic()
+    try:
+        result = await _send_async(_route(request, backend), timeout)
+    except GeminiAPIError as ex:
+        eject = _ejection_for(ex)
+        balancer.release(index, eject=eject, failed=True)
+        ex.ejected = eject is not None
+        raise
+    except BaseException:
+        balancer.release(index)
+        raise
+    balancer.release(index, latency=time.monotonic() - started)
+    return result
+
+
+_hedge_tracker = HedgeTracker()
+
+
+def get_hedge_stats() -> dict:
+    """Requests seen, hedges sent, hedges that answered first and hedges skipped for budget."""
+    return _hedge_tracker.stats()
+
+
+async def _send_hedged(request: _GeminiRequest, balancer: LoadBalancer, timeout: float) -> bytes:
+    """Send one attempt; with hedging enabled, duplicate it to the next backend when it is slower
+    than usual and return whichever copy succeeds first (the other is cancelled)."""
+    config = get_client_config()
+    if not config.get("hedging", False):
+        return await _send_balanced(request, balancer, timeout)
+
+    _hedge_tracker.start_request(float(config.get("hedge_max_rate", DEFAULT_HEDGE_MAX_RATE)))
+    delay = _hedge_tracker.delay(
+        percentile=float(config.get("hedge_percentile", DEFAULT_HEDGE_PERCENTILE)),
+        min_samples=int(config.get("hedge_min_samples", DEFAULT_HEDGE_MIN_SAMPLES)),
+        min_delay=float(config.get("hedge_min_delay_seconds", DEFAULT_HEDGE_MIN_DELAY)),
+        initial_delay=config.get("hedge_initial_delay_seconds"),
+    )
+    started = time.monotonic()
+    primary = asyncio.ensure_future(_send_balanced(request, balancer, timeout))
+    tasks = {primary}
+    try:
+        if delay is not None and delay + MIN_ATTEMPT_SECONDS < timeout:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and _hedge_tracker.try_hedge():
+                tasks.add(asyncio.ensure_future(_send_hedge(request, balancer, started + timeout)))
+        first_error = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not primary:
+                        _hedge_tracker.hedge_won()
+                    _hedge_tracker.record(time.monotonic() - started)
+                    return task.result()
+                if task is primary or first_error is None:
+                    first_error = task.exception()
+        raise first_error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _send_hedge(request: _GeminiRequest, balancer: LoadBalancer, deadline: float) -> bytes:
+    # The duplicate only goes out if the rate limiter has budget right now
+    async with get_request_governor().slot(request.estimated_tokens, time.monotonic()):
+        _retry_stats["attempts"] += 1
+        return await _send_balanced(request, balancer, max(MIN_ATTEMPT_SECONDS, deadline - time.monotonic()))
+
+
+async def _send_with_retries(request: _GeminiRequest, timeout: float) -> bytes:
+    """Send with the configured retry policy; ``timeout`` bounds all attempts and waits together.
+
+    With several backends, a failure that ejects one (auth error, 429, timeout) fails over to
+    the next backend right away; each backend gets at least one attempt.
+    """
+    policy = get_retry_policy()
+    governor = get_request_governor()
+    balancer = request.balancer or get_load_balancer(request.api_key)
+    max_attempts = max(policy.max_attempts, len(balancer))
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    while True:
+        attempt += 1
+        queued = time.perf_counter()
+        try:
+            # Every attempt, including retries, counts against the rate limits
+            async with governor.slot(request.estimated_tokens, deadline):
+                GLOBAL_METRICS.observe("queue", time.perf_counter() - queued, node=request.node)
+                _retry_stats["attempts"] += 1
+                result = await _send_hedged(request, balancer, max(MIN_ATTEMPT_SECONDS, deadline - time.monotonic()))
+        except RateLimitExceeded as ex:
+            raise GeminiAPIError(f"Gemini API request not sent: {ex}") from ex
+        except GeminiAPIError as ex:
+            failover = ex.ejected and balancer.available() > 0
+            if not (failover or policy.is_retryable(ex)):
+                raise
+            reason = str(ex.status_code) if ex.status_code is not None else "network"
+            delay = 0.0 if failover else policy.delay(attempt, ex.retry_after)
+            remaining = deadline - time.monotonic()
+            limit = max_attempts if failover else policy.max_attempts
+            if attempt >= limit or delay + MIN_ATTEMPT_SECONDS > remaining:
+                if attempt > 1:
+                    _retry_stats["gave_up"] += 1
+                    print(f"[GeminiClient] giving up after {attempt} attempts ({reason}): {ex}")
+                    raise GeminiAPIError(
+                        f"{ex} (gave up after {attempt} attempts)", ex.status_code, ex.retry_after, ex.transient
+                    ) from ex
+                if attempt < limit:
+                    print(f"[GeminiClient] not retrying ({reason}): {delay:.1f}s backoff exceeds the remaining {remaining:.1f}s")
+                raise
+            _retry_stats["retries"] += 1
+            _retry_stats["by_reason"][reason] = _retry_stats["by_reason"].get(reason, 0) + 1
+            if failover:
+                print(f"[GeminiClient] attempt {attempt} failed ({reason}); failing over to another backend")
+            else:
+                print(f"[GeminiClient] attempt {attempt}/{limit} failed ({reason}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+        if attempt > 1:
+            _retry_stats["recovered"] += 1
+        return result
+
+
+async def call_gemini_generate_image_async(
+    prompt: str,
+    images: List[ImageInput],
+    model: str = "gemini-2.5-flash-image-preview",
+    api_key: Optional[str] = None,
+    timeout: float = 60.0,
+    seed: Optional[int] = None,
+) -> bytes:
+    """Async counterpart of ``call_gemini_generate_image``; may be awaited from any event loop.
+
+    The HTTP exchange always runs on the shared background loop so all callers share one
+    connection pool; payload encoding runs on the client's parsing threads.
+    """
+    loop = asyncio.get_running_loop()
+    request = await loop.run_in_executor(_cpu_executor, _prepare_request, prompt, images, model, api_key, seed)
+    if GLOBAL_EVENT_LOOP.in_loop_thread():
+        return await _send_with_retries(request, timeout)
+    return await asyncio.wrap_future(GLOBAL_EVENT_LOOP.submit(_send_with_retries(request, timeout)))
+
+
+_outstanding_lock = threading.Lock()
+_outstanding = 0
+
+
+def get_outstanding_requests() -> int:
+    """Requests submitted to the event loop that have not finished or been cancelled yet."""
+    return _outstanding
+
+
+def _track_outstanding(delta: int) -> None:
+    global _outstanding
+    with _outstanding_lock:
+        _outstanding += delta
+
+
+class GeminiRequestHandle:
+    """A request running on the shared event loop.
+
+    ``cancel`` stops it wherever it is (rate-limit wait, backoff or HTTP exchange); an aiohttp
+    request in flight is aborted and its connection closed instead of being read to the end.
+    """
+
+    def __init__(self, future: concurrent.futures.Future, timeout: float):
+        self._future = future
+        # Overall timeout of the request's attempts, enforced on the event loop
+        self.timeout = timeout
+        _track_outstanding(1)
+        future.add_done_callback(lambda _: _track_outstanding(-1))
+
+    def done(self) -> bool:
+        return self._future.done()
+
+    def cancel(self) -> bool:
+        return self._future.cancel()
+
+    def result(self, timeout: Optional[float] = None, cancel_check: Optional[Callable[[], bool]] = None) -> bytes:
+        """Wait for the PNG bytes. On ``timeout`` the request is cancelled and GeminiAPIError raised;
+        when ``cancel_check()`` turns true it is cancelled and GeminiRequestCancelled raised."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if cancel_check is not None:
+                wait = CANCEL_POLL_INTERVAL if wait is None else min(wait, CANCEL_POLL_INTERVAL)
+            try:
+                return self._future.result(timeout=wait)
+            except concurrent.futures.CancelledError:
+                raise GeminiRequestCancelled("Gemini API request was cancelled")
+            except concurrent.futures.TimeoutError:
+                if cancel_check is not None and cancel_check():
+                    self.cancel()
+                    raise GeminiRequestCancelled("Gemini API request was cancelled")
+                if deadline is not None and time.monotonic() >= deadline:
+                    self.cancel()
+                    raise GeminiAPIError(f"Gemini API request timed out after waiting {round(timeout, 1)}s", transient=True)
+
+
+def submit_gemini_generate_image(
+    prompt: str,
+    images: List[ImageInput],
+    model: str = "gemini-2.5-flash-image-preview",
+    api_key: Optional[str] = None,
+    timeout: float = 60.0,
+    seed: Optional[int] = None,
+) -> GeminiRequestHandle:
+    """Start a request on the shared event loop and return a cancellable handle.
+
+    The payload is built in the calling thread; ``timeout`` bounds all attempts of the request.
+    """
+    request = _prepare_request(prompt, images, model, api_key, seed)
+    return GeminiRequestHandle(GLOBAL_EVENT_LOOP.submit(_send_with_retries(request, timeout)), timeout)
+
+
+def call_gemini_generate_image(
+    prompt: str,
+    images: List[ImageInput],
+    model: str = "gemini-2.5-flash-image-preview",
+    api_key: Optional[str] = None,
+    timeout: float = 60.0,
+    seed: Optional[int] = None,
+    cancel_check: Optional[Callable[[], bool]] = None,
+) -> bytes:
+    """Call Gemini API to generate an image response from prompt + images.
+
+    Thin synchronous wrapper over the async engine: the payload is built in the calling thread
+    and the request is multiplexed on the shared background event loop. Transient failures are
+    retried according to ``get_retry_policy()`` within the overall ``timeout``. ``cancel_check``
+    is polled while waiting; once it returns True the request is cancelled.
+
+    Returns the PNG as bytes-like data (a read-only ``memoryview`` when the response was
+    streamed) on success, raises GeminiAPIError on failure.
+    """
+    handle = submit_gemini_generate_image(prompt, images, model=model, api_key=api_key, timeout=timeout, seed=seed)
+    # The retry loop enforces ``timeout``; the extra margin only covers response decoding
+    return handle.result(timeout=timeout + 30.0, cancel_check=cancel_check)
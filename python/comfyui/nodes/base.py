@@ -0,0 +1,177 @@
+import threading
+import time
+from concurrent.futures import CancelledError
+from typing import Any, Dict, List, Sequence, Tuple
+
+from ..gemini_client import (
+    call_gemini_generate_image,
+    get_upload_encoding,
+    restore_input_size_enabled,
+    RESTORE_SIZE_MODES,
+    GeminiRequestCancelled,
+)
+from ..utils.image_io import UPLOAD_FORMATS, DecodedImage, PreparedImage, tensor_to_prepared_list, bytes_to_pil_image, pil_list_to_tensor, hash_prepared_images
+from ..utils.result_cache import cache_result, cache_result_image, decode_result_image, get_cached_image
+from ..utils.job_journal import GLOBAL_JOB_JOURNAL
+from ..utils.interrupt import processing_interrupted, raise_if_interrupted
+from ..utils.metrics import GLOBAL_METRICS, node_context
+from ..utils.progress import GLOBAL_PROGRESS
+from ..utils.single_flight import GLOBAL_SINGLE_FLIGHT
+from ..utils.batch import DEFAULT_MAX_CONCURRENCY, MAX_CONCURRENCY_LIMIT, run_concurrent
+
+
+MODEL_NAME = "gemini-2.5-flash-image-preview"
+
+
+class GeminiImageNodeBase:
+    """Shared execution engine of the Gemini image nodes.
+
+    A node validates its inputs, builds the prompt and the parts that identify it in the cache
+    key, then hands ``run_batch`` one job (the input images of one request) per output image.
+    Everything after that is the same for every node: cache lookup, coalescing of identical
+    in-flight requests, the Gemini call (retries, rate limiting, cancellation), progress
+    reporting, caching and decoding of the result and stacking the outputs into one tensor.
+    Results are cached, coalesced and journaled only for seeds > 0; seed 0 always draws a new image.
+    Each stage is timed into ``GLOBAL_METRICS`` under the node's class name.
+    """
+
+    # Name used in error messages, e.g. "Gemini Virtual Try-On"
+    LABEL = "Gemini"
+    # First component of the result cache key, e.g. "virtual_tryon"
+    CACHE_PREFIX = "gemini"
+    MODEL_NAME = MODEL_NAME
+
+    @classmethod
+    def common_optional_inputs(cls) -> Dict[str, Any]:
+        """Optional inputs of every node, placed after the node's own so saved workflows keep their widget order."""
+        return {
+            "并发数": ("INT", {"default": DEFAULT_MAX_CONCURRENCY, "min": 1, "max": MAX_CONCURRENCY_LIMIT, "tooltip": "批量输入时同时发出的最大请求数"}),
+            "上传格式": ("STRING", {"default": "global", "choices": ["global"] + UPLOAD_FORMATS, "ui": {"type": "combo"}, "tooltip": "输入图上传编码：global 使用配置文件；png/webp_lossless 无损，jpeg/webp 有损但更小更快"}),
+            "上传质量": ("INT", {"default": 0, "min": 0, "max": 100, "tooltip": "jpeg/webp 质量（1-100）；0 表示使用配置文件"}),
+            "最长边": ("INT", {"default": 0, "min": 0, "max": 8192, "tooltip": "上传前将最长边缩小到该像素数；0 表示使用配置文件（默认不缩放）"}),
+            "还原尺寸": ("STRING", {"default": "global", "choices": RESTORE_SIZE_MODES, "ui": {"type": "combo"}, "tooltip": "将生成结果缩放回输入图尺寸：on 开启，off 关闭，global 使用配置文件"}),
+        }
+
+    def prepare_images(self, image_tensor, missing_message: str, 上传格式: str = "global", 上传质量: int = 0, 最长边: int = 0) -> List[PreparedImage]:
+        """Encode an IMAGE batch for upload with the node's 上传格式/上传质量/最长边 (falling back to the config)."""
+        encoding = get_upload_encoding(上传格式, 上传质量, 最长边)
+        with GLOBAL_METRICS.span("prepare", node=type(self).__name__):
+            images = tensor_to_prepared_list(image_tensor, encoding=encoding)
+        if not images:
+            raise RuntimeError(missing_message)
+        return images
+
+    def cache_key(self, images: Sequence[PreparedImage], key_parts: Sequence[str], seed: int) -> str:
+        return ":".join([self.CACHE_PREFIX, hash_prepared_images(images), *key_parts, str(seed)])
+
+    def run_batch(
+        self,
+        jobs: Sequence[Sequence[PreparedImage]],
+        prompt: str,
+        key_parts: Sequence[str],
+        种子: int,
+        超时秒数: int,
+        刷新间隔秒数: int,
+        并发数: int,
+        还原尺寸: str,
+    ) -> Tuple:
+        """Run one Gemini request per job and return ``(IMAGE,)`` in job order.
+
+        Results are scaled back to the size of each job's first image when size restoring is on.
+        """
+        node = type(self).__name__
+        restore_size = restore_input_size_enabled(还原尺寸)
+        timeout = max(5, int(超时秒数) if isinstance(超时秒数, int) else 60)
+        seeded = 种子 > 0
+        journal = GLOBAL_JOB_JOURNAL
+        # Set when one job fails, so the requests of the others stop instead of running on unseen
+        batch_failed = threading.Event()
+
+        def _cancelled() -> bool:
+            return batch_failed.is_set() or processing_interrupted()
+
+        def _run_one(images: Sequence[PreparedImage]) -> DecodedImage:
+            with node_context(node):
+                return _generate(images)
+
+        def _call(images: Sequence[PreparedImage], cache_key: str) -> bytes:
+            # Seeded: runs only in the single-flight leader, so each result is journaled and cached once
+            if not seeded:
+                return _request(images)
+            if journal is None:
+                png_bytes = _request(images)
+            else:
+                journal.started(cache_key, node)
+                try:
+                    png_bytes = _request(images)
+                except GeminiRequestCancelled:
+                    # Left as "started": an interrupted job is retried like a failed one
+                    raise
+                except Exception as e:
+                    journal.failed(cache_key, node, str(e))
+                    raise
+                journal.done(cache_key, node, png_bytes)
+            cache_result(cache_key, png_bytes)
+            return png_bytes
+
+        def _request(images: Sequence[PreparedImage]) -> bytes:
+            if _cancelled():
+                raise GeminiRequestCancelled("Gemini API request was cancelled")
+            return call_gemini_generate_image(
+                prompt=prompt,
+                images=list(images),
+                model=self.MODEL_NAME,
+                seed=(种子 if seeded else None),
+                timeout=timeout,
+                cancel_check=_cancelled,
+            )
+
+        def _generate(images: Sequence[PreparedImage]) -> DecodedImage:
+            resize_to = images[0].size if restore_size else None
+            with GLOBAL_METRICS.span("hash"):
+                cache_key = self.cache_key(images, key_parts, 种子)
+            if seeded:
+                with GLOBAL_METRICS.span("cache_lookup"):
+                    cached = get_cached_image(cache_key, resize_to=resize_to)
+                if cached is not None:
+                    task.advance()
+                    return cached
+                if journal is not None:
+                    journaled = journal.get(cache_key)
+                    if journaled is not None:
+                        task.advance()
+                        return cache_result_image(cache_key, journaled, resize_to=resize_to)
+
+            started = time.perf_counter()
+            try:
+                png_bytes = GLOBAL_SINGLE_FLIGHT.do(
+                    cache_key if seeded else None,
+                    _call,
+                    images,
+                    cache_key,
+                    cancel_check=_cancelled,
+                    # Same margin over the retry deadline as call_gemini_generate_image
+                    timeout=timeout + 30.0,
+                )
+            except (GeminiRequestCancelled, CancelledError):
+                raise_if_interrupted()
+                raise RuntimeError(f"{self.LABEL} was cancelled")
+            except Exception as e:
+                raise RuntimeError(f"{self.LABEL} error: {e}")
+            # Whole client call: queueing, retries and all HTTP attempts
+            GLOBAL_METRICS.observe("request", time.perf_counter() - started)
+
+            task.advance()
+            with GLOBAL_METRICS.span("decode"):
+                if seeded:
+                    return decode_result_image(cache_key, png_bytes, resize_to=resize_to)
+                return bytes_to_pil_image(png_bytes, resize_to=resize_to)
+
+        try:
+            with GLOBAL_METRICS.span("node_call", node=node):
+                with GLOBAL_PROGRESS.track(node, len(jobs), 刷新间隔秒数, timeout) as task:
+                    out_images = run_concurrent(_run_one, jobs, 并发数, cancel=batch_failed)
+                with GLOBAL_METRICS.span("to_tensor", node=node):
+                    return (pil_list_to_tensor(out_images),)
+        finally:
+            GLOBAL_METRICS.maybe_export()
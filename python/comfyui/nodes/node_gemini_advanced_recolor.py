@@ -1,18 +1,10 @@
 from typing import Any, Dict, List
-import threading
-import time
 
-from PIL import Image
+from ..utils.batch import DEFAULT_MAX_CONCURRENCY
+from .base import GeminiImageNodeBase
 
-from ..gemini_client import call_gemini_generate_image, GeminiAPIError
-from ..utils.image_io import tensor_to_pil_list, bytes_to_pil_image, pil_list_to_tensor, hash_pil_images
-from ..utils.result_cache import GLOBAL_RESULT_CACHE
 
-
-MODEL_NAME = "gemini-2.5-flash-image-preview"
-
-
-class GeminiAdvancedRecolor:
+class GeminiAdvancedRecolor(GeminiImageNodeBase):
     """Gemini 高级调色盘（功能完备）
 
     功能完备的图像精准重上色节点。通过单行文本接收颜色描述（颜色名/HEX/自然语言），
@@ -51,9 +43,13 @@ class GeminiAdvancedRecolor:
                 "种子": ("INT", {"default": 0, "min": 0, "max": 2**31 - 1, "tooltip": "种子>0固定并缓存；0表示每次随机"}),
                 "超时秒数": ("INT", {"default": 60, "min": 5, "max": 600, "tooltip": "请求超时自动终止（秒）"}),
                 "刷新间隔秒数": ("INT", {"default": 5, "min": 0, "max": 60, "tooltip": "控制台刷新/心跳频率；0 表示关闭"}),
-            }
+            },
+            "optional": cls.common_optional_inputs(),
         }
 
+    LABEL = "Gemini Advanced Recolor"
+    CACHE_PREFIX = "advanced_recolor"
+
     RETURN_TYPES = ("IMAGE",)
     RETURN_NAMES = ("重新着色图",)
     FUNCTION = "process"
@@ -74,11 +70,13 @@ class GeminiAdvancedRecolor:
         种子: int,
         超时秒数: int,
         刷新间隔秒数: int,
+        并发数: int = DEFAULT_MAX_CONCURRENCY,
+        上传格式: str = "global",
+        上传质量: int = 0,
+        最长边: int = 0,
+        还原尺寸: str = "global",
     ):
-        images: List[Image.Image] = tensor_to_pil_list(图片)
-        if not images:
-            raise RuntimeError("No input image provided.")
-        img = images[0]
+        images = self.prepare_images(图片, "No input image provided.", 上传格式, 上传质量, 最长边)
 
         # Build selected targets
         selected_targets: List[str] = []
@@ -118,48 +116,4 @@ class GeminiAdvancedRecolor:
             f"5.  **OUTPUT:** Return ONLY the final, edited image. Do not include any text, dialogue, or explanations in your response."
         )
 
-        # Cache when seed > 0
-        input_hash = hash_pil_images([img])
-        cache_key = f"advanced_recolor:{input_hash}:{target_string}:{color_text}:{种子}"
-        if 种子 > 0:
-            cached = GLOBAL_RESULT_CACHE.get(cache_key)
-            if cached is not None:
-                out_img = bytes_to_pil_image(cached)
-                out_tensor = pil_list_to_tensor([out_img])
-                return (out_tensor,)
-
-        stop_flag = {"stop": False}
-
-        def _hb():
-            if 刷新间隔秒数 and 刷新间隔秒数 > 0:
-                start = time.perf_counter()
-                c = 0
-                while not stop_flag["stop"]:
-                    time.sleep(刷新间隔秒数)
-                    c += 1
-                    elapsed = int(time.perf_counter() - start)
-                    print(f"[GeminiAdvancedRecolor] waiting... elapsed={elapsed}s (tick {c})")
-
-        th = threading.Thread(target=_hb, daemon=True)
-        th.start()
-
-        try:
-            png_bytes = call_gemini_generate_image(
-                prompt=prompt,
-                images=[img],
-                model=MODEL_NAME,
-                seed=(种子 if 种子 > 0 else None),
-                timeout=max(5, int(超时秒数) if isinstance(超时秒数, int) else 60),
-            )
-        except GeminiAPIError as ex:
-            raise RuntimeError(f"Gemini Advanced Recolor error: {ex}")
-        finally:
-            stop_flag["stop"] = True
-
-        if 种子 > 0:
-            GLOBAL_RESULT_CACHE.set(cache_key, png_bytes)
-        out_img = bytes_to_pil_image(png_bytes)
-        out_tensor = pil_list_to_tensor([out_img])
-        return (out_tensor,)
-
-
+        return self.run_batch([[img] for img in images], prompt, [target_string, color_text], 种子, 超时秒数, 刷新间隔秒数, 并发数, 还原尺寸)
@@ -1,20 +1,7 @@
-from typing import Any, Dict, List
-import threading
-import time
+from typing import Any, Dict
 
-from PIL import Image
-
-from ..gemini_client import call_gemini_generate_image, GeminiAPIError
-from ..utils.image_io import (
-    tensor_to_pil_list,
-    bytes_to_pil_image,
-    pil_list_to_tensor,
-    hash_pil_images,
-)
-from ..utils.result_cache import GLOBAL_RESULT_CACHE
-
-
-MODEL_NAME = "gemini-2.5-flash-image-preview"
+from ..utils.batch import DEFAULT_MAX_CONCURRENCY
+from .base import GeminiImageNodeBase
 
 
 BASE_PROMPT = (
@@ -30,7 +17,7 @@ BASE_PROMPT = (
 )
 
 
-class GeminiGarmentProcessor:
+class GeminiGarmentProcessor(GeminiImageNodeBase):
     """ComfyUI node: Gemini 服装处理器
 
     Inputs:
@@ -83,9 +70,13 @@ class GeminiGarmentProcessor:
                         "tooltip": "控制台刷新/心跳频率；0 表示关闭",
                     },
                 ),
-            }
+            },
+            "optional": cls.common_optional_inputs(),
         }
 
+    LABEL = "Gemini Garment Processor"
+    CACHE_PREFIX = "garment_processor"
+
     RETURN_TYPES = ("IMAGE",)
     RETURN_NAMES = ("清洗后服装图",)
     FUNCTION = "process"
@@ -100,11 +91,13 @@ class GeminiGarmentProcessor:
         种子: int,
         超时秒数: int,
         刷新间隔秒数: int,
+        并发数: int = DEFAULT_MAX_CONCURRENCY,
+        上传格式: str = "global",
+        上传质量: int = 0,
+        最长边: int = 0,
+        还原尺寸: str = "global",
     ):
-        images: List[Image.Image] = tensor_to_pil_list(输入图片)
-        if not images:
-            raise RuntimeError("No garment image provided.")
-        img = images[0]
+        images = self.prepare_images(输入图片, "No garment image provided.", 上传格式, 上传质量, 最长边)
 
         selected = []
         if 选择上装:
@@ -124,59 +117,4 @@ class GeminiGarmentProcessor:
             + f"Extract and present ONLY these categories: {categories_text}. If a category is not present, leave it out."
         )
 
-        input_hash = hash_pil_images([img])
-        cache_key = f"garment_processor:{input_hash}:{categories_text}:{种子}"
-        if 种子 > 0:
-            cached = GLOBAL_RESULT_CACHE.get(cache_key)
-            if cached is not None:
-                out_img = bytes_to_pil_image(cached)
-                out_tensor = pil_list_to_tensor([out_img])
-                return (out_tensor,)
-
-        stop_flag = {"stop": False}
-
-        def _hb():
-            if 刷新间隔秒数 and 刷新间隔秒数 > 0:
-                start = time.perf_counter()
-                i = 0
-                while not stop_flag["stop"]:
-                    time.sleep(刷新间隔秒数)
-                    i += 1
-                    elapsed = int(time.perf_counter() - start)
-                    print(
-                        f"[GeminiGarmentProcessor] waiting... elapsed={elapsed}s (tick {i})"
-                    )
-
-        thread = threading.Thread(target=_hb, daemon=True)
-        thread.start()
-
-        result = {"data": None, "err": None}
-
-        def _worker():
-            try:
-                result["data"] = call_gemini_generate_image(
-                    prompt=prompt,
-                    images=[img],
-                    model=MODEL_NAME,
-                    seed=(种子 if 种子 > 0 else None),
-                    timeout=max(5, int(超时秒数) if isinstance(超时秒数, int) else 60),
-                )
-            except Exception as e:
-                result["err"] = e
-
-        w = threading.Thread(target=_worker, daemon=True)
-        w.start()
-
-        w.join(timeout=max(5, int(超时秒数) if isinstance(超时秒数, int) else 60))
-        stop_flag["stop"] = True
-        if w.is_alive():
-            raise RuntimeError(f"Gemini Garment Processor timed out after {超时秒数}s")
-        if result["err"] is not None:
-            raise RuntimeError(f"Gemini Garment Processor error: {result['err']}")
-        png_bytes = result["data"]
-
-        if 种子 > 0:
-            GLOBAL_RESULT_CACHE.set(cache_key, png_bytes)
-        out_img = bytes_to_pil_image(png_bytes)
-        out_tensor = pil_list_to_tensor([out_img])
-        return (out_tensor,)
+        return self.run_batch([[img] for img in images], prompt, [categories_text], 种子, 超时秒数, 刷新间隔秒数, 并发数, 还原尺寸)
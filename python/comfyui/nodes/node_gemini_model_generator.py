@@ -1,15 +1,7 @@
-from typing import Any, Dict, List
-import threading
-import time
+from typing import Any, Dict
 
-from PIL import Image
-
-from ..gemini_client import call_gemini_generate_image, GeminiAPIError
-from ..utils.image_io import tensor_to_pil_list, bytes_to_pil_image, pil_list_to_tensor, hash_pil_images
-from ..utils.result_cache import GLOBAL_RESULT_CACHE
-
-
-MODEL_NAME = "gemini-2.5-flash-image-preview"
+from ..utils.batch import DEFAULT_MAX_CONCURRENCY
+from .base import GeminiImageNodeBase
 
 
 PROMPT = (
@@ -19,7 +11,7 @@ PROMPT = (
 )
 
 
-class GeminiModelGenerator:
+class GeminiModelGenerator(GeminiImageNodeBase):
     """ComfyUI node: Gemini 模特生成器
 
     Inputs:
@@ -36,74 +28,19 @@ class GeminiModelGenerator:
                 "种子": ("INT", {"default": 0, "min": 0, "max": 2**31 - 1, "tooltip": "用于复现结果；更改或随机化可抽新图"}),
                 "超时秒数": ("INT", {"default": 60, "min": 5, "max": 600, "tooltip": "请求超时自动终止（秒）"}),
                 "刷新间隔秒数": ("INT", {"default": 5, "min": 0, "max": 60, "tooltip": "控制台刷新/心跳频率；0 表示关闭"}),
-            }
+            },
+            "optional": cls.common_optional_inputs(),
         }
 
+    LABEL = "Gemini Model Generator"
+    CACHE_PREFIX = "model_generator"
+
     RETURN_TYPES = ("IMAGE",)
     RETURN_NAMES = ("模特图",)
     FUNCTION = "generate"
     CATEGORY = "Gemini / Fuzhuang"
 
-    def generate(self, 输入图片, 种子: int, 超时秒数: int, 刷新间隔秒数: int):
-        # Convert input tensor to PIL
-        images: List[Image.Image] = tensor_to_pil_list(输入图片)
-        if not images:
-            raise RuntimeError("No input image provided.")
-        img = images[0]
-
-        # Cache key: node + input hash + seed
-        input_hash = hash_pil_images([img])
-        cache_key = f"model_generator:{input_hash}:{种子}"
-        cached = GLOBAL_RESULT_CACHE.get(cache_key)
-        if cached is not None:
-            out_img = bytes_to_pil_image(cached)
-            out_tensor = pil_list_to_tensor([out_img])
-            return (out_tensor,)
-
-        # Heartbeat
-        stop_flag = {"stop": False}
-
-        def _hb():
-            if 刷新间隔秒数 and 刷新间隔秒数 > 0:
-                start = time.perf_counter()
-                tick = 0
-                while not stop_flag["stop"]:
-                    time.sleep(刷新间隔秒数)
-                    tick += 1
-                    elapsed = int(time.perf_counter() - start)
-                    print(f"[GeminiModelGenerator] waiting... elapsed={elapsed}s (tick {tick})")
-
-        t = threading.Thread(target=_hb, daemon=True)
-        t.start()
-
-        result = {"data": None, "err": None}
-
-        def _worker():
-            try:
-                result["data"] = call_gemini_generate_image(
-                    prompt=PROMPT,
-                    images=[img],
-                    model=MODEL_NAME,
-                    seed=种子,
-                    timeout=max(5, int(超时秒数) if isinstance(超时秒数, int) else 60),
-                )
-            except Exception as e:
-                result["err"] = e
-
-        w = threading.Thread(target=_worker, daemon=True)
-        w.start()
-
-        w.join(timeout=max(5, int(超时秒数) if isinstance(超时秒数, int) else 60))
-        stop_flag["stop"] = True
-        if w.is_alive():
-            raise RuntimeError(f"Gemini Model Generator timed out after {超时秒数}s")
-        if result["err"] is not None:
-            raise RuntimeError(f"Gemini Model Generator error: {result['err']}")
-        png_bytes = result["data"]
-
-        GLOBAL_RESULT_CACHE.set(cache_key, png_bytes)
-        out_img = bytes_to_pil_image(png_bytes)
-        out_tensor = pil_list_to_tensor([out_img])
-        return (out_tensor,)
-
+    def generate(self, 输入图片, 种子: int, 超时秒数: int, 刷新间隔秒数: int, 并发数: int = DEFAULT_MAX_CONCURRENCY, 上传格式: str = "global", 上传质量: int = 0, 最长边: int = 0, 还原尺寸: str = "global"):
+        images = self.prepare_images(输入图片, "No input image provided.", 上传格式, 上传质量, 最长边)
 
+        return self.run_batch([[img] for img in images], PROMPT, [], 种子, 超时秒数, 刷新间隔秒数, 并发数, 还原尺寸)
@@ -1,15 +1,7 @@
 from typing import Any, Dict, List
-import threading
-import time
 
-from PIL import Image
-
-from ..gemini_client import call_gemini_generate_image, GeminiAPIError
-from ..utils.image_io import tensor_to_pil_list, bytes_to_pil_image, pil_list_to_tensor, hash_pil_images
-from ..utils.result_cache import GLOBAL_RESULT_CACHE
-
-
-MODEL_NAME = "gemini-2.5-flash-image-preview"
+from ..utils.batch import DEFAULT_MAX_CONCURRENCY
+from .base import GeminiImageNodeBase
 
 
 PROMPT_TEMPLATE = (
@@ -23,7 +15,7 @@ PROMPT_TEMPLATE = (
 )
 
 
-class GeminiOccasionStylist:
+class GeminiOccasionStylist(GeminiImageNodeBase):
     """Gemini 场合造型师
 
     根据“场合”描述为模特生成全新的完整穿搭。支持多开关预设（商务休闲、晚宴、周末早午餐、
@@ -62,9 +54,13 @@ class GeminiOccasionStylist:
                         "tooltip": "生成后控制（ComfyUI 标准流程控制）",
                     },
                 ),
-            }
+            },
+            "optional": cls.common_optional_inputs(),
         }
 
+    LABEL = "Gemini Occasion Stylist"
+    CACHE_PREFIX = "occasion_stylist"
+
     RETURN_TYPES = ("IMAGE",)
     RETURN_NAMES = ("场合造型图",)
     FUNCTION = "style"
@@ -84,11 +80,13 @@ class GeminiOccasionStylist:
         超时秒数: int,
         刷新间隔秒数: int,
         生成后控制: str,
+        并发数: int = DEFAULT_MAX_CONCURRENCY,
+        上传格式: str = "global",
+        上传质量: int = 0,
+        最长边: int = 0,
+        还原尺寸: str = "global",
     ):
-        images: List[Image.Image] = tensor_to_pil_list(模特图)
-        if not images:
-            raise RuntimeError("No model image provided.")
-        img = images[0]
+        images = self.prepare_images(模特图, "No model image provided.", 上传格式, 上传质量, 最长边)
 
         # 优先级：自定义场合 > 开关组合 > 透传
         custom = (自定义场合 or "").strip()
@@ -119,49 +117,4 @@ class GeminiOccasionStylist:
 
         prompt = PROMPT_TEMPLATE.format(occasion=final_occasion)
 
-        # Cache when seed > 0
-        input_hash = hash_pil_images([img])
-        cache_key = f"occasion_stylist:{input_hash}:{final_occasion}:{种子}"
-        if 种子 > 0:
-            cached = GLOBAL_RESULT_CACHE.get(cache_key)
-            if cached is not None:
-                out_img = bytes_to_pil_image(cached)
-                out_tensor = pil_list_to_tensor([out_img])
-                return (out_tensor,)
-
-        # Heartbeat thread for console refresh
-        stop_flag = {"stop": False}
-
-        def _heartbeat():
-            if 刷新间隔秒数 and 刷新间隔秒数 > 0:
-                start = time.perf_counter()
-                counter = 0
-                while not stop_flag["stop"]:
-                    time.sleep(刷新间隔秒数)
-                    counter += 1
-                    elapsed = int(time.perf_counter() - start)
-                    print(f"[GeminiOccasionStylist] waiting for Gemini... elapsed={elapsed}s (tick {counter})")
-
-        thread = threading.Thread(target=_heartbeat, daemon=True)
-        thread.start()
-
-        try:
-            png_bytes = call_gemini_generate_image(
-                prompt=prompt,
-                images=[img],
-                model=MODEL_NAME,
-                seed=(种子 if 种子 > 0 else None),
-                timeout=max(5, int(超时秒数) if isinstance(超时秒数, int) else 60),
-            )
-        except GeminiAPIError as ex:
-            raise RuntimeError(f"Gemini Occasion Stylist error: {ex}")
-        finally:
-            stop_flag["stop"] = True
-
-        if 种子 > 0:
-            GLOBAL_RESULT_CACHE.set(cache_key, png_bytes)
-        out_img = bytes_to_pil_image(png_bytes)
-        out_tensor = pil_list_to_tensor([out_img])
-        return (out_tensor,)
-
-
+        return self.run_batch([[img] for img in images], prompt, [final_occasion], 种子, 超时秒数, 刷新间隔秒数, 并发数, 还原尺寸)
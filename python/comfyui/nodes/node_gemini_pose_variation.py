@@ -1,18 +1,10 @@
-from typing import Any, Dict, List
+from typing import Any, Dict
 
-from PIL import Image
+from ..utils.batch import DEFAULT_MAX_CONCURRENCY
+from .base import GeminiImageNodeBase
 
-from ..gemini_client import call_gemini_generate_image, GeminiAPIError
-from ..utils.image_io import tensor_to_pil_list, bytes_to_pil_image, pil_list_to_tensor, hash_pil_images
-import threading
-import time
-from ..utils.result_cache import GLOBAL_RESULT_CACHE
 
-
-MODEL_NAME = "gemini-2.5-flash-image-preview"
-
-
-class GeminiPoseVariation:
+class GeminiPoseVariation(GeminiImageNodeBase):
     """ComfyUI node: Gemini 姿势变换器（高级版，中文 UI）
 
     Inputs:
@@ -56,19 +48,20 @@ class GeminiPoseVariation:
                 "种子": ("INT", {"default": 0, "min": 0, "max": 2**31 - 1, "tooltip": "种子>0固定并缓存；0表示每次随机"}),
                 "超时秒数": ("INT", {"default": 60, "min": 5, "max": 600, "tooltip": "请求超时自动终止（秒）"}),
                 "刷新间隔秒数": ("INT", {"default": 5, "min": 0, "max": 60, "tooltip": "控制台刷新/心跳频率；0 表示关闭"}),
-            }
+            },
+            "optional": cls.common_optional_inputs(),
         }
 
+    LABEL = "Gemini Pose Variation"
+    CACHE_PREFIX = "pose_variation"
+
     RETURN_TYPES = ("IMAGE",)
     RETURN_NAMES = ("变换姿势图",)
     FUNCTION = "repose"
     CATEGORY = "Gemini / 姿势"
 
-    def repose(self, 输入图片, 姿势预设: str, 自定义姿势: str, 种子: int, 超时秒数: int, 刷新间隔秒数: int):
-        images: List[Image.Image] = tensor_to_pil_list(输入图片)
-        if not images:
-            raise RuntimeError("No source image provided.")
-        img = images[0]
+    def repose(self, 输入图片, 姿势预设: str, 自定义姿势: str, 种子: int, 超时秒数: int, 刷新间隔秒数: int, 并发数: int = DEFAULT_MAX_CONCURRENCY, 上传格式: str = "global", 上传质量: int = 0, 最长边: int = 0, 还原尺寸: str = "global"):
+        images = self.prepare_images(输入图片, "No source image provided.", 上传格式, 上传质量, 最长边)
 
         # Map Chinese labels to concise English instructions for the API
         zh_to_en = {
@@ -90,59 +83,4 @@ class GeminiPoseVariation:
             f"Return ONLY the final image."
         )
 
-        input_hash = hash_pil_images([img])
-        cache_key = f"pose_variation:{input_hash}:{pose_text}:{种子}"
-        if 种子 > 0:
-            cached = GLOBAL_RESULT_CACHE.get(cache_key)
-            if cached is not None:
-                out_img = bytes_to_pil_image(cached)
-                out_tensor = pil_list_to_tensor([out_img])
-                return (out_tensor,)
-
-        stop_flag = {"stop": False}
-
-        def _hb():
-            if 刷新间隔秒数 and 刷新间隔秒数 > 0:
-                start = time.perf_counter()
-                n = 0
-                while not stop_flag["stop"]:
-                    time.sleep(刷新间隔秒数)
-                    n += 1
-                    elapsed = int(time.perf_counter() - start)
-                    print(f"[GeminiPoseVariation] waiting... elapsed={elapsed}s (tick {n})")
-
-        t = threading.Thread(target=_hb, daemon=True)
-        t.start()
-
-        result = {"data": None, "err": None}
-
-        def _worker():
-            try:
-                result["data"] = call_gemini_generate_image(
-                    prompt=prompt,
-                    images=[img],
-                    model=MODEL_NAME,
-                    seed=(种子 if 种子 > 0 else None),
-                    timeout=max(5, int(超时秒数) if isinstance(超时秒数, int) else 60),
-                )
-            except Exception as e:
-                result["err"] = e
-
-        w = threading.Thread(target=_worker, daemon=True)
-        w.start()
-
-        w.join(timeout=max(5, int(超时秒数) if isinstance(超时秒数, int) else 60))
-        stop_flag["stop"] = True
-        if w.is_alive():
-            raise RuntimeError(f"Gemini Pose Variation timed out after {超时秒数}s")
-        if result["err"] is not None:
-            raise RuntimeError(f"Gemini Pose Variation error: {result['err']}")
-        png_bytes = result["data"]
-
-        if 种子 > 0:
-            GLOBAL_RESULT_CACHE.set(cache_key, png_bytes)
-        out_img = bytes_to_pil_image(png_bytes)
-        out_tensor = pil_list_to_tensor([out_img])
-        return (out_tensor,)
-
-
+        return self.run_batch([[img] for img in images], prompt, [pose_text], 种子, 超时秒数, 刷新间隔秒数, 并发数, 还原尺寸)
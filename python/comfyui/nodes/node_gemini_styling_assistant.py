@@ -1,15 +1,7 @@
 from typing import Any, Dict, List
-import threading
-import time
 
-from PIL import Image
-
-from ..gemini_client import call_gemini_generate_image, GeminiAPIError
-from ..utils.image_io import tensor_to_pil_list, bytes_to_pil_image, pil_list_to_tensor, hash_pil_images
-from ..utils.result_cache import GLOBAL_RESULT_CACHE
-
-
-MODEL_NAME = "gemini-2.5-flash-image-preview"
+from ..utils.batch import DEFAULT_MAX_CONCURRENCY
+from .base import GeminiImageNodeBase
 
 
 PROMPT_TEMPLATE = (
@@ -24,7 +16,7 @@ PROMPT_TEMPLATE = (
 )
 
 
-class GeminiStylingAssistant:
+class GeminiStylingAssistant(GeminiImageNodeBase):
     """Gemini 造型助手
 
     接收一张人物图和描述，为人物添加互补的衣物或配饰，完成造型。
@@ -63,19 +55,20 @@ class GeminiStylingAssistant:
                         "tooltip": "生成后控制（ComfyUI 标准流程控制）",
                     },
                 ),
-            }
+            },
+            "optional": cls.common_optional_inputs(),
         }
 
+    LABEL = "Gemini Styling Assistant"
+    CACHE_PREFIX = "styling_assistant"
+
     RETURN_TYPES = ("IMAGE",)
     RETURN_NAMES = ("造型增强图",)
     FUNCTION = "style"
     CATEGORY = "Gemini / 造型"
 
-    def style(self, 图片, 自定义添加: str, 选择外套: bool, 选择上衣: bool, 选择下装: bool, 选择连衣裙: bool, 选择鞋子: bool, 选择配饰: bool, 智能推荐: bool, 种子: int, 超时秒数: int, 刷新间隔秒数: int, 生成后控制: str):
-        images: List[Image.Image] = tensor_to_pil_list(图片)
-        if not images:
-            raise RuntimeError("No input image provided.")
-        img = images[0]
+    def style(self, 图片, 自定义添加: str, 选择外套: bool, 选择上衣: bool, 选择下装: bool, 选择连衣裙: bool, 选择鞋子: bool, 选择配饰: bool, 智能推荐: bool, 种子: int, 超时秒数: int, 刷新间隔秒数: int, 生成后控制: str, 并发数: int = DEFAULT_MAX_CONCURRENCY, 上传格式: str = "global", 上传质量: int = 0, 最长边: int = 0, 还原尺寸: str = "global"):
+        images = self.prepare_images(图片, "No input image provided.", 上传格式, 上传质量, 最长边)
 
         # Build item description with priority: 自定义添加 > 开关项 > 智能推荐 > 透传
         custom = (自定义添加 or "").strip()
@@ -111,61 +104,4 @@ class GeminiStylingAssistant:
 
         prompt = PROMPT_TEMPLATE.format(item_description=final_desc)
 
-        # Cache when seed > 0
-        input_hash = hash_pil_images([img])
-        cache_key = f"styling_assistant:{input_hash}:{final_desc}:{种子}"
-        if 种子 > 0:
-            cached = GLOBAL_RESULT_CACHE.get(cache_key)
-            if cached is not None:
-                out_img = bytes_to_pil_image(cached)
-                out_tensor = pil_list_to_tensor([out_img])
-                return (out_tensor,)
-
-        # Heartbeat
-        stop_flag = {"stop": False}
-
-        def _hb():
-            if 刷新间隔秒数 and 刷新间隔秒数 > 0:
-                start = time.perf_counter()
-                j = 0
-                while not stop_flag["stop"]:
-                    time.sleep(刷新间隔秒数)
-                    j += 1
-                    elapsed = int(time.perf_counter() - start)
-                    print(f"[GeminiStylingAssistant] waiting... elapsed={elapsed}s (tick {j})")
-
-        t = threading.Thread(target=_hb, daemon=True)
-        t.start()
-
-        result = {"data": None, "err": None}
-
-        def _worker():
-            try:
-                result["data"] = call_gemini_generate_image(
-                    prompt=prompt,
-                    images=[img],
-                    model=MODEL_NAME,
-                    seed=(种子 if 种子 > 0 else None),
-                    timeout=max(5, int(超时秒数) if isinstance(超时秒数, int) else 60),
-                )
-            except Exception as e:
-                result["err"] = e
-
-        w = threading.Thread(target=_worker, daemon=True)
-        w.start()
-
-        w.join(timeout=max(5, int(超时秒数) if isinstance(超时秒数, int) else 60))
-        stop_flag["stop"] = True
-        if w.is_alive():
-            raise RuntimeError(f"Gemini Styling Assistant timed out after {超时秒数}s")
-        if result["err"] is not None:
-            raise RuntimeError(f"Gemini Styling Assistant error: {result['err']}")
-        png_bytes = result["data"]
-
-        if 种子 > 0:
-            GLOBAL_RESULT_CACHE.set(cache_key, png_bytes)
-        out_img = bytes_to_pil_image(png_bytes)
-        out_tensor = pil_list_to_tensor([out_img])
-        return (out_tensor,)
-
-
+        return self.run_batch([[img] for img in images], prompt, [final_desc], 种子, 超时秒数, 刷新间隔秒数, 并发数, 还原尺寸)
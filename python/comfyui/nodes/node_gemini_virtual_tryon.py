@@ -1,20 +1,7 @@
-from typing import Any, Dict, List
-import threading
-import time
+from typing import Any, Dict
 
-from PIL import Image
-
-from ..gemini_client import call_gemini_generate_image, GeminiAPIError
-from ..utils.image_io import (
-    tensor_to_pil_list,
-    bytes_to_pil_image,
-    pil_list_to_tensor,
-    hash_pil_images,
-)
-from ..utils.result_cache import GLOBAL_RESULT_CACHE
-
-
-MODEL_NAME = "gemini-2.5-flash-image-preview"
+from ..utils.batch import DEFAULT_MAX_CONCURRENCY, PAIR_MODES, pair_batches
+from .base import GeminiImageNodeBase
 
 
 PROMPT = (
@@ -29,14 +16,16 @@ PROMPT = (
 )
 
 
-class GeminiVirtualTryOn:
+class GeminiVirtualTryOn(GeminiImageNodeBase):
     """ComfyUI node: Gemini 虚拟试衣
 
     Inputs:
       - model_image (IMAGE)
       - garment_image (IMAGE)
+      - pair_mode (zip / cross, optional)
+      - max_concurrency (INT, optional)
     Outputs:
-      - try_on_image (IMAGE)
+      - try_on_image (IMAGE), one image per model/garment pair
     """
 
     @classmethod
@@ -75,80 +64,49 @@ class GeminiVirtualTryOn:
                         "tooltip": "控制台刷新/心跳频率；0 表示关闭",
                     },
                 ),
-            }
+            },
+            "optional": {
+                "批处理模式": (
+                    "STRING",
+                    {
+                        "default": "zip",
+                        "choices": PAIR_MODES,
+                        "ui": {"type": "combo"},
+                        "tooltip": "zip：按序号一一配对（单张自动广播）；cross：模特×服装全组合",
+                    },
+                ),
+                **cls.common_optional_inputs(),
+            },
         }
 
+    LABEL = "Gemini Virtual Try-On"
+    CACHE_PREFIX = "virtual_tryon"
+
     RETURN_TYPES = ("IMAGE",)
     RETURN_NAMES = ("试穿图",)
     FUNCTION = "tryon"
     CATEGORY = "Gemini / 服装"
 
-    def tryon(self, 模特图, 服装图, 种子: int, 超时秒数: int, 刷新间隔秒数: int):
-        model_list: List[Image.Image] = tensor_to_pil_list(模特图)
-        garment_list: List[Image.Image] = tensor_to_pil_list(服装图)
-
-        if not model_list:
-            raise RuntimeError("No model image provided.")
-        if not garment_list:
-            raise RuntimeError("No garment image provided.")
-
-        img_model = model_list[0]
-        img_garment = garment_list[0]
-
-        # Cache key（仅当种子>0时启用缓存）
-        input_hash = hash_pil_images([img_model, img_garment])
-        cache_key = f"virtual_tryon:{input_hash}:{种子}"
-        if 种子 > 0:
-            cached = GLOBAL_RESULT_CACHE.get(cache_key)
-            if cached is not None:
-                out_img = bytes_to_pil_image(cached)
-                out_tensor = pil_list_to_tensor([out_img])
-                return (out_tensor,)
-
-        stop_flag = {"stop": False}
-
-        def _hb():
-            if 刷新间隔秒数 and 刷新间隔秒数 > 0:
-                start = time.perf_counter()
-                k = 0
-                while not stop_flag["stop"]:
-                    time.sleep(刷新间隔秒数)
-                    k += 1
-                    elapsed = int(time.perf_counter() - start)
-                    print(
-                        f"[GeminiVirtualTryOn] waiting... elapsed={elapsed}s (tick {k})"
-                    )
-
-        th = threading.Thread(target=_hb, daemon=True)
-        th.start()
-
-        result = {"data": None, "err": None}
-
-        def _worker():
-            try:
-                result["data"] = call_gemini_generate_image(
-                    prompt=PROMPT,
-                    images=[img_model, img_garment],
-                    model=MODEL_NAME,
-                    seed=(种子 if 种子 > 0 else None),
-                    timeout=max(5, int(超时秒数) if isinstance(超时秒数, int) else 60),
-                )
-            except Exception as e:
-                result["err"] = e
-
-        w = threading.Thread(target=_worker, daemon=True)
-        w.start()
-
-        w.join(timeout=max(5, int(超时秒数) if isinstance(超时秒数, int) else 60))
-        stop_flag["stop"] = True
-        if w.is_alive():
-            raise RuntimeError(f"Gemini Virtual Try-On timed out after {超时秒数}s")
-        if result["err"] is not None:
-            raise RuntimeError(f"Gemini Virtual Try-On error: {result['err']}")
-        png_bytes = result["data"]
-
-        if 种子 > 0:
-            GLOBAL_RESULT_CACHE.set(cache_key, png_bytes)
-        out_img = bytes_to_pil_image(png_bytes)
-        out_tensor = pil_list_to_tensor([out_img])
-        return (out_tensor,)
+    def tryon(
+        self,
+        模特图,
+        服装图,
+        种子: int,
+        超时秒数: int,
+        刷新间隔秒数: int,
+        批处理模式: str = "zip",
+        并发数: int = DEFAULT_MAX_CONCURRENCY,
+        上传格式: str = "global",
+        上传质量: int = 0,
+        最长边: int = 0,
+        还原尺寸: str = "global",
+    ):
+        model_list = self.prepare_images(模特图, "No model image provided.", 上传格式, 上传质量, 最长边)
+        garment_list = self.prepare_images(服装图, "No garment image provided.", 上传格式, 上传质量, 最长边)
+
+        try:
+            pairs = pair_batches(model_list, garment_list, 批处理模式 or "zip")
+        except ValueError as ex:
+            raise RuntimeError(f"{self.LABEL} error: {ex}")
+
+        return self.run_batch(pairs, PROMPT, [], 种子, 超时秒数, 刷新间隔秒数, 并发数, 还原尺寸)
@@ -0,0 +1,12 @@
+"""Command-line entry point of the headless batch runner (see ``batch_runner.py``).
+
+Usage: python run_batch.py MANIFEST --out DIR [--node GeminiVirtualTryOn] [--workers 8] [--seed 1]
+"""
+
+import sys
+
+from utils.plugin_loader import load_plugin_module
+
+
+if __name__ == "__main__":
+    sys.exit(load_plugin_module("batch_runner").main())
@@ -0,0 +1,57 @@
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PLUGIN_DIR, "benchmarks"))
+
+from common import load_plugin_module, use_isolated_config  # noqa: E402
+from mock_server import MockGeminiServer  # noqa: E402
+
+
+# The plugin reads its config at import time: point it at a temporary file (never the real
+# gemini_config.json or API key) and keep the result cache and job journal off
+_fd, CONFIG_PATH = tempfile.mkstemp(prefix="gemini_test_", suffix=".json")
+os.close(_fd)
+use_isolated_config(CONFIG_PATH)
+
+# Fast, deterministic retries unless a test overrides them
+BASE_CONFIG = {
+    "api_key": "test",
+    "result_cache_dir": "",
+    "retry_max_attempts": 3,
+    "retry_backoff_base": 0.05,
+    "retry_jitter": 0.0,
+}
+
+
+def pytest_sessionfinish(session, exitstatus):
+    os.remove(CONFIG_PATH)
+
+
+@pytest.fixture(scope="session")
+def stub():
+    server = MockGeminiServer(latency="fixed:0", image_size=(16, 16)).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def gemini(stub):
+    """Returns ``configure(**options)``: writes the config for the mock server and returns ``gemini_client``."""
+    client = load_plugin_module("gemini_client")
+
+    def configure(**options):
+        with open(CONFIG_PATH, "w", encoding="utf-8") as f:
+            json.dump({**BASE_CONFIG, "endpoint_template": stub.endpoint_template, **options}, f)
+        client.reload_client_config()
+        # Fresh connection pools so connection counts start from zero
+        client.close_http_session()
+        stub.reset()
+        return client
+
+    yield configure
+    client.close_http_session()
@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+from utils.plugin_loader import load_plugin_module
+
+
+batch = load_plugin_module("utils.batch")
+
+
+# pair_batches
+
+def test_zip_pairs_by_index_and_broadcasts_single_images():
+    assert batch.pair_batches([1, 2], ["a", "b"]) == [(1, "a"), (2, "b")]
+    assert batch.pair_batches([1], ["a", "b"]) == [(1, "a"), (1, "b")]
+    assert batch.pair_batches([1, 2], ["a"]) == [(1, "a"), (2, "a")]
+
+
+def test_zip_rejects_mismatched_batches():
+    with pytest.raises(ValueError, match="size 2 and 3"):
+        batch.pair_batches([1, 2], ["a", "b", "c"])
+
+
+def test_cross_is_first_major():
+    assert batch.pair_batches([1, 2], ["a", "b"], "cross") == [(1, "a"), (1, "b"), (2, "a"), (2, "b")]
+
+
+def test_unknown_pair_mode():
+    with pytest.raises(ValueError, match="Unknown pair mode"):
+        batch.pair_batches([1], ["a"], "product")
+
+
+# run_concurrent
+
+def test_clamp_concurrency():
+    assert batch.clamp_concurrency(8, 3) == 3
+    assert batch.clamp_concurrency(0, 3) == 1
+    assert batch.clamp_concurrency("x", 10) == batch.DEFAULT_MAX_CONCURRENCY
+    assert batch.clamp_concurrency(1000, 1000) == batch.MAX_CONCURRENCY_LIMIT
+
+
+def test_results_keep_input_order():
+    def _slow_first(n):
+        time.sleep(0.05 * (5 - n))
+        return n * n
+
+    assert batch.run_concurrent(_slow_first, range(5), 5) == [0, 1, 4, 9, 16]
+    assert batch.run_concurrent(_slow_first, [], 5) == []
+
+
+def test_calls_are_bounded_by_max_concurrency():
+    lock, running, peak = threading.Lock(), [0], [0]
+
+    def _track(n):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return n
+
+    assert batch.run_concurrent(_track, range(8), 3) == list(range(8))
+    assert peak[0] == 3
+
+
+def test_first_failure_is_raised_and_sets_cancel():
+    cancel = threading.Event()
+    stopped = []
+
+    def _work(n):
+        if n == 0:
+            raise KeyError("item 0")
+        # Siblings watch the event, like the node's cancel_check
+        if not cancel.wait(5):
+            return n
+        stopped.append(n)
+        raise RuntimeError("cancelled")
+
+    started = time.monotonic()
+    with pytest.raises(KeyError, match="item 0"):
+        batch.run_concurrent(_work, range(4), 4, cancel=cancel)
+    assert time.monotonic() - started < 2.0
+    # Running siblings had stopped by the time the error was raised
+    assert sorted(stopped) == [1, 2, 3]
+
+
+def test_serial_run_raises_at_once():
+    calls = []
+
+    def _work(n):
+        calls.append(n)
+        if n == 1:
+            raise ValueError("boom")
+        return n
+
+    with pytest.raises(ValueError):
+        batch.run_concurrent(_work, range(4), 1)
+    assert calls == [0, 1]
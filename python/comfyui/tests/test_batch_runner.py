@@ -0,0 +1,36 @@
+import os
+
+from PIL import Image
+
+from utils.plugin_loader import load_plugin_module
+
+
+def _run(batch_runner, out_dir, manifest):
+    os.makedirs(out_dir, exist_ok=True)
+    runner = batch_runner.BatchRunner(out_dir, os.path.dirname(manifest), {"种子": 0})
+    items = list(runner.items(batch_runner.read_manifest(manifest), "GeminiModelGenerator"))
+    checkpoint = batch_runner.Checkpoint(os.path.join(out_dir, batch_runner.CHECKPOINT_FILE))
+    try:
+        runner.run(items, checkpoint, 2)
+    finally:
+        checkpoint.close()
+    return runner.stats
+
+
+def test_resume_from_another_working_directory(gemini, stub, tmp_path, monkeypatch):
+    gemini()
+    batch_runner = load_plugin_module("batch_runner")
+    (tmp_path / "inputs").mkdir()
+    for name in ("a", "b"):
+        Image.new("RGB", (8, 8), (10, 20, 30)).save(tmp_path / "inputs" / f"{name}.png")
+    manifest = tmp_path / "inputs" / "manifest.csv"
+    manifest.write_text("id,image\na,a.png\nb,b.png\n", encoding="utf-8")
+
+    monkeypatch.chdir(tmp_path)
+    assert _run(batch_runner, "out", str(manifest)) == {"done": 2, "failed": 0, "skipped": 0}
+    assert sorted(os.listdir(tmp_path / "out")) == ["a.png", "b.png", batch_runner.CHECKPOINT_FILE]
+
+    (tmp_path / "elsewhere").mkdir()
+    monkeypatch.chdir(tmp_path / "elsewhere")
+    assert _run(batch_runner, os.path.join("..", "out"), str(manifest)) == {"done": 0, "failed": 0, "skipped": 2}
+    assert stub.requests == 2
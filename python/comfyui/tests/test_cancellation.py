@@ -0,0 +1,45 @@
+import time
+
+import pytest
+import torch
+from PIL import Image
+
+from utils.plugin_loader import load_plugin_module
+
+
+IMAGE = Image.new("RGB", (8, 8))
+
+
+def test_timeout_error_reports_the_time_waited(gemini, stub):
+    client = gemini()
+    stub.delay = 3.0
+    handle = client.submit_gemini_generate_image("prompt", [IMAGE], timeout=60)
+    with pytest.raises(client.GeminiAPIError, match=r"after waiting 0\.5s"):
+        handle.result(timeout=0.5)
+    assert handle.timeout == 60
+
+
+def test_cancel_check_stops_the_request(gemini, stub):
+    client = gemini()
+    stub.delay = 3.0
+    started = time.monotonic()
+    with pytest.raises(client.GeminiRequestCancelled):
+        client.call_gemini_generate_image("prompt", [IMAGE], timeout=60, cancel_check=lambda: time.monotonic() - started > 0.3)
+    assert time.monotonic() - started < 2.0
+    deadline = time.monotonic() + 2
+    while client.get_outstanding_requests() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert client.get_outstanding_requests() == 0
+
+
+def test_failed_batch_item_cancels_the_others(gemini, stub):
+    client = gemini()
+    node = load_plugin_module().NODE_CLASS_MAPPINGS["GeminiModelGenerator"]()
+    stub.script(stub.error(400), *[stub.ok(delay=3.0)] * 3)
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match="400"):
+        node.generate(torch.rand(4, 8, 8, 3), 种子=0, 超时秒数=60, 刷新间隔秒数=0, 并发数=4)
+    assert time.monotonic() - started < 2.0
+    assert stub.requests == 4
+    # The siblings were cancelled before the node raised, not left running
+    assert client.get_outstanding_requests() == 0
@@ -0,0 +1,55 @@
+import time
+
+import pytest
+from PIL import Image
+
+
+IMAGE = Image.new("RGB", (8, 8))
+CALLS = 5
+
+
+@pytest.mark.parametrize("transport", ["aiohttp", "requests"])
+def test_sequential_calls_reuse_one_connection(gemini, stub, transport):
+    gemini = gemini(http_transport=transport)
+    for _ in range(CALLS):
+        assert gemini.call_gemini_generate_image("prompt", [IMAGE], timeout=20) == stub.png
+    assert stub.requests == CALLS
+    assert stub.connections == 1
+
+
+@pytest.mark.parametrize("transport", ["aiohttp", "requests"])
+def test_keep_alive_off_opens_a_connection_per_call(gemini, stub, transport):
+    gemini = gemini(http_transport=transport, keep_alive=False)
+    for _ in range(CALLS):
+        gemini.call_gemini_generate_image("prompt", [IMAGE], timeout=20)
+    assert stub.connections == CALLS
+
+
+def test_pool_stats_count_reused_connections(gemini, stub):
+    gemini = gemini(http_transport="requests")
+    for _ in range(CALLS):
+        gemini.call_gemini_generate_image("prompt", [IMAGE], timeout=20)
+    host = next(iter(gemini.get_http_pool_stats()["hosts"].values()))
+    assert host["connections_opened"] == 1
+    assert host["requests"] == CALLS
+
+
+def test_requests_transport_is_not_capped_by_the_default_executor(gemini, stub):
+    # The default executor has min(32, cpu + 4) threads: 5 on a single CPU
+    gemini = gemini(http_transport="requests", pool_connections=1, pool_maxsize=8)
+    stub.delay = 0.5
+    started = time.monotonic()
+    handles = [gemini.submit_gemini_generate_image("prompt", [IMAGE], timeout=20) for _ in range(8)]
+    assert all(handle.result() == stub.png for handle in handles)
+    assert time.monotonic() - started < 0.9
+
+
+def test_configure_http_pool_resizes_the_request_threads(gemini):
+    gemini = gemini(http_transport="requests", pool_connections=2, pool_maxsize=3)
+    assert gemini._get_http_executor()._max_workers == 6
+    gemini.configure_http_pool(pool_maxsize=5)
+    try:
+        assert gemini._get_http_executor()._max_workers == 10
+    finally:
+        gemini._pool_overrides.clear()
+        gemini.close_http_session()
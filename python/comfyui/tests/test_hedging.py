@@ -0,0 +1,103 @@
+import time
+
+import pytest
+from PIL import Image
+
+from utils.plugin_loader import load_plugin_module
+
+
+hedging = load_plugin_module("utils.hedging")
+HedgeTracker = hedging.HedgeTracker
+
+IMAGE = Image.new("RGB", (8, 8))
+HEDGE_CONFIG = {"hedging": True, "hedge_initial_delay_seconds": 0.3, "hedge_min_delay_seconds": 0.3}
+
+
+# HedgeTracker
+
+def test_every_request_earns_max_rate_credit():
+    tracker = HedgeTracker()
+    for _ in range(3):
+        tracker.start_request(0.25)
+    assert not tracker.try_hedge()
+    tracker.start_request(0.25)
+    assert tracker.try_hedge()
+    assert not tracker.try_hedge()
+    stats = tracker.stats()
+    assert (stats["requests"], stats["hedged"], stats["skipped_budget"]) == (4, 1, 2)
+
+
+def test_credit_is_capped():
+    tracker = HedgeTracker()
+    for _ in range(100):
+        tracker.start_request(1.0)
+    assert tracker.stats()["credit"] == hedging.MAX_HEDGE_CREDIT
+    assert sum(tracker.try_hedge() for _ in range(20)) == hedging.MAX_HEDGE_CREDIT
+
+
+def test_delay_needs_history_unless_an_initial_delay_is_set():
+    tracker = HedgeTracker()
+    assert tracker.delay(95, min_samples=3, min_delay=0.5) is None
+    assert tracker.delay(95, min_samples=3, min_delay=0.5, initial_delay=0.2) == 0.5
+    for latency in [1.0, 2.0, 3.0, 4.0, 5.0]:
+        tracker.record(latency)
+    assert tracker.delay(50, min_samples=3, min_delay=0.5) == 3.0
+    assert tracker.delay(100, min_samples=3, min_delay=0.5) == 5.0
+    assert tracker.delay(0, min_samples=3, min_delay=1.5) == 1.5
+
+
+def test_window_keeps_the_latest_samples():
+    tracker = HedgeTracker(window=3)
+    for latency in [9.0, 1.0, 1.0, 1.0]:
+        tracker.record(latency)
+    assert tracker.delay(100, min_samples=1, min_delay=0.0) == 1.0
+
+
+# _send_hedged against the mock server
+
+def test_slow_request_is_hedged_and_the_duplicate_wins(gemini, stub):
+    client = gemini(hedge_max_rate=1.0, **HEDGE_CONFIG)
+    before = client.get_hedge_stats()
+    stub.script(stub.ok(delay=3.0), stub.ok(delay=0.0))
+    started = time.monotonic()
+    assert client.call_gemini_generate_image("prompt", [IMAGE], timeout=20) == stub.png
+    assert time.monotonic() - started < 2.0
+    assert stub.requests == 2
+    after = client.get_hedge_stats()
+    assert after["hedged"] - before["hedged"] == 1
+    assert after["hedge_wins"] - before["hedge_wins"] == 1
+    # The losing primary was cancelled, not left running
+    deadline = time.monotonic() + 2
+    while client.get_outstanding_requests() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert client.get_outstanding_requests() == 0
+
+
+def test_fast_request_is_not_hedged(gemini, stub):
+    client = gemini(hedge_max_rate=1.0, **HEDGE_CONFIG)
+    before = client.get_hedge_stats()
+    assert client.call_gemini_generate_image("prompt", [IMAGE], timeout=20) == stub.png
+    assert stub.requests == 1
+    assert client.get_hedge_stats()["hedged"] == before["hedged"]
+
+
+def test_no_hedge_without_budget(gemini, stub):
+    client = gemini(hedge_max_rate=0.0, **HEDGE_CONFIG)
+    while client._hedge_tracker.try_hedge():
+        pass  # spend the credit left over from other tests
+    before = client.get_hedge_stats()
+    stub.script(stub.ok(delay=0.6))
+    assert client.call_gemini_generate_image("prompt", [IMAGE], timeout=20) == stub.png
+    assert stub.requests == 1
+    after = client.get_hedge_stats()
+    assert after["hedged"] == before["hedged"]
+    assert after["skipped_budget"] - before["skipped_budget"] == 1
+
+
+def test_primary_error_is_reported_when_no_copy_succeeds(gemini, stub):
+    client = gemini(hedge_max_rate=1.0, retry_max_attempts=1, **HEDGE_CONFIG)
+    stub.script(stub.error(400, delay=0.6), stub.error(500))
+    with pytest.raises(client.GeminiAPIError) as info:
+        client.call_gemini_generate_image("prompt", [IMAGE], timeout=20)
+    assert info.value.status_code == 400
+    assert stub.requests == 2
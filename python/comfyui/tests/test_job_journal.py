@@ -0,0 +1,55 @@
+import io
+import json
+
+from PIL import Image
+
+from utils.plugin_loader import load_plugin_module
+
+
+JobJournal = load_plugin_module("utils.job_journal").JobJournal
+
+
+def _encoded(fmt: str) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (4, 4)).save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def test_output_extension_follows_the_image_format(tmp_path):
+    journal = JobJournal(str(tmp_path))
+    for key, fmt, extension in [("a", "PNG", ".png"), ("b", "JPEG", ".jpg"), ("c", "WEBP", ".webp")]:
+        data = _encoded(fmt)
+        journal.started(key, "Node")
+        journal.done(key, "Node", data)
+        assert journal.entry(key)["output"].endswith(extension)
+        assert journal.get(key) == data
+
+
+def test_only_done_jobs_are_resumed(tmp_path):
+    journal = JobJournal(str(tmp_path))
+    journal.started("k", "Node")
+    journal.done("k", "Node", _encoded("PNG"))
+    # A later attempt that failed (or never finished) makes the job due again
+    journal.started("k", "Node")
+    assert journal.get("k") is None
+    journal.failed("k", "Node", "boom")
+    assert journal.get("k") is None
+    assert JobJournal(str(tmp_path)).get("k") is None
+
+
+def test_jobs_finished_by_another_process_are_resumed(tmp_path):
+    first, second = JobJournal(str(tmp_path)), JobJournal(str(tmp_path))
+    data = _encoded("PNG")
+    first.started("k", "Node")
+    assert second.get("k") is None
+    first.done("k", "Node", data)
+    assert second.get("k") == data
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    journal = JobJournal(str(tmp_path))
+    journal.started("k", "Node")
+    journal.done("k", "Node", _encoded("PNG"))
+    with open(tmp_path / "journal.jsonl", "a", encoding="utf-8") as f:
+        f.write(json.dumps({"key": "k", "status": "started"})[:20])
+    assert JobJournal(str(tmp_path)).get("k") is not None
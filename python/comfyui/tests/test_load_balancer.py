@@ -0,0 +1,43 @@
+import pytest
+from PIL import Image
+
+
+def test_balancers_are_kept_per_explicit_key(gemini):
+    client = gemini()
+    assert client.get_load_balancer() is client.get_load_balancer()
+    assert client.get_load_balancer("node-key") is client.get_load_balancer("node-key")
+    assert client.get_load_balancer("node-key") is not client.get_load_balancer("other-key")
+    assert client.get_load_balancer("node-key") is not client.get_load_balancer()
+
+
+def test_config_change_rebuilds_the_balancers(gemini):
+    before = gemini().get_load_balancer("node-key")
+    assert gemini(load_balancing="least_in_flight").get_load_balancer("node-key") is not before
+
+
+def test_request_carries_the_balancer_it_was_prepared_with(gemini, stub):
+    client = gemini()
+    request = client._prepare_request("prompt", [Image.new("RGB", (8, 8))], "model", "node-key", None)
+    assert request.balancer is client.get_load_balancer("node-key")
+    assert client.call_gemini_generate_image("prompt", [Image.new("RGB", (8, 8))], api_key="node-key", timeout=20) == stub.png
+
+
+def test_single_endpoint_and_key_strings_are_one_element_lists(gemini, stub):
+    client = gemini(endpoints=stub.endpoint_template, api_keys="key-b")
+    backends = client._resolve_backends(client.get_client_config())
+    host = stub.url.split("//", 1)[1]
+    assert [name for name, _ in backends] == [f"{host}/...test", f"{host}/...ey-b"]
+    client = gemini(endpoints=[{"endpoint_template": stub.endpoint_template, "api_keys": "own-key"}])
+    assert [backend.api_key for _, backend in client._resolve_backends(client.get_client_config())] == ["own-key"]
+
+
+@pytest.mark.parametrize("option", [
+    {"endpoints": 8080},
+    {"endpoints": ["https://proxy.example.com", 8080]},
+    {"api_keys": {"key": "value"}},
+    {"endpoints": [{"base_url": "https://proxy.example.com", "api_keys": 5}]},
+])
+def test_malformed_backend_lists_are_config_errors(gemini, option):
+    client = gemini(**option)
+    with pytest.raises(client.GeminiAPIError, match="Invalid '(endpoints|api_keys|endpoints\\[\\]\\.api_keys)'"):
+        client.get_load_balancer()
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from utils.plugin_loader import load_plugin_module
+
+
+rate_limit = load_plugin_module("utils.rate_limit")
+TokenBucket = rate_limit.TokenBucket
+RequestGovernor = rate_limit.RequestGovernor
+RateLimitExceeded = rate_limit.RateLimitExceeded
+
+
+# TokenBucket
+
+def test_bucket_goes_negative_and_reports_the_wait():
+    bucket = TokenBucket("requests", rate_per_minute=60, burst=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+    assert bucket.reserve() == pytest.approx(2.0, abs=0.05)
+
+
+def test_refund_returns_the_tokens():
+    bucket = TokenBucket("requests", rate_per_minute=60, burst=1)
+    bucket.reserve()
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+    bucket.refund(1)
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+
+
+def test_shared_buckets_draw_from_one_budget(tmp_path):
+    path = str(tmp_path / "rate" / "budget.json")
+    first = TokenBucket("requests", rate_per_minute=60, burst=2, shared_path=path)
+    second = TokenBucket("requests", rate_per_minute=60, burst=2, shared_path=path)
+    assert first.shared
+    assert first.reserve() == 0.0
+    assert second.reserve() == 0.0
+    assert first.reserve() == pytest.approx(1.0, abs=0.05)
+    with open(path, "rb") as f:
+        tokens, updated = json.load(f)["requests"]
+    assert tokens == pytest.approx(-1.0, abs=0.05)
+    second.refund(1)
+    assert first.reserve() == pytest.approx(1.0, abs=0.05)
+
+
+def test_unreadable_shared_state_starts_a_full_bucket(tmp_path):
+    path = tmp_path / "budget.json"
+    path.write_bytes(b"{torn")
+    bucket = TokenBucket("requests", rate_per_minute=60, burst=1, shared_path=str(path))
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+
+
+# RequestGovernor
+
+async def _use_slot(governor, deadline_in, hold=0.0, tokens=1):
+    async with governor.slot(tokens, time.monotonic() + deadline_in):
+        await asyncio.sleep(hold)
+
+
+def test_disabled_governor_does_not_count():
+    governor = RequestGovernor()
+    assert not governor.enabled
+    asyncio.run(_use_slot(governor, 1))
+    assert governor.stats()["requests"] == 0
+
+
+def test_rate_wait_past_the_deadline_is_rejected_and_refunded():
+    governor = RequestGovernor(requests_per_minute=60, burst=1)
+    asyncio.run(_use_slot(governor, 5))
+    with pytest.raises(RateLimitExceeded, match="past the deadline"):
+        asyncio.run(_use_slot(governor, 0.5))
+    assert governor.stats()["rejected"] == 1
+    # Only the first request's token is spent
+    assert governor._reserve(0) == pytest.approx(1.0, abs=0.05)
+
+
+def test_throttled_request_waits_for_budget():
+    governor = RequestGovernor(requests_per_minute=600, burst=1)
+    started = time.monotonic()
+    asyncio.run(_use_slot(governor, 5))
+    asyncio.run(_use_slot(governor, 5))
+    assert time.monotonic() - started >= 0.08
+    stats = governor.stats()
+    assert stats["throttled"] == 1
+    assert stats["requests"] == 2
+
+
+def test_cancelled_rate_wait_refunds():
+    governor = RequestGovernor(requests_per_minute=60, burst=1)
+
+    async def _scenario():
+        await _use_slot(governor, 5)
+        waiting = asyncio.ensure_future(_use_slot(governor, 5))
+        await asyncio.sleep(0.1)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+    asyncio.run(_scenario())
+    # Without the refund the next request would wait about 1.9s
+    assert governor._reserve(0) == pytest.approx(0.9, abs=0.1)
+
+
+def test_no_free_slot_before_the_deadline_refunds():
+    governor = RequestGovernor(requests_per_minute=60, max_concurrent=1, burst=2)
+
+    async def _scenario():
+        holder = asyncio.ensure_future(_use_slot(governor, 5, hold=0.5))
+        await asyncio.sleep(0.05)
+        with pytest.raises(RateLimitExceeded, match="no free request slot"):
+            await _use_slot(governor, 0.1)
+        await holder
+
+    asyncio.run(_scenario())
+    stats = governor.stats()
+    assert stats["rejected"] == 1
+    assert stats["peak_in_flight"] == 1
+    # The rejected request's token came back: one of the two burst tokens is left
+    assert governor._reserve(0) == 0.0
+
+
+def test_shared_budget_is_updated_off_the_event_loop(tmp_path):
+    governor = RequestGovernor(requests_per_minute=60, burst=1, shared_path=str(tmp_path / "budget.json"))
+    reserve, threads = governor._reserve, []
+    governor._reserve = lambda tokens: (threads.append(threading.get_ident()), reserve(tokens))[1]
+
+    async def _scenario():
+        await _use_slot(governor, 5)
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(_scenario())
+    assert threads and loop_thread not in threads
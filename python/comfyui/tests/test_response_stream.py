@@ -0,0 +1,55 @@
+import base64
+import json
+
+import pytest
+from PIL import Image
+
+from utils.plugin_loader import load_plugin_module
+
+
+StreamingImageExtractor = load_plugin_module("utils.response_stream").StreamingImageExtractor
+
+
+def _body(data: bytes) -> bytes:
+    part = {"inline_data": {"mime_type": "image/png", "data": base64.b64encode(data).decode("ascii")}}
+    return json.dumps({"candidates": [{"content": {"parts": [{"text": "here"}, part]}}]}).encode("utf-8")
+
+
+def test_decodes_in_chunks_into_a_single_buffer():
+    image = bytes(range(256)) * 40
+    body = _body(image)
+    extractor = StreamingImageExtractor(size_hint=len(body))
+    for start in range(0, len(body), 97):
+        extractor.feed(body[start:start + 97])
+    result = extractor.image_bytes()
+    assert result == image
+    # A view of the decode buffer, without a second copy of the image, that cannot be modified
+    assert result.obj is extractor.image_bytes().obj
+    assert result.readonly
+    with pytest.raises(TypeError):
+        result[0] = 0
+
+
+def test_no_image_keeps_the_body_for_error_reporting():
+    body = json.dumps({"promptFeedback": {"blockReason": "SAFETY"}}).encode("utf-8")
+    extractor = StreamingImageExtractor()
+    extractor.feed(body)
+    assert extractor.image_bytes() is None
+    assert extractor.head == body
+
+
+def test_sse_mode_needs_a_generate_content_endpoint(gemini, stub):
+    client = gemini(response_mode="sse", endpoint_template=f"{stub.url}/custom/{{model}}")
+    request = client._prepare_request("prompt", [Image.new("RGB", (8, 8))], "model", None, None)
+    (_, backend), = client._resolve_backends(client.get_client_config())
+    routed = client._route(request, backend)
+    assert routed.mode == "stream"
+    assert "alt" not in routed.params
+    assert client.call_gemini_generate_image("prompt", [Image.new("RGB", (8, 8))], timeout=20) == stub.png
+
+
+def test_streamed_result_is_read_only(gemini, stub):
+    client = gemini(response_mode="stream")
+    result = client.call_gemini_generate_image("prompt", [Image.new("RGB", (8, 8))], timeout=20)
+    assert result == stub.png
+    assert not isinstance(result, bytearray)
@@ -0,0 +1,12 @@
+import pytest
+
+
+@pytest.mark.parametrize("configured", [False, True])
+def test_node_input_overrides_the_config_both_ways(gemini, configured):
+    client = gemini(restore_input_size=configured)
+    assert client.restore_input_size_enabled("on") is True
+    assert client.restore_input_size_enabled("off") is False
+    assert client.restore_input_size_enabled(True) is True
+    assert client.restore_input_size_enabled(False) is False
+    assert client.restore_input_size_enabled("global") is configured
+    assert client.restore_input_size_enabled(None) is configured
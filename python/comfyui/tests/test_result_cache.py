@@ -0,0 +1,46 @@
+import os
+
+from utils.plugin_loader import load_plugin_module
+
+
+result_cache = load_plugin_module("utils.result_cache")
+DiskCache = result_cache.DiskCache
+
+
+def _directory_size(root):
+    return sum(os.path.getsize(os.path.join(path, name)) for path, _, names in os.walk(root) for name in names if name.endswith(".bin"))
+
+
+def test_processes_sharing_a_directory_stay_within_one_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache, "DISK_CACHE_NEAR_BUDGET_RESCAN_SECONDS", 0.0)
+    # Two caches on one directory stand in for two processes
+    first = DiskCache(str(tmp_path), max_bytes=10_000)
+    second = DiskCache(str(tmp_path), max_bytes=10_000)
+    for n in range(20):
+        (first if n % 2 else second).set(f"key-{n}", os.urandom(1_000))
+    assert _directory_size(tmp_path) <= 10_000
+    assert second.get("key-19") is not None
+
+
+def test_periodic_rescan_sees_other_writers(tmp_path, monkeypatch):
+    first = DiskCache(str(tmp_path), max_bytes=5_000)
+    other = DiskCache(str(tmp_path), max_bytes=1_000_000)
+    first.set("mine", os.urandom(1_000))
+    for n in range(6):
+        other.set(f"theirs-{n}", os.urandom(1_000))
+    # Within the rescan interval the estimate only knows about this process's writes
+    first.set("mine-2", os.urandom(100))
+    assert _directory_size(tmp_path) > 5_000
+    monkeypatch.setattr(result_cache, "DISK_CACHE_RESCAN_SECONDS", 0.0)
+    first.set("mine-3", os.urandom(100))
+    assert _directory_size(tmp_path) <= 5_000
+
+
+def test_disk_tier_is_opt_in(gemini, tmp_path, monkeypatch):
+    monkeypatch.delenv("GEMINI_RESULT_CACHE_DIR", raising=False)
+    gemini(result_cache_dir=None)
+    assert result_cache._disk_cache_from_config() is None
+    gemini(result_cache_dir=str(tmp_path))
+    assert isinstance(result_cache._disk_cache_from_config(), DiskCache)
+    monkeypatch.setenv("GEMINI_RESULT_CACHE_DIR", "")
+    assert result_cache._disk_cache_from_config() is None
@@ -0,0 +1,100 @@
+import time
+
+import pytest
+from PIL import Image
+
+from utils.plugin_loader import load_plugin_module
+
+
+client = load_plugin_module("gemini_client")
+RetryPolicy = client.RetryPolicy
+GeminiAPIError = client.GeminiAPIError
+
+TRANSPORTS = ["aiohttp", "requests"]
+IMAGE = Image.new("RGB", (8, 8))
+
+
+# RetryPolicy
+
+def test_backoff_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(client.random, "random", lambda: 0.0)
+    policy = RetryPolicy(backoff_base=1.0, backoff_max=5.0, jitter=0.5)
+    assert [policy.delay(n) for n in range(1, 6)] == [1.0, 2.0, 4.0, 5.0, 5.0]
+
+
+def test_jitter_only_shortens_the_backoff(monkeypatch):
+    policy = RetryPolicy(backoff_base=2.0, backoff_max=20.0, jitter=0.25)
+    for n in range(1, 5):
+        backoff = min(20.0, 2.0 * 2 ** (n - 1))
+        for _ in range(200):
+            assert backoff * 0.75 <= policy.delay(n) <= backoff
+    monkeypatch.setattr(client.random, "random", lambda: 1.0)
+    assert policy.delay(2) == pytest.approx(3.0)
+
+
+def test_retry_after_is_a_lower_bound():
+    policy = RetryPolicy(backoff_base=1.0, backoff_max=20.0, jitter=0.0)
+    assert policy.delay(1, retry_after=7.5) == 7.5
+    assert policy.delay(4, retry_after=0.5) == 8.0
+
+
+def test_retryable_errors():
+    policy = RetryPolicy()
+    assert policy.is_retryable(GeminiAPIError("overloaded", 503))
+    assert policy.is_retryable(GeminiAPIError("quota", 429))
+    assert not policy.is_retryable(GeminiAPIError("bad request", 400))
+    assert policy.is_retryable(GeminiAPIError("reset", transient=True))
+    assert not policy.is_retryable(GeminiAPIError("no image in response"))
+    assert not RetryPolicy(retry_network_errors=False).is_retryable(GeminiAPIError("reset", transient=True))
+
+
+def test_policy_from_config(gemini):
+    policy = gemini(retry_max_attempts=0, retry_jitter=3, retry_statuses=[503]).get_retry_policy()
+    assert policy.max_attempts == 1
+    assert policy.jitter == 1.0
+    assert policy.retry_statuses == frozenset({503})
+
+
+# Scripted stub sequences
+
+@pytest.mark.parametrize("transport", TRANSPORTS)
+def test_retries_through_503_and_429(gemini, stub, transport):
+    gemini = gemini(http_transport=transport)
+    stub.script(stub.error(503, retry_after="1"), stub.error(429), stub.ok())
+    started = time.monotonic()
+    assert gemini.call_gemini_generate_image("prompt", [IMAGE], timeout=20) == stub.png
+    assert stub.requests == 3
+    # The first retry waits for Retry-After rather than the 0.05s backoff
+    assert time.monotonic() - started >= 1.0
+
+
+@pytest.mark.parametrize("transport", TRANSPORTS)
+def test_client_error_is_not_retried(gemini, stub, transport):
+    gemini = gemini(http_transport=transport)
+    stub.script(stub.error(400))
+    with pytest.raises(GeminiAPIError) as info:
+        gemini.call_gemini_generate_image("prompt", [IMAGE], timeout=20)
+    assert info.value.status_code == 400
+    assert stub.requests == 1
+
+
+@pytest.mark.parametrize("transport", TRANSPORTS)
+def test_retry_after_past_the_deadline_fails_at_once(gemini, stub, transport):
+    gemini = gemini(http_transport=transport)
+    stub.script(stub.error(503, retry_after="30"))
+    started = time.monotonic()
+    with pytest.raises(GeminiAPIError) as info:
+        gemini.call_gemini_generate_image("prompt", [IMAGE], timeout=5)
+    assert info.value.status_code == 503
+    assert stub.requests == 1
+    assert time.monotonic() - started < 2.0
+
+
+@pytest.mark.parametrize("transport", TRANSPORTS)
+def test_gives_up_after_max_attempts(gemini, stub, transport):
+    gemini = gemini(http_transport=transport)
+    stub.script(*[stub.error(503)] * 3, stub.ok())
+    with pytest.raises(GeminiAPIError, match="gave up after 3 attempts") as info:
+        gemini.call_gemini_generate_image("prompt", [IMAGE], timeout=20)
+    assert info.value.status_code == 503
+    assert stub.requests == 3
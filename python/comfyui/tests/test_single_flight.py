@@ -0,0 +1,126 @@
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+import pytest
+import torch
+
+from utils.plugin_loader import load_plugin_module
+
+
+SingleFlight = load_plugin_module("utils.single_flight").SingleFlight
+
+
+def _start_leader(flight, release, key="k"):
+    pool = ThreadPoolExecutor(max_workers=1)
+    started = threading.Event()
+
+    def _slow():
+        started.set()
+        release.wait(5)
+        return "leader"
+
+    future = pool.submit(flight.do, key, _slow)
+    started.wait(5)
+    pool.shutdown(wait=False)
+    return future
+
+
+def test_waiting_caller_honours_its_cancel_check():
+    flight, release = SingleFlight(), threading.Event()
+    leader = _start_leader(flight, release)
+    started = time.monotonic()
+    with pytest.raises(CancelledError):
+        flight.do("k", lambda: "follower", cancel_check=lambda: time.monotonic() - started > 0.3)
+    assert time.monotonic() - started < 1.5
+    release.set()
+    assert leader.result(5) == "leader"
+
+
+def test_waiting_caller_times_out_without_the_leader():
+    flight, release = SingleFlight(), threading.Event()
+    leader = _start_leader(flight, release)
+    with pytest.raises(TimeoutError, match="0.3s"):
+        flight.do("k", lambda: "follower", timeout=0.3)
+    release.set()
+    assert leader.result(5) == "leader"
+
+
+def test_leader_timeout_error_reaches_the_waiting_caller():
+    flight, release = SingleFlight(), threading.Event()
+
+    def _fail():
+        release.wait(5)
+        raise TimeoutError("upstream")
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        leader = pool.submit(flight.do, "k", _fail)
+        while not flight.in_flight():
+            time.sleep(0.01)
+        threading.Timer(0.3, release.set).start()
+        with pytest.raises(TimeoutError, match="upstream"):
+            flight.do("k", lambda: "follower", timeout=5)
+        with pytest.raises(TimeoutError):
+            leader.result(5)
+
+
+def test_only_the_leader_caches_a_coalesced_result(gemini, stub, monkeypatch):
+    gemini()
+    result_cache = load_plugin_module("utils.result_cache")
+    stored = []
+    set_result = result_cache.GLOBAL_RESULT_CACHE.set
+    monkeypatch.setattr(result_cache.GLOBAL_RESULT_CACHE, "set", lambda key, value: (stored.append(key), set_result(key, value)))
+    node = load_plugin_module().NODE_CLASS_MAPPINGS["GeminiModelGenerator"]()
+    stub.script(stub.ok(delay=0.5))
+    # Two identical images in one batch share one cache key
+    out = node.generate(torch.rand(1, 8, 8, 3).repeat(2, 1, 1, 1), 种子=7, 超时秒数=60, 刷新间隔秒数=0, 并发数=2)[0]
+    assert out.shape[0] == 2
+    assert stub.requests == 1
+    assert len(stored) == 1
+
+
+def test_waiting_callers_share_the_leaders_result():
+    flight, release, calls = SingleFlight(), threading.Event(), []
+
+    def _slow():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        leader = pool.submit(flight.do, "k", _slow)
+        while not flight.in_flight():
+            time.sleep(0.01)
+        followers = [pool.submit(flight.do, "k", _slow) for _ in range(3)]
+        time.sleep(0.1)
+        release.set()
+        assert [f.result(5) for f in [leader, *followers]] == ["result"] * 4
+    assert calls == [1]
+    assert flight.stats() == {"calls": 1, "shared": 3, "in_flight": 0}
+
+
+def test_leader_exception_reaches_every_caller_and_is_not_kept():
+    flight, release = SingleFlight(), threading.Event()
+
+    def _fail():
+        release.wait(5)
+        raise ValueError("upstream")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "k", _fail)
+        while not flight.in_flight():
+            time.sleep(0.01)
+        follower = pool.submit(flight.do, "k", lambda: "follower")
+        time.sleep(0.1)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(ValueError, match="upstream"):
+                future.result(5)
+    # Nothing is cached: the next call runs again
+    assert flight.do("k", lambda: "again") == "again"
+
+
+def test_no_key_never_coalesces():
+    flight = SingleFlight()
+    assert flight.do(None, lambda: 1) == 1
+    assert flight.stats() == {"calls": 0, "shared": 0, "in_flight": 0}
@@ -0,0 +1,78 @@
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from threading import Event
+from typing import Callable, List, Optional, Sequence, Tuple, TypeVar
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+DEFAULT_MAX_CONCURRENCY = 4
+MAX_CONCURRENCY_LIMIT = 32
+
+PAIR_MODES = ["zip", "cross"]
+
+
+def clamp_concurrency(value, count: int) -> int:
+    """Clamp a user supplied concurrency value to [1, min(count, MAX_CONCURRENCY_LIMIT)]."""
+    try:
+        value = int(value)
+    except Exception:
+        value = DEFAULT_MAX_CONCURRENCY
+    return max(1, min(value, MAX_CONCURRENCY_LIMIT, max(1, count)))
+
+
+def pair_batches(first: Sequence[T], second: Sequence[R], mode: str = "zip") -> List[Tuple[T, R]]:
+    """Combine two input batches into a list of (first, second) pairs.
+
+    - zip: pair items index by index; a batch of size 1 is broadcast to the other batch size
+    - cross: every item of ``first`` combined with every item of ``second`` (first-major order)
+    """
+    if mode == "cross":
+        return [(a, b) for a in first for b in second]
+    if mode == "zip":
+        if len(first) == len(second):
+            return list(zip(first, second))
+        if len(first) == 1:
+            return [(first[0], b) for b in second]
+        if len(second) == 1:
+            return [(a, second[0]) for a in first]
+        raise ValueError(
+            f"Cannot zip batches of size {len(first)} and {len(second)}; use matching sizes, a single image, or 'cross' mode."
+        )
+    raise ValueError(f"Unknown pair mode '{mode}', expected one of {PAIR_MODES}")
+
+
+def run_concurrent(
+    fn: Callable[[T], R],
+    items: Sequence[T],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    cancel: Optional[Event] = None,
+) -> List[R]:
+    """Apply ``fn`` to every item with at most ``max_concurrency`` calls in flight.
+
+    Results are returned in input order. The first exception raised by any call is re-raised
+    and items that have not started yet are cancelled. Calls already running cannot be stopped
+    from here: ``fn`` should watch ``cancel``, which is set on the first failure, and the
+    exception is only re-raised once they have returned.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    workers = clamp_concurrency(max_concurrency, len(items))
+    if workers == 1:
+        return [fn(item) for item in items]
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gemini-batch")
+    try:
+        futures = [pool.submit(fn, item) for item in items]
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        for fut in futures:
+            if fut in done and fut.exception() is not None:
+                if cancel is not None:
+                    cancel.set()
+                    pool.shutdown(wait=True, cancel_futures=True)
+                raise fut.exception()
+        return [fut.result() for fut in futures]
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
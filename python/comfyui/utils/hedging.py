@@ -0,0 +1,58 @@
+from collections import deque
+from threading import Lock
+from typing import Optional
+
+
+LATENCY_WINDOW = 200
+# Unused hedge budget is capped so a quiet period cannot be followed by a burst of hedges
+MAX_HEDGE_CREDIT = 10.0
+
+
+class HedgeTracker:
+    """Latency history and hedge budget behind hedged requests.
+
+    The hedge delay is a percentile of recent request latencies. Every request earns
+    ``max_rate`` credit and every hedge spends one, so at most that fraction of requests
+    (plus a small burst) are ever duplicated.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._lock = Lock()
+        self._samples = deque(maxlen=window)
+        self._credit = 0.0
+        self._stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "skipped_budget": 0}
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._samples.append(latency)
+
+    def delay(self, percentile: float, min_samples: int, min_delay: float, initial_delay: Optional[float] = None) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is not enough history."""
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return max(min_delay, initial_delay) if initial_delay else None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(percentile / 100.0 * (len(ordered) - 1))))
+        return max(min_delay, ordered[index])
+
+    def start_request(self, max_rate: float) -> None:
+        with self._lock:
+            self._stats["requests"] += 1
+            self._credit = min(MAX_HEDGE_CREDIT, self._credit + max(0.0, max_rate))
+
+    def try_hedge(self) -> bool:
+        with self._lock:
+            if self._credit < 1.0:
+                self._stats["skipped_budget"] += 1
+                return False
+            self._credit -= 1.0
+            self._stats["hedged"] += 1
+            return True
+
+    def hedge_won(self) -> None:
+        with self._lock:
+            self._stats["hedge_wins"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "samples": len(self._samples), "credit": round(self._credit, 2)}
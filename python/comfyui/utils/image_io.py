@@ -1,6 +1,10 @@
+import base64
 import io
 import hashlib
-from typing import List
+import math
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple, Union
 
 import numpy as np
 from PIL import Image
@@ -10,17 +14,26 @@ try:
 except Exception:  # pragma: no cover - ComfyUI provides torch
     torch = None
 
+try:
+    import xxhash
+except Exception:  # pragma: no cover - optional faster hash
+    xxhash = None
+
+
+# Algorithm used by nodes for cache keys. sha256 is hardware accelerated on most CPUs and keeps
+# keys stable across machines; "blake2b" and "xxh3" (optional xxhash package) are also supported.
+DEFAULT_PIXEL_HASH = "sha256"
+
+# A node result: a PIL image, or a read-only uint8 [H,W,3] array from the decoded-result cache
+DecodedImage = Union[Image.Image, np.ndarray]
+
 
 def _ensure_torch_available():
     if torch is None:
         raise RuntimeError("PyTorch is required in ComfyUI runtime but was not found.")
 
 
-def tensor_to_pil_list(image_tensor) -> List[Image.Image]:
-    """Convert ComfyUI IMAGE tensor [B,H,W,C] float32(0..1) to list of PIL.Image (RGB).
-
-    Supports batch processing; returns one PIL image per batch.
-    """
+def _tensor_to_uint8(image_tensor) -> np.ndarray:
     _ensure_torch_available()
 
     if image_tensor is None:
@@ -34,48 +47,176 @@ def tensor_to_pil_list(image_tensor) -> List[Image.Image]:
             f"Expected image tensor shape [B,H,W,3], got {tuple(image_tensor.shape)}"
         )
 
-    images: List[Image.Image] = []
-    batch, height, width, channels = image_tensor.shape
+    # Scale one image at a time into a reused float scratch buffer (on the tensor's own device, so
+    # only uint8 data is transferred from a GPU) and round into a single preallocated uint8 batch.
+    image_tensor = image_tensor.detach()
+    out = torch.empty(tuple(image_tensor.shape), dtype=torch.uint8)
+    scratch = torch.empty(tuple(image_tensor.shape[1:]), dtype=torch.float32, device=image_tensor.device)
+    for i in range(image_tensor.shape[0]):
+        torch.mul(image_tensor[i], 255.0, out=scratch)
+        # +0.5 then truncation on the uint8 cast rounds to nearest
+        scratch.add_(0.5).clamp_(0.0, 255.0)
+        out[i].copy_(scratch)
+    return out.numpy()
+
 
-    image_tensor = image_tensor.detach().cpu().clamp(0.0, 1.0)
-    np_images = (image_tensor.numpy() * 255.0).astype(np.uint8)
-    for i in range(batch):
+def tensor_to_pil_list(image_tensor) -> List[Image.Image]:
+    """Convert ComfyUI IMAGE tensor [B,H,W,C] float32(0..1) to list of PIL.Image (RGB).
+
+    Supports batch processing; returns one PIL image per batch.
+    """
+    np_images = _tensor_to_uint8(image_tensor)
+    images: List[Image.Image] = []
+    for i in range(np_images.shape[0]):
         arr = np_images[i]
         img = Image.fromarray(arr, mode="RGB")
         images.append(img)
     return images
 
 
-def pil_list_to_tensor(images: List[Image.Image]):
-    """Convert list of PIL.Image (RGB) to ComfyUI IMAGE tensor [B,H,W,C] float32(0..1)."""
+def tensor_to_prepared_list(image_tensor, encoding: Optional["ImageEncoding"] = None) -> List["PreparedImage"]:
+    """Like ``tensor_to_pil_list`` but returns ``PreparedImage`` objects that keep the uint8 pixels."""
+    np_images = _tensor_to_uint8(image_tensor)
+    return [
+        PreparedImage(Image.fromarray(np_images[i], mode="RGB"), pixels=np_images[i], encoding=encoding)
+        for i in range(np_images.shape[0])
+    ]
+
+
+def pil_list_to_tensor(images: Sequence[DecodedImage]):
+    """Convert list of PIL.Image (RGB) to ComfyUI IMAGE tensor [B,H,W,C] float32(0..1).
+
+    uint8 [H,W,3] arrays are accepted as well. Images whose size differs from the first
+    image are resized to match so that the batch can be stacked into a single tensor.
+    """
     _ensure_torch_available()
 
     if not images:
         raise ValueError("images list is empty")
 
-    tensors = []
-    for img in images:
-        if img.mode != "RGB":
+    width, height = _decoded_size(images[0])
+    out = torch.empty((len(images), height, width, 3), dtype=torch.float32)
+    out_np = out.numpy()
+    for i, img in enumerate(images):
+        if _decoded_size(img) != (width, height):
+            if isinstance(img, np.ndarray):
+                img = Image.fromarray(img, mode="RGB")
+            img = img.resize((width, height), Image.LANCZOS)
+        if isinstance(img, Image.Image) and img.mode != "RGB":
             img = img.convert("RGB")
-        arr = np.array(img).astype(np.float32) / 255.0
-        t = torch.from_numpy(arr)
-        tensors.append(t)
+        # Fill the batch slice in place: uint8 -> float32, then scale; no per-image float copies or stack
+        dst = out_np[i]
+        dst[...] = np.asarray(img)
+        dst /= 255.0
+
+    # ComfyUI expects [B,H,W,C]
+    return out
 
-    # Stack along batch dimension; ComfyUI expects [B,H,W,C]
-    batch_tensor = torch.stack(tensors, dim=0)
-    return batch_tensor
 
+def _decoded_size(img: DecodedImage) -> Tuple[int, int]:
+    if isinstance(img, np.ndarray):
+        return img.shape[1], img.shape[0]
+    return img.size
 
-def pil_to_png_bytes(img: Image.Image) -> bytes:
+
+def pil_to_png_bytes(img: Image.Image, compress_level: Optional[int] = None) -> bytes:
     if img.mode != "RGB":
         img = img.convert("RGB")
     buf = io.BytesIO()
-    img.save(buf, format="PNG")
+    if compress_level is None:
+        img.save(buf, format="PNG")
+    else:
+        img.save(buf, format="PNG", compress_level=int(compress_level))
     return buf.getvalue()
 
 
-def bytes_to_pil_image(data: bytes) -> Image.Image:
-    return Image.open(io.BytesIO(data)).convert("RGB")
+UPLOAD_FORMATS = ["png", "jpeg", "webp", "webp_lossless"]
+
+
+@dataclass(frozen=True)
+class ImageEncoding:
+    """How input images are encoded for upload.
+
+    - png: lossless; ``compress_level`` 0 (fastest, largest) .. 9 (slowest, smallest)
+    - jpeg: lossy with ``quality`` 1..100
+    - webp: lossy with ``quality`` 1..100
+    - webp_lossless: lossless; ``quality`` trades encode time for size
+
+    ``max_edge`` / ``max_megapixels`` (0 = off) downscale larger images before encoding.
+    """
+
+    format: str = "png"
+    quality: int = 90
+    compress_level: int = 6
+    max_edge: int = 0
+    max_megapixels: float = 0.0
+
+    def __post_init__(self):
+        if self.format not in UPLOAD_FORMATS:
+            raise ValueError(f"Unknown upload format '{self.format}', expected one of {UPLOAD_FORMATS}")
+
+    @property
+    def mime_type(self) -> str:
+        return {"png": "image/png", "jpeg": "image/jpeg"}.get(self.format, "image/webp")
+
+    @property
+    def lossless(self) -> bool:
+        return self.format in ("png", "webp_lossless")
+
+    @property
+    def cache_tag(self) -> str:
+        """Distinguishes lossy encodings in cache keys; lossless ones upload identical pixels."""
+        return "" if self.lossless else f"{self.format}{self.quality}"
+
+    def target_size(self, size: Tuple[int, int]) -> Tuple[int, int]:
+        """Upload size for an image of ``size`` after applying the edge / megapixel limits."""
+        width, height = size
+        scale = 1.0
+        if self.max_edge and max(width, height) > self.max_edge:
+            scale = min(scale, self.max_edge / max(width, height))
+        if self.max_megapixels and width * height > self.max_megapixels * 1_000_000:
+            scale = min(scale, math.sqrt(self.max_megapixels * 1_000_000 / (width * height)))
+        if scale >= 1.0:
+            return width, height
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+    def downscale(self, img: Image.Image) -> Image.Image:
+        size = self.target_size(img.size)
+        if size == img.size:
+            return img
+        # reducing_gap first shrinks by an integer factor, then finishes with Lanczos
+        return img.resize(size, Image.LANCZOS, reducing_gap=3.0)
+
+    def encode(self, img: Image.Image) -> bytes:
+        img = self.downscale(img)
+        if self.format == "png":
+            return pil_to_png_bytes(img, compress_level=self.compress_level)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        buf = io.BytesIO()
+        if self.format == "jpeg":
+            img.save(buf, format="JPEG", quality=int(self.quality))
+        else:
+            img.save(buf, format="WEBP", quality=int(self.quality), lossless=self.format == "webp_lossless")
+        return buf.getvalue()
+
+
+DEFAULT_IMAGE_ENCODING = ImageEncoding()
+
+
+def bytes_to_pil_image(data: bytes, resize_to: Optional[Tuple[int, int]] = None) -> Image.Image:
+    """Decode result bytes; ``resize_to`` (width, height) scales the result back to e.g. the input size."""
+    img = Image.open(io.BytesIO(data)).convert("RGB")
+    if resize_to is not None and img.size != tuple(resize_to):
+        img = img.resize(tuple(resize_to), Image.LANCZOS)
+    return img
+
+
+def bytes_to_array(data: bytes, resize_to: Optional[Tuple[int, int]] = None) -> np.ndarray:
+    """Decode result bytes into a read-only uint8 [H,W,3] array (see ``bytes_to_pil_image``)."""
+    arr = np.asarray(bytes_to_pil_image(data, resize_to=resize_to))
+    arr.flags.writeable = False
+    return arr
 
 
 def sha256_bytes(data: bytes) -> str:
@@ -93,3 +234,109 @@ def hash_pil_images(images: List[Image.Image]) -> str:
     return hasher.hexdigest()
 
 
+def _new_hasher(algorithm: str):
+    if algorithm == "xxh3":
+        if xxhash is None:
+            raise RuntimeError("xxhash is not installed; use 'blake2b' or 'sha256'.")
+        return xxhash.xxh3_128()
+    if algorithm == "blake2b":
+        return hashlib.blake2b(digest_size=20)
+    return hashlib.new(algorithm)
+
+
+def hash_arrays(arrays, algorithm: str = DEFAULT_PIXEL_HASH) -> str:
+    """Digest raw array bytes together with dtype and shape, without any image encoding.
+
+    The single pixel-hash entry point: cache keys use it through ``PreparedImage.pixel_hash``.
+    """
+    hasher = _new_hasher(algorithm)
+    for arr in arrays:
+        arr = np.ascontiguousarray(arr)
+        hasher.update(f"{arr.dtype.str}{arr.shape};".encode("ascii"))
+        hasher.update(arr)
+    return hasher.hexdigest()
+
+
+class PreparedImage:
+    """An input image whose pixel hash, encoded bytes and base64 form are computed once.
+
+    One instance is shared by the cache-key lookup and the request payload builder, and
+    across all requests of a batch that use the same input (e.g. one garment tried on many
+    models), so each image is encoded exactly once per node call. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        image: Image.Image,
+        pixels: Optional[np.ndarray] = None,
+        encoding: Optional[ImageEncoding] = None,
+    ):
+        self.image = image if image.mode == "RGB" else image.convert("RGB")
+        self.encoding = encoding or DEFAULT_IMAGE_ENCODING
+        self._pixels = pixels
+        self._lock = threading.Lock()
+        self._pixel_hash: Optional[str] = None
+        self._encoded: Optional[bytes] = None
+        self._base64: Optional[bytes] = None
+
+    @property
+    def size(self):
+        return self.image.size
+
+    @property
+    def mime_type(self) -> str:
+        return self.encoding.mime_type
+
+    @property
+    def upload_size(self) -> Tuple[int, int]:
+        return self.encoding.target_size(self.image.size)
+
+    @property
+    def cache_tag(self) -> str:
+        """Encoding and downscale settings that change what Gemini receives; empty if none."""
+        tag = self.encoding.cache_tag
+        if self.upload_size != self.size:
+            tag += "@{}x{}".format(*self.upload_size)
+        return tag
+
+    @property
+    def pixels(self) -> np.ndarray:
+        if self._pixels is None:
+            self._pixels = np.asarray(self.image)
+        return self._pixels
+
+    @property
+    def pixel_hash(self) -> str:
+        with self._lock:
+            if self._pixel_hash is None:
+                self._pixel_hash = hash_arrays([self.pixels])
+            return self._pixel_hash
+
+    def encoded(self) -> bytes:
+        with self._lock:
+            if self._encoded is None:
+                self._encoded = self.encoding.encode(self.image)
+            return self._encoded
+
+    def base64(self) -> bytes:
+        """Base64 of ``encoded()`` as ASCII bytes (ready to splice into a JSON body)."""
+        data = self.encoded()
+        with self._lock:
+            if self._base64 is None:
+                self._base64 = base64.b64encode(data)
+            return self._base64
+
+
+def as_prepared(img: Union[Image.Image, PreparedImage], encoding: Optional[ImageEncoding] = None) -> PreparedImage:
+    return img if isinstance(img, PreparedImage) else PreparedImage(img, encoding=encoding)
+
+
+def hash_prepared_images(images: Sequence[PreparedImage]) -> str:
+    """Cache-key hash of one or more prepared images, reusing their memoized pixel hashes.
+
+    Lossy or downscaled uploads change what Gemini sees, so their tag is folded into the hash.
+    """
+    tags = [img.cache_tag for img in images]
+    if len(images) == 1 and not tags[0]:
+        return images[0].pixel_hash
+    return sha256_bytes("|".join(img.pixel_hash + tag for img, tag in zip(images, tags)).encode("ascii"))
@@ -0,0 +1,15 @@
+try:
+    import comfy.model_management as model_management
+except Exception:  # pragma: no cover - running outside ComfyUI
+    model_management = None
+
+
+def processing_interrupted() -> bool:
+    """True once the user pressed Cancel/Interrupt in ComfyUI (always False outside ComfyUI)."""
+    return model_management is not None and bool(model_management.processing_interrupted())
+
+
+def raise_if_interrupted() -> None:
+    """Raise ComfyUI's interrupt exception if the current prompt was interrupted."""
+    if model_management is not None:
+        model_management.throw_exception_if_processing_interrupted()
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from threading import Lock
+from typing import Dict, Optional
+
+
+JOURNAL_FILE = "journal.jsonl"
+OUTPUTS_DIR = "outputs"
+
+# File signatures of the formats Gemini may return
+_IMAGE_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"GIF8", ".gif"),
+]
+
+
+def image_extension(data: bytes) -> str:
+    """File extension of the image format of ``data`` (``.bin`` when unknown)."""
+    head = bytes(data[:12])
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    for signature, extension in _IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return ".bin"
+
+
+class JobJournal:
+    """Append-only journal of seeded generations, keyed by the nodes' result cache key.
+
+    Every request appends a ``started`` line to ``<root>/journal.jsonl`` and then ``done`` or
+    ``failed``; a ``started`` line without an outcome means the worker died mid-request.
+    Completed results are kept in ``<root>/outputs/<hh>/<sha256(key)><ext>``, with the extension
+    of the returned image format, and the ``done`` line records that path. Unlike the result
+    cache these files are never evicted, so a batch re-queued after a restart skips every job
+    whose last record is ``done`` and only generates the failed or interrupted ones. Lines
+    appended by other processes are read before a job is treated as not done, so several
+    ComfyUI processes can share one journal directory.
+    """
+
+    def __init__(self, root: str):
+        self._root = root
+        self._path = os.path.join(root, JOURNAL_FILE)
+        self._lock = Lock()
+        self._file = None
+        # Last record per key, replayed from the journal at startup and updated on append
+        self._entries: Dict[str, dict] = {}
+        self._offset = 0
+        self._stats = {"skipped": 0, "started": 0, "done": 0, "failed": 0}
+        self._load()
+
+    @property
+    def root(self) -> str:
+        return self._root
+
+    def _read_new(self) -> int:
+        """Replay journal lines appended since the last read (by any process); returns how many."""
+        try:
+            with open(self._path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+        except OSError as ex:
+            print(f"[JobJournal] cannot read {self._path}: {ex}")
+            return 0
+        # A line without its newline is still being written; read it next time
+        complete = data[:data.rfind(b"\n") + 1]
+        self._offset += len(complete)
+        count = 0
+        for line in complete.splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn line of a process that died mid-write
+            self._entries[record["key"]] = record
+            count += 1
+        return count
+
+    def _load(self) -> None:
+        if not self._read_new():
+            return
+        counts: Dict[str, int] = {}
+        for record in self._entries.values():
+            counts[record["status"]] = counts.get(record["status"], 0) + 1
+        print(
+            f"[JobJournal] {len(self._entries)} jobs in {self._path}: {counts.get('done', 0)} done, "
+            f"{counts.get('failed', 0)} failed, {counts.get('started', 0)} interrupted"
+        )
+
+    def output_path(self, key: str, data: bytes) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self._root, OUTPUTS_DIR, digest[:2], digest + image_extension(data))
+
+    def _append(self, record: dict) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._entries[record["key"]] = record
+            try:
+                if self._file is None:
+                    os.makedirs(self._root, exist_ok=True)
+                    self._file = open(self._path, "a", encoding="utf-8")
+                self._file.write(line)
+                self._file.flush()
+            except OSError as ex:
+                print(f"[JobJournal] write failed for {self._path}: {ex}")
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
+
+    def entry(self, key: str) -> Optional[dict]:
+        """Last journal record of ``key`` written or replayed by this process."""
+        with self._lock:
+            return self._entries.get(key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Result of a job whose last record is ``done``, or None if it has to be (re)generated."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["status"] != "done":
+                # Another process may have finished it since we last looked
+                self._read_new()
+                entry = self._entries.get(key)
+        if entry is None or entry["status"] != "done" or not entry.get("output"):
+            return None
+        try:
+            with open(entry["output"], "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as ex:
+            print(f"[JobJournal] output read failed for {key}: {ex}")
+            return None
+        self._count("skipped")
+        return data
+
+    def started(self, key: str, node: str) -> None:
+        previous = self.entry(key)
+        attempt = (previous or {}).get("attempt", 0) + 1
+        if previous is not None and previous["status"] != "done":
+            print(f"[JobJournal] retrying {node} job {key[:48]} ({'interrupted' if previous['status'] == 'started' else 'failed'} before, attempt {attempt})")
+        self._count("started")
+        self._append({"key": key, "node": node, "status": "started", "attempt": attempt, "time": time.time()})
+
+    def done(self, key: str, node: str, data: bytes) -> None:
+        """Store the result (temp file + rename) and mark the job done."""
+        path = self.output_path(key, data)
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        except OSError as ex:
+            print(f"[JobJournal] output write failed for {path}: {ex}")
+            return
+        attempt = (self.entry(key) or {}).get("attempt", 1)
+        self._count("done")
+        self._append({"key": key, "node": node, "status": "done", "attempt": attempt, "output": path, "time": time.time()})
+
+    def failed(self, key: str, node: str, error: str) -> None:
+        attempt = (self.entry(key) or {}).get("attempt", 1)
+        self._count("failed")
+        self._append({"key": key, "node": node, "status": "failed", "attempt": attempt, "error": error, "time": time.time()})
+
+    def stats(self) -> dict:
+        """Counters of this process: jobs skipped as already done, started, done and failed."""
+        with self._lock:
+            return dict(self._stats, journaled=len(self._entries))
+
+
+def _job_journal_from_config() -> Optional[JobJournal]:
+    """Build the journal from env/config.
+
+    ``GEMINI_JOB_JOURNAL_DIR`` or config ``job_journal_dir`` selects the directory; the journal
+    is off when neither is set (or they are empty).
+    """
+    from ..gemini_client import get_client_config
+
+    root = os.environ.get("GEMINI_JOB_JOURNAL_DIR")
+    if root is None:
+        root = get_client_config().get("job_journal_dir")
+    if not root:
+        return None
+    return JobJournal(os.path.expanduser(str(root)))
+
+
+GLOBAL_JOB_JOURNAL = _job_journal_from_config()
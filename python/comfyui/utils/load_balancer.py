@@ -0,0 +1,132 @@
+import itertools
+import random
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Generic, List, Optional, Sequence, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+BALANCING_STRATEGIES = ["round_robin", "least_in_flight", "latency"]
+
+# Weight of the newest sample in the latency moving average
+LATENCY_EWMA_ALPHA = 0.3
+
+
+@dataclass
+class _BackendState:
+    name: str
+    in_flight: int = 0
+    requests: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    ejections: int = 0
+    latency: Optional[float] = None
+    ejected_until: float = 0.0
+
+
+class LoadBalancer(Generic[T]):
+    """Spread requests over interchangeable backends (API keys / endpoints).
+
+    Strategies: ``round_robin``; ``least_in_flight`` (fewest outstanding requests, ties in
+    round-robin order); ``latency`` (random choice weighted by the inverse of each backend's
+    moving-average latency). A backend reported with ``eject`` is skipped until its ejection
+    expires; repeated failures double the ejection time up to ``max_eject_seconds``. When every
+    backend is ejected the one that recovers first is used rather than failing outright.
+    """
+
+    def __init__(
+        self,
+        backends: Sequence[Tuple[str, T]],
+        strategy: str = "round_robin",
+        eject_seconds: float = 30.0,
+        max_eject_seconds: float = 300.0,
+    ):
+        if not backends:
+            raise ValueError("LoadBalancer needs at least one backend")
+        if strategy not in BALANCING_STRATEGIES:
+            raise ValueError(f"Unknown load balancing strategy '{strategy}', expected one of {BALANCING_STRATEGIES}")
+        self._backends = [backend for _, backend in backends]
+        self._states = [_BackendState(name) for name, _ in backends]
+        self._strategy = strategy
+        self._eject_seconds = float(eject_seconds)
+        self._max_eject_seconds = float(max_eject_seconds)
+        self._counter = itertools.count()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._backends)
+
+    def _healthy(self, now: float) -> List[int]:
+        return [i for i, state in enumerate(self._states) if state.ejected_until <= now]
+
+    def available(self) -> int:
+        """Number of backends that are not currently ejected."""
+        with self._lock:
+            return len(self._healthy(time.monotonic()))
+
+    def _choose(self, candidates: List[int]) -> int:
+        start = next(self._counter)
+        ordered = [candidates[(start + k) % len(candidates)] for k in range(len(candidates))]
+        if self._strategy == "least_in_flight":
+            return min(ordered, key=lambda i: self._states[i].in_flight)
+        if self._strategy == "latency":
+            measured = [self._states[i].latency for i in ordered if self._states[i].latency]
+            # Unmeasured backends are assumed to be as fast as the best one so they get probed
+            default = min(measured) if measured else 1.0
+            weights = [1.0 / (self._states[i].latency or default) for i in ordered]
+            return random.choices(ordered, weights=weights)[0]
+        return ordered[0]
+
+    def acquire(self) -> Tuple[int, T]:
+        """Pick a backend and count the request as in flight; pass the index back to ``release``."""
+        with self._lock:
+            now = time.monotonic()
+            candidates = self._healthy(now)
+            if candidates:
+                index = self._choose(candidates)
+            else:
+                index = min(range(len(self._states)), key=lambda i: self._states[i].ejected_until)
+            state = self._states[index]
+            state.in_flight += 1
+            state.requests += 1
+            return index, self._backends[index]
+
+    def release(self, index: int, latency: Optional[float] = None, eject: Optional[float] = None, failed: bool = False) -> None:
+        """Finish a request. ``latency`` (seconds) marks a success; ``eject`` takes the backend out
+        of rotation (0 for the escalating default, or an explicit number of seconds)."""
+        with self._lock:
+            state = self._states[index]
+            state.in_flight -= 1
+            if latency is not None:
+                state.consecutive_failures = 0
+                if state.latency is None:
+                    state.latency = latency
+                else:
+                    state.latency += LATENCY_EWMA_ALPHA * (latency - state.latency)
+                return
+            if not failed and eject is None:
+                return
+            state.failures += 1
+            state.consecutive_failures += 1
+            if eject is not None:
+                duration = eject or self._eject_seconds * 2 ** (state.consecutive_failures - 1)
+                state.ejected_until = time.monotonic() + min(self._max_eject_seconds, duration)
+                state.ejections += 1
+
+    def stats(self) -> List[dict]:
+        with self._lock:
+            now = time.monotonic()
+            return [
+                {
+                    "name": state.name,
+                    "in_flight": state.in_flight,
+                    "requests": state.requests,
+                    "failures": state.failures,
+                    "ejections": state.ejections,
+                    "latency_ms": round(state.latency * 1000.0, 1) if state.latency is not None else None,
+                    "ejected_for": round(max(0.0, state.ejected_until - now), 1),
+                }
+                for state in self._states
+            ]
@@ -0,0 +1,202 @@
+import contextvars
+import json
+import math
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is +Inf
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0,
+)
+DEFAULT_EXPORT_INTERVAL = 30.0
+
+# Node type of the current call, so client-side stages (encode, HTTP, ...) are attributed to it
+_current_node: contextvars.ContextVar = contextvars.ContextVar("gemini_metrics_node", default="")
+
+
+def current_node() -> str:
+    return _current_node.get()
+
+
+@contextmanager
+def node_context(node: str) -> Iterator[None]:
+    """Attribute spans recorded in this thread (including inside the client) to ``node``."""
+    token = _current_node.set(node)
+    try:
+        yield
+    finally:
+        _current_node.reset(token)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate by linear interpolation inside the bucket holding the ``q`` quantile,
+        clamped to the observed range."""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        estimate = self.max
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                estimate = lower + (upper - lower) * max(0.0, rank - seen) / n
+                break
+            seen += n
+        return min(self.max, max(self.min, estimate))
+
+
+class MetricsRegistry:
+    """Latency histograms of the stages of a node call, keyed by (stage, node, endpoint).
+
+    Node-side stages (``prepare``, ``hash``, ``cache_lookup``, ``decode``, ``to_tensor``) carry the
+    node type; client stages (``encode``, ``base64``, ``serialize``, ``queue``, ``http_connect``,
+    ``http_ttfb``, ``http_download``, ``parse``) also carry the endpoint host, so a slow p95 can be
+    told apart as local CPU, network or provider time.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self._buckets = tuple(buckets)
+        self._lock = Lock()
+        self._histograms: Dict[Tuple[str, str, str], Histogram] = {}
+        self._last_export = 0.0
+
+    def observe(self, stage: str, seconds: float, node: Optional[str] = None, endpoint: str = "") -> None:
+        key = (stage, current_node() if node is None else node, endpoint)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self._buckets)
+            histogram.observe(max(0.0, seconds))
+
+    @contextmanager
+    def span(self, stage: str, node: Optional[str] = None, endpoint: str = "") -> Iterator[None]:
+        """Time the ``with`` block as one observation of ``stage`` (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, node=node, endpoint=endpoint)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self) -> List[dict]:
+        """Per-series count, total and p50/p95/p99 in milliseconds."""
+        with self._lock:
+            items = sorted(self._histograms.items())
+            rows = []
+            for (stage, node, endpoint), h in items:
+                row = {"stage": stage, "node": node, "endpoint": endpoint, "count": h.count, "sum_ms": round(h.sum * 1000.0, 2)}
+                for name, q in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+                    value = h.quantile(q)
+                    row[name] = round(value * 1000.0, 2) if value is not None else None
+                rows.append(row)
+            return rows
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition of the ``gemini_stage_seconds`` histograms."""
+        lines = [
+            "# HELP gemini_stage_seconds Time spent in each stage of a Gemini node call.",
+            "# TYPE gemini_stage_seconds histogram",
+        ]
+        with self._lock:
+            for (stage, node, endpoint), h in sorted(self._histograms.items()):
+                labels = f'stage="{_escape(stage)}",node="{_escape(node)}",endpoint="{_escape(endpoint)}"'
+                cumulative = 0
+                for bound, n in zip(list(h.buckets) + [math.inf], h.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == math.inf else repr(bound)
+                    lines.append(f'gemini_stage_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"gemini_stage_seconds_sum{{{labels}}} {h.sum!r}")
+                lines.append(f"gemini_stage_seconds_count{{{labels}}} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str) -> None:
+        """Atomically write ``snapshot()`` (plus a timestamp) to ``path``."""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        data = json.dumps({"time": time.time(), "stages": self.snapshot()}, indent=2)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def maybe_export(self) -> None:
+        """Write the JSON file named by config ``metrics_file`` at most every ``metrics_export_interval_seconds``."""
+        from ..gemini_client import get_client_config
+
+        cfg = get_client_config()
+        path = cfg.get("metrics_file")
+        if not path:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._last_export and now - self._last_export < float(cfg.get("metrics_export_interval_seconds", DEFAULT_EXPORT_INTERVAL)):
+                return
+            self._last_export = now
+        try:
+            self.write_json(path)
+        except OSError as ex:
+            print(f"[Metrics] failed to write {path}: {ex}")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def register_metrics_route(path: str = "/gemini/metrics") -> bool:
+    """Serve ``render_prometheus()`` on the ComfyUI web server; False when not running in ComfyUI."""
+    try:
+        from aiohttp import web
+        from server import PromptServer
+    except Exception:
+        return False
+    if getattr(PromptServer, "instance", None) is None:
+        return False
+
+    @PromptServer.instance.routes.get(path)
+    async def _metrics(request):
+        return web.Response(text=GLOBAL_METRICS.render_prometheus(), content_type="text/plain", charset="utf-8")
+
+    return True
+
+
+GLOBAL_METRICS = MetricsRegistry()
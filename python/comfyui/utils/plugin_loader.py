@@ -0,0 +1,29 @@
+"""Import the plugin from scripts that run outside ComfyUI (batch runner, benchmarks, tests).
+
+The plugin folder name is not necessarily a valid module name (e.g. ``comfyui-fuzhuang2-jingxun``),
+so the package is loaded from its path under a fixed alias. This module has no package-relative
+imports and is imported as ``utils.plugin_loader`` with the plugin folder on ``sys.path``.
+"""
+
+import importlib
+import importlib.util
+import os
+import sys
+
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGIN_ALIAS = "gemini_tryon_plugin"
+
+
+def load_plugin_module(name: str = ""):
+    """Import the plugin package (or one of its submodules, e.g. ``utils.image_io``)."""
+    if PLUGIN_ALIAS not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            PLUGIN_ALIAS,
+            os.path.join(PLUGIN_DIR, "__init__.py"),
+            submodule_search_locations=[PLUGIN_DIR],
+        )
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[PLUGIN_ALIAS] = module
+        spec.loader.exec_module(module)
+    return importlib.import_module(f"{PLUGIN_ALIAS}.{name}" if name else PLUGIN_ALIAS)
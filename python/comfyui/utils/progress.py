@@ -0,0 +1,121 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+try:
+    import comfy.utils as comfy_utils
+except Exception:  # pragma: no cover - running outside ComfyUI
+    comfy_utils = None
+
+
+class ProgressTask:
+    """Progress of one node call: ``total`` items, advanced as each one finishes.
+
+    Inside ComfyUI the count drives the node's progress bar; the bar is created in the calling
+    thread so it is attributed to the executing node, and may be updated from any thread. The
+    bar runs on a scale of ``BAR_STEPS`` per item so heartbeats can show elapsed time: while no
+    result arrives it creeps towards the next item by ``elapsed / timeout`` (capped below it).
+    """
+
+    BAR_STEPS = 100
+
+    def __init__(self, label: str, total: int, interval: float, timeout: Optional[float] = None):
+        self.label = label
+        self.total = max(1, int(total))
+        self.interval = float(interval or 0)
+        self.timeout = float(timeout) if timeout else None
+        self.started = time.monotonic()
+        self.next_tick = self.started + self.interval if self.interval > 0 else None
+        self.ticks = 0
+        self._done = 0
+        self._last_advance = self.started
+        self._lock = threading.Lock()
+        self._bar = comfy_utils.ProgressBar(self.total * self.BAR_STEPS) if comfy_utils is not None else None
+
+    @property
+    def done(self) -> int:
+        return self._done
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def advance(self, count: int = 1) -> None:
+        with self._lock:
+            self._done += count
+            self._last_advance = time.monotonic()
+            done = self._done
+        if self._bar is not None:
+            self._bar.update_absolute(done * self.BAR_STEPS, self.total * self.BAR_STEPS)
+
+    def tick(self) -> None:
+        """Periodic heartbeat from the monitor thread."""
+        self.ticks += 1
+        if self._bar is not None:
+            with self._lock:
+                done, waited = self._done, time.monotonic() - self._last_advance
+            fraction = min(waited / self.timeout, 0.99) if self.timeout and done < self.total else 0.0
+            self._bar.update_absolute(int((done + fraction) * self.BAR_STEPS), self.total * self.BAR_STEPS)
+        else:
+            print(f"[{self.label}] waiting... elapsed={int(self.elapsed())}s done={self._done}/{self.total} (tick {self.ticks})")
+
+
+class ProgressMonitor:
+    """One background thread that heartbeats every in-flight node call.
+
+    Tasks register through ``track``; the thread sleeps until the next task is due and is woken
+    as soon as a task starts or finishes, so nothing lingers after a node call returns.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._tasks: List[ProgressTask] = []
+        self._thread: Optional[threading.Thread] = None
+
+    @contextmanager
+    def track(self, label: str, total: int, interval: float = 0, timeout: Optional[float] = None):
+        """Context manager yielding a ``ProgressTask``; ``interval`` seconds between heartbeats (0 = none).
+
+        ``timeout`` is the expected upper bound of one request, used to show elapsed time on the bar.
+        """
+        task = ProgressTask(label, total, interval, timeout)
+        with self._cond:
+            self._tasks.append(task)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="gemini-progress", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        try:
+            yield task
+        finally:
+            with self._cond:
+                self._tasks.remove(task)
+                self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                due = [task for task in self._tasks if task.next_tick is not None and task.next_tick <= now]
+                for task in due:
+                    task.next_tick = now + task.interval
+                pending = [task.next_tick for task in self._tasks if task.next_tick is not None]
+                if not due:
+                    self._cond.wait(timeout=max(0.0, min(pending) - now) if pending else None)
+                    continue
+            for task in due:
+                try:
+                    task.tick()
+                except Exception as ex:  # a failing progress hook must not stop the monitor
+                    print(f"[ProgressMonitor] heartbeat failed for {task.label}: {ex}")
+
+    def active(self) -> List[dict]:
+        """Snapshot of the node calls currently in flight."""
+        with self._cond:
+            return [
+                {"label": task.label, "done": task.done, "total": task.total, "elapsed": round(task.elapsed(), 1)}
+                for task in self._tasks
+            ]
+
+
+GLOBAL_PROGRESS = ProgressMonitor()
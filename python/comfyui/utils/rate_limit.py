@@ -0,0 +1,209 @@
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from threading import Lock
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:  # pragma: no cover - POSIX
+    msvcrt = None
+
+
+class RateLimitExceeded(TimeoutError):
+    """Raised when a request cannot get a rate/concurrency slot before its deadline."""
+
+
+@contextmanager
+def _locked_file(path: str):
+    """Open ``path`` (created if missing) holding an exclusive inter-process lock."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield f
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class TokenBucket:
+    """Token bucket refilled at ``rate_per_minute`` and holding at most ``burst`` tokens.
+
+    ``reserve`` takes tokens right away, letting the balance go negative, and returns how long
+    the caller has to wait until its share is covered; ``refund`` gives tokens back when the
+    caller does not send after all. With ``shared_path`` the balance lives in a small JSON file
+    that is locked around each update, so all processes on the host draw from one budget; the
+    lock blocks, so async callers run shared updates in an executor.
+    """
+
+    def __init__(self, name: str, rate_per_minute: float, burst: Optional[float] = None, shared_path: Optional[str] = None):
+        self._name = name
+        self._rate = float(rate_per_minute) / 60.0
+        self._burst = float(burst) if burst else max(1.0, float(rate_per_minute) / 10.0)
+        self._shared_path = shared_path
+        self._lock = Lock()
+        self._tokens = self._burst
+        self._updated = time.time()
+
+    @property
+    def shared(self) -> bool:
+        return self._shared_path is not None
+
+    def _apply(self, tokens: float, updated: float, amount: float):
+        now = time.time()
+        tokens = min(self._burst, tokens + max(0.0, now - updated) * self._rate) - amount
+        return tokens, now
+
+    def _update(self, amount: float) -> float:
+        if self._shared_path is None:
+            with self._lock:
+                self._tokens, self._updated = self._apply(self._tokens, self._updated, amount)
+                return self._tokens
+        with _locked_file(self._shared_path) as f:
+            f.seek(0)
+            try:
+                state = json.loads(f.read() or b"{}")
+            except ValueError:
+                state = {}
+            tokens, updated = state.get(self._name, (self._burst, time.time()))
+            tokens, updated = self._apply(float(tokens), float(updated), amount)
+            state[self._name] = [tokens, updated]
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps(state).encode("utf-8"))
+            return tokens
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Take ``amount`` tokens; returns the seconds to wait before using them."""
+        tokens = self._update(amount)
+        return max(0.0, -tokens / self._rate)
+
+    def refund(self, amount: float) -> None:
+        self._update(-amount)
+
+
+class RequestGovernor:
+    """Client-side limits for one endpoint: requests/minute, estimated tokens/minute and a cap
+    on concurrent requests. Zero disables a limit. Use from the event loop thread only."""
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_concurrent: int = 0,
+        burst: Optional[float] = None,
+        shared_path: Optional[str] = None,
+    ):
+        self._requests = TokenBucket("requests", requests_per_minute, burst, shared_path) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket("tokens", tokens_per_minute, None, shared_path) if tokens_per_minute > 0 else None
+        self._max_concurrent = int(max_concurrent)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._stats = {"requests": 0, "throttled": 0, "throttle_wait_seconds": 0.0, "rejected": 0, "in_flight": 0, "peak_in_flight": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self._requests is not None or self._tokens is not None or self._max_concurrent > 0
+
+    @property
+    def _shared(self) -> bool:
+        return any(bucket is not None and bucket.shared for bucket in (self._requests, self._tokens))
+
+    def _reserve(self, tokens: float) -> float:
+        wait = 0.0
+        if self._requests is not None:
+            wait = max(wait, self._requests.reserve(1))
+        if self._tokens is not None:
+            wait = max(wait, self._tokens.reserve(tokens))
+        return wait
+
+    def _refund(self, tokens: float) -> None:
+        if self._requests is not None:
+            self._requests.refund(1)
+        if self._tokens is not None:
+            self._tokens.refund(tokens)
+
+    async def _reserve_async(self, tokens: float) -> float:
+        # The shared file lock may be held by another process; never block the event loop on it
+        if self._shared:
+            return await asyncio.get_running_loop().run_in_executor(None, self._reserve, tokens)
+        return self._reserve(tokens)
+
+    def _refund_soon(self, tokens: float) -> None:
+        """Refund without waiting; safe to call while handling a cancellation."""
+        if self._shared:
+            asyncio.get_running_loop().run_in_executor(None, self._refund, tokens)
+        else:
+            self._refund(tokens)
+
+    @asynccontextmanager
+    async def slot(self, tokens: float, deadline: float):
+        """Wait for rate budget, then a concurrency slot; ``deadline`` is a ``time.monotonic()`` value.
+
+        The rate wait comes first so that a request sleeping for budget does not hold a slot idle.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        wait = await self._reserve_async(tokens)
+        if wait > 0:
+            if time.monotonic() + wait > deadline:
+                self._refund_soon(tokens)
+                self._stats["rejected"] += 1
+                raise RateLimitExceeded(f"rate limit would delay the request by {wait:.1f}s, past the deadline")
+            self._stats["throttled"] += 1
+            self._stats["throttle_wait_seconds"] += wait
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self._refund_soon(tokens)
+                raise
+
+        semaphore = None
+        if self._max_concurrent > 0:
+            if self._semaphore is None:
+                self._semaphore = asyncio.Semaphore(self._max_concurrent)
+            semaphore = self._semaphore
+            if not semaphore.locked():
+                # Free slot: take it without wait_for, which would time out at once for a zero budget
+                await semaphore.acquire()
+            else:
+                try:
+                    await asyncio.wait_for(semaphore.acquire(), timeout=max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    self._refund_soon(tokens)
+                    self._stats["rejected"] += 1
+                    raise RateLimitExceeded(f"no free request slot (max_concurrent_requests={self._max_concurrent}) before the deadline")
+                except asyncio.CancelledError:
+                    self._refund_soon(tokens)
+                    raise
+
+        try:
+            self._stats["requests"] += 1
+            self._stats["in_flight"] += 1
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._stats["in_flight"])
+            try:
+                yield
+            finally:
+                self._stats["in_flight"] -= 1
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+    def stats(self) -> dict:
+        return dict(self._stats)
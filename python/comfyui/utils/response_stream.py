@@ -0,0 +1,133 @@
+import binascii
+import re
+from typing import Optional
+
+
+# Start of an image payload: an inline_data object, or a markdown data URL inside a text part
+_IMAGE_START = re.compile(rb'"(?:inline_data|inlineData)"\s*:\s*\{|data:image/[A-Za-z0-9.+-]+;base64,')
+_DATA_KEY = re.compile(rb'"data"\s*:\s*"')
+_MIME_TYPE = re.compile(rb'"(?:mime_type|mimeType)"\s*:\s*"([^"]*)"')
+
+# End of the base64 run: the closing quote of a JSON string; a data URL also ends at ')' or
+# whitespace, or at any JSON escape other than "\/"
+_END_JSON_STRING = re.compile(rb'"')
+_END_DATA_URL = re.compile(rb'["\)\s]|\\[^/]')
+
+# Bytes kept when no match is found, so that a key split across two chunks is still found
+_SEARCH_OVERLAP = 64
+
+
+class StreamingImageExtractor:
+    """Incrementally extract the first image from a Gemini response body.
+
+    Feed the raw body (plain JSON or ``streamGenerateContent`` SSE events) chunk by chunk.
+    Bytes before the image are kept (they are small) so the caller can fall back to a full
+    JSON parse for error/blocked responses; the base64 image data itself is decoded as it
+    arrives into a buffer pre-sized from ``size_hint`` (e.g. Content-Length), so the encoded
+    string is never held in memory as a whole.
+    """
+
+    def __init__(self, size_hint: int = 0):
+        self._state = "search"
+        self._head = bytearray()
+        self._scan_from = 0
+        self._end_pattern = _END_JSON_STRING
+        self._pending = b""
+        self._out = bytearray(max(0, int(size_hint)) * 3 // 4)
+        self._written = 0
+        self._image: Optional[memoryview] = None
+
+    @property
+    def found(self) -> bool:
+        return self._state == "done"
+
+    @property
+    def truncated(self) -> bool:
+        """True when the body ended in the middle of the image data."""
+        return self._state == "data"
+
+    @property
+    def head(self) -> bytes:
+        """Body bytes seen before any image data (the whole body if no image was found)."""
+        return bytes(self._head)
+
+    def feed(self, chunk: bytes) -> None:
+        if not chunk or self._state == "done":
+            return
+        if self._state == "search":
+            self._head += chunk
+            self._search()
+        else:
+            self._feed_data(chunk)
+
+    def image_bytes(self) -> Optional[memoryview]:
+        """The decoded image, or None before it is complete.
+
+        Returns a read-only view of the decode buffer rather than a ``bytes`` copy, so the image
+        is held only once and no holder of the shared result can modify it.
+        """
+        return self._image
+
+    def _search(self) -> None:
+        while True:
+            match = _IMAGE_START.search(self._head, self._scan_from)
+            if match is None:
+                self._scan_from = max(self._scan_from, len(self._head) - _SEARCH_OVERLAP)
+                return
+            if match.group(0).startswith(b"data:"):
+                self._begin_data(match.end(), _END_DATA_URL)
+                return
+            data_key = _DATA_KEY.search(self._head, match.end())
+            if data_key is None:
+                # The "data" key has not arrived yet; rescan this object on the next chunk
+                self._scan_from = match.start()
+                return
+            between = self._head[match.end():data_key.start()]
+            mime = _MIME_TYPE.search(between)
+            if b"}" in between or (mime is not None and not mime.group(1).replace(b"\\", b"").startswith(b"image/")):
+                # Object closed without data, or it is not an image; keep looking
+                self._scan_from = match.end()
+                continue
+            self._begin_data(data_key.end(), _END_JSON_STRING)
+            return
+
+    def _begin_data(self, pos: int, end_pattern) -> None:
+        rest = bytes(self._head[pos:])
+        del self._head[pos:]
+        self._state = "data"
+        self._end_pattern = end_pattern
+        self._feed_data(rest)
+
+    def _feed_data(self, chunk: bytes) -> None:
+        if self._end_pattern is _END_DATA_URL and chunk.endswith(b"\\"):
+            # Need the next byte to tell "\/" (part of the data) from other escapes (end of data)
+            self._pending += chunk
+            return
+        data = self._pending + chunk
+        self._pending = b""
+        end = self._end_pattern.search(data)
+        if end is not None:
+            data = data[:end.start()]
+        self._decode(data, final=end is not None)
+        if end is not None:
+            self._state = "done"
+            del self._out[self._written:]
+            self._image = memoryview(self._out).toreadonly()
+
+    def _decode(self, data: bytes, final: bool) -> None:
+        tail = b""
+        if b"\\" in data:
+            if data.endswith(b"\\") and not final:
+                # Half of an escape sequence; finish it with the next chunk
+                data, tail = data[:-1], b"\\"
+            data = data.replace(b"\\/", b"/").replace(b"\\n", b"").replace(b"\\r", b"")
+        data = data.translate(None, b" \t\r\n\\")
+        if final:
+            data += b"=" * (-len(data) % 4)
+            usable = len(data)
+        else:
+            usable = len(data) - len(data) % 4
+        decoded = binascii.a2b_base64(data[:usable])
+        self._out[self._written:self._written + len(decoded)] = decoded
+        self._written += len(decoded)
+        self._pending = data[usable:] + tail
@@ -1,31 +1,348 @@
+import hashlib
+import os
+import tempfile
+import time
 from collections import OrderedDict
-from threading import RLock
-from typing import Optional
+from threading import Lock, RLock
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from .image_io import bytes_to_array
+
+
+DEFAULT_MEMORY_CACHE_MAX_BYTES = 512 * 1024 ** 2
+DEFAULT_DISK_CACHE_MAX_BYTES = 2 * 1024 ** 3
+DEFAULT_DECODED_CACHE_MAX_BYTES = 256 * 1024 ** 2
+# Evict down to this fraction of the budget so that eviction does not run on every write
+DISK_CACHE_EVICT_TARGET = 0.9
+STALE_TEMP_FILE_SECONDS = 3600
+# Other processes sharing the directory also write to it: re-measure it at least this often, and
+# more often (but not on every write) once the estimate is close to the budget
+DISK_CACHE_RESCAN_SECONDS = 60.0
+DISK_CACHE_NEAR_BUDGET_RESCAN_SECONDS = 5.0
+
+
+class DiskCache:
+    """Content-addressed on-disk cache, safe to share between several ComfyUI processes.
+
+    Each key is stored in ``<root>/<hh>/<sha256(key)>.bin``. Writes go to a temp file in
+    the same directory followed by ``os.replace`` so readers never see partial files.
+    The file mtime doubles as the last-access time: reads touch it, eviction removes the
+    least recently used files once the directory exceeds ``max_bytes`` and entries idle
+    for longer than ``ttl_seconds`` (if set) are treated as misses and deleted.
+
+    ``max_bytes`` is the budget of the directory, not of this process: writes from other
+    processes are picked up by re-scanning the directory periodically and whenever the running
+    estimate gets close to the budget, so the processes together stay within it.
+    """
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_DISK_CACHE_MAX_BYTES, ttl_seconds: Optional[float] = None):
+        self._root = root
+        self._max_bytes = int(max_bytes)
+        self._ttl = float(ttl_seconds) if ttl_seconds else None
+        self._lock = Lock()
+        # Estimated directory size: re-scanned from disk periodically and whenever eviction runs
+        self._approx_bytes: Optional[int] = None
+        self._scanned_at = 0.0
+
+    @property
+    def root(self) -> str:
+        return self._root
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self._root, digest[:2], digest + ".bin")
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            if self._ttl is not None and time.time() - os.stat(path).st_mtime > self._ttl:
+                self._remove(path)
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+        except OSError as ex:
+            print(f"[ResultCache] disk read failed for {path}: {ex}")
+            return None
+
+    def set(self, key: str, value: bytes) -> None:
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(value)
+                os.replace(tmp_path, path)
+            except BaseException:
+                self._remove(tmp_path)
+                raise
+        except OSError as ex:
+            print(f"[ResultCache] disk write failed for {path}: {ex}")
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            if self._approx_bytes is not None:
+                self._approx_bytes += len(value)
+            since_scan = now - self._scanned_at
+            near_budget = self._approx_bytes is not None and self._approx_bytes > self._max_bytes * DISK_CACHE_EVICT_TARGET
+            if (
+                self._approx_bytes is None
+                or since_scan > DISK_CACHE_RESCAN_SECONDS
+                or (near_budget and since_scan > DISK_CACHE_NEAR_BUDGET_RESCAN_SECONDS)
+            ):
+                self._approx_bytes = self._scan_total()
+                self._scanned_at = now
+            over_budget = self._approx_bytes > self._max_bytes
+        if over_budget:
+            self.evict()
+
+    def _scan(self):
+        entries = []
+        if not os.path.isdir(self._root):
+            return entries
+        for sub in os.scandir(self._root):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.endswith(".bin"):
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                elif entry.name.endswith(".tmp") and time.time() - st.st_mtime > STALE_TEMP_FILE_SECONDS:
+                    # Left behind by a process that died mid-write
+                    self._remove(entry.path)
+        return entries
+
+    def _scan_total(self) -> int:
+        return sum(size for _, size, _ in self._scan())
+
+    def evict(self) -> None:
+        """Remove expired entries, then least recently used ones until under budget."""
+        with self._lock:
+            entries = sorted(self._scan())
+            total = sum(size for _, size, _ in entries)
+            target = int(self._max_bytes * DISK_CACHE_EVICT_TARGET)
+            now = time.time()
+            for mtime, size, path in entries:
+                expired = self._ttl is not None and now - mtime > self._ttl
+                if not expired and total <= target:
+                    continue
+                if self._remove(path):
+                    total -= size
+            self._approx_bytes = total
+            self._scanned_at = time.monotonic()
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+def _key_prefix(key: str) -> str:
+    return key.split(":", 1)[0] if ":" in key else ""
 
 
 class ResultCache:
-    """Simple thread-safe LRU cache for storing small binary results (e.g., PNG bytes)."""
+    """Thread-safe, byte-budgeted LRU cache for storing binary results (e.g., PNG bytes).
+
+    Values other than bytes can be stored by passing ``sizeof`` (e.g. ``lambda a: a.nbytes``
+    for numpy arrays); it is used for all byte accounting.
 
-    def __init__(self, max_items: int = 64):
+    Eviction is size-aware: least recently used entries are dropped until the resident
+    bytes fit ``max_bytes`` (and the entry count fits ``max_items`` if set). Entries larger
+    than the whole budget are not kept in memory. With ``disk`` set, the in-memory LRU is
+    backed by a persistent tier: ``get`` reads through to disk on a memory miss and ``set``
+    writes through to both tiers.
+    """
+
+    def __init__(
+        self,
+        max_items: Optional[int] = None,
+        disk: Optional[DiskCache] = None,
+        max_bytes: int = DEFAULT_MEMORY_CACHE_MAX_BYTES,
+        sizeof: Callable[[Any], int] = len,
+    ):
         self._lock = RLock()
-        self._store: OrderedDict[str, bytes] = OrderedDict()
+        self._store: OrderedDict[str, Any] = OrderedDict()
+        self._sizeof = sizeof
         self._max_items = max_items
+        self._max_bytes = int(max_bytes)
+        self._bytes = 0
+        self._disk = disk
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "evicted_bytes": 0}
+        self._prefix_stats: Dict[str, Dict[str, int]] = {}
+
+    def _prefix(self, key: str) -> Dict[str, int]:
+        prefix = _key_prefix(key)
+        if prefix not in self._prefix_stats:
+            self._prefix_stats[prefix] = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "entries": 0, "bytes": 0}
+        return self._prefix_stats[prefix]
+
+    def _count(self, key: str, counter: str) -> None:
+        self._stats[counter] += 1
+        self._prefix(key)[counter] += 1
+
+    def _track_resident(self, key: str, entries: int, size: int) -> None:
+        self._bytes += size
+        prefix = self._prefix(key)
+        prefix["entries"] += entries
+        prefix["bytes"] += size
+
+    def _over_budget(self) -> bool:
+        if self._bytes > self._max_bytes:
+            return True
+        return self._max_items is not None and len(self._store) > self._max_items
+
+    def _put_memory(self, key: str, value: bytes) -> None:
+        with self._lock:
+            previous = self._store.pop(key, None)
+            if previous is not None:
+                self._track_resident(key, -1, -self._sizeof(previous))
+            if self._sizeof(value) > self._max_bytes:
+                return
+            self._store[key] = value
+            self._track_resident(key, 1, self._sizeof(value))
+            while self._store and self._over_budget():
+                old_key, old_value = self._store.popitem(last=False)
+                self._track_resident(old_key, -1, -self._sizeof(old_value))
+                self._count(old_key, "evictions")
+                self._stats["evicted_bytes"] += self._sizeof(old_value)
 
     def get(self, key: str) -> Optional[bytes]:
         with self._lock:
             value = self._store.get(key)
             if value is not None:
                 self._store.move_to_end(key)
-            return value
+                self._count(key, "hits")
+                return value
+        value = self._disk.get(key) if self._disk is not None else None
+        with self._lock:
+            self._count(key, "disk_hits" if value is not None else "misses")
+        if value is not None:
+            self._put_memory(key, value)
+        return value
 
     def set(self, key: str, value: bytes) -> None:
+        self._put_memory(key, value)
+        if self._disk is not None:
+            self._disk.set(key, value)
+
+    def stats(self) -> dict:
+        """Counters for sizing the cache: totals plus a breakdown per key prefix (node type)."""
         with self._lock:
-            self._store[key] = value
-            self._store.move_to_end(key)
-            if len(self._store) > self._max_items:
-                self._store.popitem(last=False)
+            return {
+                **self._stats,
+                "entries": len(self._store),
+                "bytes": self._bytes,
+                "max_bytes": self._max_bytes,
+                "max_items": self._max_items,
+                "by_prefix": {k: dict(v) for k, v in self._prefix_stats.items()},
+            }
+
+
+def _disk_cache_from_config() -> Optional[DiskCache]:
+    """Build the disk tier from env/config.
+
+    ``GEMINI_RESULT_CACHE_DIR`` or config ``result_cache_dir`` selects the directory; the tier is
+    off when neither is set (or they are empty). ``result_cache_max_bytes`` and
+    ``result_cache_ttl_seconds`` set the budget and idle expiry.
+    """
+    from ..gemini_client import get_client_config
+
+    cfg = get_client_config()
+    root = os.environ.get("GEMINI_RESULT_CACHE_DIR")
+    if root is None:
+        root = cfg.get("result_cache_dir")
+    if not root:
+        return None
+    return DiskCache(
+        root=os.path.expanduser(str(root)),
+        max_bytes=int(cfg.get("result_cache_max_bytes", DEFAULT_DISK_CACHE_MAX_BYTES)),
+        ttl_seconds=cfg.get("result_cache_ttl_seconds"),
+    )
+
+
+def _result_cache_from_config() -> ResultCache:
+    """Build the global cache; config ``memory_cache_max_bytes`` / ``memory_cache_max_items`` size the memory tier."""
+    from ..gemini_client import get_client_config
+
+    cfg = get_client_config()
+    max_items = cfg.get("memory_cache_max_items")
+    return ResultCache(
+        max_items=int(max_items) if max_items else None,
+        disk=_disk_cache_from_config(),
+        max_bytes=int(cfg.get("memory_cache_max_bytes", DEFAULT_MEMORY_CACHE_MAX_BYTES)),
+    )
+
+
+def _decoded_cache_from_config() -> ResultCache:
+    """Hot tier of decoded results; config ``decoded_cache_max_bytes`` sets its budget (0 disables)."""
+    from ..gemini_client import get_client_config
+
+    max_bytes = get_client_config().get("decoded_cache_max_bytes", DEFAULT_DECODED_CACHE_MAX_BYTES)
+    return ResultCache(max_bytes=int(max_bytes), sizeof=lambda arr: arr.nbytes)
+
+
+GLOBAL_RESULT_CACHE = _result_cache_from_config()
+GLOBAL_DECODED_CACHE = _decoded_cache_from_config()
+
+
+def _decoded_key(cache_key: str, resize_to: Optional[Tuple[int, int]]) -> str:
+    return f"{cache_key}@{resize_to[0]}x{resize_to[1]}" if resize_to else cache_key
+
+
+def get_cached_image(cache_key: str, resize_to: Optional[Tuple[int, int]] = None) -> Optional[np.ndarray]:
+    """Look up a cached result as a decoded uint8 array.
+
+    The decoded tier is checked first, so re-running a seeded graph skips PNG decoding;
+    otherwise the encoded bytes are decoded once and kept in the decoded tier.
+    """
+    decoded_key = _decoded_key(cache_key, resize_to)
+    arr = GLOBAL_DECODED_CACHE.get(decoded_key)
+    if arr is not None:
+        return arr
+    data = GLOBAL_RESULT_CACHE.get(cache_key)
+    if data is None:
+        return None
+    arr = bytes_to_array(data, resize_to=resize_to)
+    GLOBAL_DECODED_CACHE.set(decoded_key, arr)
+    return arr
+
+
+def cache_result(cache_key: str, data: bytes) -> None:
+    """Store a fresh result in the memory and disk tiers."""
+    GLOBAL_RESULT_CACHE.set(cache_key, data)
+
 
+def decode_result_image(cache_key: str, data: bytes, resize_to: Optional[Tuple[int, int]] = None) -> np.ndarray:
+    """Decode the result stored under ``cache_key``, reusing and filling only the decoded tier.
 
-GLOBAL_RESULT_CACHE = ResultCache(max_items=96)
+    For callers that received the bytes of a request someone else already cached.
+    """
+    decoded_key = _decoded_key(cache_key, resize_to)
+    arr = GLOBAL_DECODED_CACHE.get(decoded_key)
+    if arr is None:
+        arr = bytes_to_array(data, resize_to=resize_to)
+        GLOBAL_DECODED_CACHE.set(decoded_key, arr)
+    return arr
 
 
+def cache_result_image(cache_key: str, data: bytes, resize_to: Optional[Tuple[int, int]] = None) -> np.ndarray:
+    """Store a fresh result in the cache and return it decoded (also kept in the decoded tier)."""
+    cache_result(cache_key, data)
+    arr = bytes_to_array(data, resize_to=resize_to)
+    GLOBAL_DECODED_CACHE.set(_decoded_key(cache_key, resize_to), arr)
+    return arr
@@ -0,0 +1,98 @@
+import time
+from concurrent.futures import CancelledError, Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from threading import Lock
+from typing import Callable, Dict, Optional, TypeVar
+
+
+R = TypeVar("R")
+
+# How often a waiting caller checks its cancel_check
+POLL_INTERVAL = 0.2
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls that share a key.
+
+    The first caller for a key (the leader) runs the function; callers arriving while it is
+    in flight wait for the leader and receive the same result or exception. Nothing is kept
+    once the call finishes - later callers are expected to find the result in the cache, which
+    only the leader's ``fn`` should fill. A waiting caller gives up on its own ``cancel_check``
+    or ``timeout`` without affecting the leader.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._calls: Dict[str, Future] = {}
+        self._stats = {"calls": 0, "shared": 0}
+
+    def do(
+        self,
+        key: Optional[str],
+        fn: Callable[..., R],
+        *args,
+        cancel_check: Optional[Callable[[], bool]] = None,
+        timeout: Optional[float] = None,
+        **kwargs,
+    ) -> R:
+        """Run ``fn(*args, **kwargs)`` once per in-flight ``key``; ``key=None`` disables coalescing.
+
+        A caller waiting for the leader raises CancelledError once ``cancel_check()`` is true and
+        TimeoutError after ``timeout`` seconds; the leader itself is bound only by ``fn``.
+        """
+        if key is None:
+            return fn(*args, **kwargs)
+
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self._stats["calls"] += 1
+            else:
+                self._stats["shared"] += 1
+
+        if not leader:
+            return self._wait(future, cancel_check, timeout)
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as ex:
+            future.set_exception(ex)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    @staticmethod
+    def _wait(future: Future, cancel_check: Optional[Callable[[], bool]], timeout: Optional[float]) -> R:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if cancel_check is not None:
+                wait = POLL_INTERVAL if wait is None else min(wait, POLL_INTERVAL)
+            try:
+                return future.result(timeout=wait)
+            except FutureTimeoutError:
+                if future.done():
+                    raise  # the leader's own TimeoutError (the same class since Python 3.11)
+                if cancel_check is not None and cancel_check():
+                    raise CancelledError("gave up waiting for the in-flight call")
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"timed out after waiting {round(timeout, 1)}s for an identical in-flight request")
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> dict:
+        """``calls`` executed by leaders and ``shared`` results handed to waiting callers."""
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._calls)}
+
+
+GLOBAL_SINGLE_FLIGHT = SingleFlight()